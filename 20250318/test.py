@@ -3,11 +3,23 @@ import math
 import random
 from mathutils import Vector, Euler
 import os
+import sys
+
+# 与 20250513 共用输出精度配置和渲染设备检测
+SHARED_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '20250513')
+if SHARED_DIR not in sys.path:
+    sys.path.append(SHARED_DIR)
+
+from output_profiles import get_output_profile, apply_format, apply_output_profile
+from render_device import configure_render_device
 
 # 共生成多少个物体
 num = 8
 output_base_path = r"C:/Users/79160/Desktop/L_BlenderPlugin_1/renders/"
 engine_type = 'CYCLES'  # 'BLENDER_EEVEE_NEXT' or 'CYCLES'
+# 输出精度配置，见 20250513/output_profiles.py: 'FULL' / 'BALANCED' / 'COMPACT' / 'FAST'
+# 所有通道写在同一个多层 EXR 中，只能共用一种位深和压缩方式，因此使用配置中的 multilayer 项
+output_profile = 'FULL'
 
 def clear_scene():
     # Delete all objects
@@ -172,9 +184,7 @@ def setup_render(engine='CYCLES'):
     # Output Settings
     scene.render.filepath = ""
     scene.render.use_file_extension = True
-    scene.render.image_settings.file_format = 'OPEN_EXR_MULTILAYER'
-    scene.render.image_settings.color_depth = '32'
-    scene.render.image_settings.exr_codec = 'ZIP'
+    apply_format(scene.render.image_settings, get_output_profile(output_profile)['multilayer'])
     scene.render.use_overwrite = True
     scene.render.use_motion_blur = False
 
@@ -223,9 +233,8 @@ def setup_render(engine='CYCLES'):
     output_node.name = "FileOutputNode"
     output_node.location = (900, 0)
 
-    output_node.format.file_format = 'OPEN_EXR_MULTILAYER'  # 显式设置格式
-    output_node.format.color_depth = '32'
-    output_node.format.exr_codec = 'ZIP'
+    output_node.format.file_format = 'OPEN_EXR_MULTILAYER'  # 显式设置格式，位深和压缩方式由 apply_output_profile 设置
+    apply_output_profile(node_tree, output_profile)
 
     output_node.file_slots.clear()
     # # 连接节点
@@ -264,7 +273,7 @@ def setup_render(engine='CYCLES'):
         # Cycles配置
         scene.cycles.samples = 64
         scene.cycles.use_denoising = True
-        scene.cycles.device = 'GPU'         # 全局设置CPU渲染，只有cycles分CPU和GPU
+        configure_render_device(scene)  # 只有cycles分CPU和GPU，没有可用GPU时回退到CPU
 
         # 强制启用自定义AOV
         if "CameraDistance" not in vl.aovs:
@@ -0,0 +1,131 @@
+# 异步输出写入：渲染下一个视角的同时，在后台线程中编码 PNG、写相机信息和关键点文本
+#
+# PNG 编码只用 NumPy + zlib（zlib 压缩时会释放 GIL），不依赖 bpy，可以在线程中运行。
+import struct
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+def linear_to_srgb(values):
+    """场景线性值 -> sRGB 编码值（与 Standard 视图变换一致）"""
+    values = np.clip(values, 0.0, 1.0)
+    return np.where(values <= 0.0031308, values * 12.92, 1.055 * np.power(values, 1.0 / 2.4) - 0.055)
+
+
+def _png_chunk(tag, data):
+    chunk = tag + data
+    return struct.pack('>I', len(data)) + chunk + struct.pack('>I', zlib.crc32(chunk) & 0xffffffff)
+
+
+def encode_png(pixels, path, color_mode='RGBA', bit_depth=8, compress_level=6):
+    """
+    把 Blender 图像像素写成 PNG
+
+    参数:
+        pixels: (H, W, 4) float32，已是显示空间(sRGB)的值，行顺序自下而上（与 Image.pixels 相同）
+        path: 输出路径
+        color_mode: 'RGBA' / 'RGB' / 'BW'
+        bit_depth: 8 或 16
+        compress_level: zlib 压缩级别
+    """
+    pixels = np.asarray(pixels, dtype=np.float32)[::-1]
+    if color_mode == 'RGB':
+        channels, color_type = pixels[..., :3], 2
+    elif color_mode == 'BW':
+        gray = pixels[..., 0] * 0.2126 + pixels[..., 1] * 0.7152 + pixels[..., 2] * 0.0722
+        channels, color_type = gray[..., None], 0
+    else:
+        channels, color_type = pixels, 6
+
+    max_value = 65535 if bit_depth == 16 else 255
+    data = np.rint(np.clip(channels, 0.0, 1.0) * max_value).astype('>u2' if bit_depth == 16 else np.uint8)
+    height, width = data.shape[:2]
+
+    # 每行前加一个过滤类型字节 0（不过滤）
+    rows = data.reshape(height, -1).view(np.uint8)
+    raw = np.empty((height, rows.shape[1] + 1), dtype=np.uint8)
+    raw[:, 0] = 0
+    raw[:, 1:] = rows
+
+    header = struct.pack('>IIBBBBB', width, height, bit_depth, color_type, 0, 0, 0)
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(_png_chunk(b'IHDR', header))
+        f.write(_png_chunk(b'IDAT', zlib.compress(raw.tobytes(), compress_level)))
+        f.write(_png_chunk(b'IEND', b''))
+    return path
+
+
+def encode_render_png(pixels, path, color_mode='RGBA', bit_depth=8, exposure=0.0, gamma=1.0, unpremultiply=False):
+    """
+    把 Viewer 节点的场景线性像素按 Standard 视图变换转成显示值后写成 PNG
+
+    参数:
+        pixels: (H, W, 4) float32 场景线性、预乘 Alpha 的像素
+        exposure, gamma: 场景的 view_settings.exposure / gamma
+        unpremultiply: 透明背景时转为非预乘 Alpha（与 Blender 保存 PNG 的结果一致）
+    """
+    rgb = pixels[..., :3] * np.float32(2.0 ** exposure)
+    alpha = pixels[..., 3:4]
+    if unpremultiply:
+        rgb = np.where(alpha > 0, rgb / np.maximum(alpha, 1e-8), 0.0)
+    rgb = linear_to_srgb(rgb)
+    if gamma != 1.0:
+        rgb = np.power(rgb, 1.0 / gamma)
+    return encode_png(np.concatenate([rgb, alpha], axis=-1), path, color_mode, bit_depth)
+
+
+def write_text(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+    return path
+
+
+class AsyncWriter:
+    """
+    有界的后台写入池
+
+    submit() 在排队的任务数达到 max_pending 时阻塞，保证待写像素占用的内存有上限；
+    on_done 回调在写入成功后调用（同一时间只运行一个回调），用于在文件完整写出后记录断点续跑日志。
+    """
+
+    def __init__(self, max_workers=2, max_pending=4):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='render_writer')
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.callback_lock = threading.Lock()
+        self.futures = []
+        self.errors = []
+
+    def _run(self, func, args, on_done):
+        try:
+            result = func(*args)
+            if on_done is not None:
+                with self.callback_lock:
+                    on_done()
+            return result
+        except Exception as e:
+            self.errors.append(e)
+            print(f"异步写入失败: {e}")
+        finally:
+            self.slots.release()
+
+    def submit(self, func, *args, on_done=None):
+        self.slots.acquire()
+        future = self.executor.submit(self._run, func, args, on_done)
+        self.futures.append(future)
+        return future
+
+    def flush(self):
+        """等待所有已提交的写入完成，返回期间出现的错误列表"""
+        for future in self.futures:
+            future.result()
+        self.futures = []
+        errors, self.errors = self.errors, []
+        return errors
+
+    def close(self):
+        errors = self.flush()
+        self.executor.shutdown(wait=True)
+        return errors
@@ -0,0 +1,108 @@
+# 关键点遮挡检测耗时对比：scene.ray_cast 逐点检查 vs 每模型缓存的 BVH
+#
+# 用法:
+#   blender -b --python bench_occlusion.py -- [PLY 目录] [视角数]
+#
+# 默认使用同目录下的 models/ 样例模型，每个模型 8 个视角。
+import bpy
+import os
+import sys
+import math
+import time
+import json
+import numpy as np
+from mathutils import Vector
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.append(SCRIPT_DIR)
+
+from keypoints import (get_mesh_vertices_world, get_camera_matrices, get_render_resolution, project_points,
+                       visible_by_scene_ray_cast, OcclusionEngine)
+
+argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+models_dir = argv[0] if len(argv) > 0 else os.path.join(SCRIPT_DIR, 'models')
+num_views = int(argv[1]) if len(argv) > 1 else 8
+
+# 空场景 + 一个相机
+bpy.ops.wm.read_homefile(use_empty=True)
+scene = bpy.context.scene
+scene.render.resolution_x = 512
+scene.render.resolution_y = 512
+cam_data = bpy.data.cameras.new('BenchCamera')
+cam_data.lens_unit = 'FOV'
+cam_data.angle = math.radians(50)
+cam = bpy.data.objects.new('BenchCamera', cam_data)
+scene.collection.objects.link(cam)
+scene.camera = cam
+res_x, res_y = get_render_resolution(scene)
+
+results = []
+for ply_file in sorted(f for f in os.listdir(models_dir) if f.lower().endswith('.ply')):
+    bpy.ops.wm.ply_import(filepath=os.path.join(models_dir, ply_file))
+    obj = bpy.context.selected_objects[0]
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+
+    verts_world = get_mesh_vertices_world(obj)
+    center = verts_world.mean(axis=0)
+    radius = np.linalg.norm(verts_world - center, axis=1).max()
+
+    # 相机均匀分布在模型周围并看向中心
+    poses = []
+    for i in range(num_views):
+        azimuth = 2 * math.pi * i / num_views
+        elevation = math.radians(30)
+        offset = Vector((math.cos(elevation) * math.cos(azimuth),
+                         math.cos(elevation) * math.sin(azimuth),
+                         math.sin(elevation))) * radius * 3
+        location = Vector(center) + offset
+        rotation = (-offset).to_track_quat('-Z', 'Y').to_euler()
+        poses.append((location, rotation))
+
+    scene_time = 0.0
+    bvh_time = 0.0
+    agreement = []
+
+    # BVH 构建时间计入 BVH 路径
+    start = time.perf_counter()
+    engine = OcclusionEngine(obj, verts_world)
+    bvh_time += time.perf_counter() - start
+
+    for location, rotation in poses:
+        cam.location = location
+        cam.rotation_euler = rotation
+        bpy.context.view_layer.update()
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+
+        view, proj = get_camera_matrices(scene, cam, depsgraph)
+        candidates = np.flatnonzero(project_points(verts_world, view, proj, res_x, res_y)['in_frustum'][0])
+        cam_location = np.array(location)
+
+        start = time.perf_counter()
+        visible_scene = visible_by_scene_ray_cast(scene, depsgraph, verts_world, cam_location, candidates)
+        scene_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        visible_bvh = engine.visible(cam_location, candidates)
+        bvh_time += time.perf_counter() - start
+
+        union = len(np.union1d(visible_scene, visible_bvh))
+        agreement.append(len(np.intersect1d(visible_scene, visible_bvh)) / union if union else 1.0)
+
+    results.append({
+        'model': ply_file,
+        'vertices': len(verts_world),
+        'views': num_views,
+        'scene_ray_cast_s': scene_time,
+        'bvh_s': bvh_time,
+        'speedup': scene_time / bvh_time if bvh_time > 0 else None,
+        'mean_agreement': float(np.mean(agreement)),
+    })
+
+    bpy.data.objects.remove(obj, do_unlink=True)
+
+print(f"{'模型':<12}{'顶点数':>10}{'ray_cast(s)':>14}{'BVH(s)':>10}{'加速比':>10}{'一致率':>10}")
+for r in results:
+    print(f"{r['model']:<12}{r['vertices']:>10}{r['scene_ray_cast_s']:>14.3f}{r['bvh_s']:>10.3f}"
+          f"{r['speedup']:>10.1f}{r['mean_agreement']:>10.3f}")
+print(json.dumps(results, indent=2))
@@ -0,0 +1,152 @@
+# 输出配置对比：各配置下深度/法线/遮罩每个视角的文件大小、写入耗时和精度损失
+#
+# 用法:
+#   blender -b --python bench_output_profiles.py -- [PLY 文件] [分辨率] [重复次数]
+#
+# 默认使用 models/ 下的第一个样例模型、512 分辨率、每项写 5 次取最小耗时。
+# 只渲染一次（每个通道用 Viewer 节点取一次像素），之后按各配置反复写出同一份数据，
+# 因此写入耗时不受渲染噪声影响。
+import bpy
+import os
+import sys
+import math
+import time
+import json
+import shutil
+import tempfile
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.append(SCRIPT_DIR)
+
+from ply_loader import load_ply_object
+from keypoints import get_mesh_vertices_world
+from output_profiles import OUTPUT_PROFILES, apply_format
+
+argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+models_dir = os.path.join(SCRIPT_DIR, 'models')
+ply_path = argv[0] if len(argv) > 0 else os.path.join(models_dir, sorted(f for f in os.listdir(models_dir) if f.lower().endswith('.ply'))[0])
+resolution = int(argv[1]) if len(argv) > 1 else 512
+repeat = int(argv[2]) if len(argv) > 2 else 5
+
+# 模型 + 点光源 + 相机，通道设置与 render_v3.py 相同
+bpy.ops.wm.read_homefile(use_empty=True)
+scene = bpy.context.scene
+scene.render.engine = 'CYCLES'
+scene.render.resolution_x = resolution
+scene.render.resolution_y = resolution
+scene.render.resolution_percentage = 100
+scene.cycles.samples = 8
+# 写出 PNG 时不做视图变换，保存的就是原始数值
+scene.view_settings.view_transform = 'Raw'
+view_layer = scene.view_layers[0]
+view_layer.use_pass_normal = True
+view_layer.use_pass_z = True
+view_layer.use_pass_object_index = True
+
+obj = load_ply_object(ply_path, center=True)
+obj.pass_index = 1
+radius = np.linalg.norm(get_mesh_vertices_world(obj), axis=1).max()
+
+light_data = bpy.data.lights.new(name='BenchLight', type='POINT')
+light_data.energy = 1000
+light = bpy.data.objects.new(name='BenchLight', object_data=light_data)
+light.location = (radius, -radius, radius * 2)
+scene.collection.objects.link(light)
+
+cam_data = bpy.data.cameras.new('BenchCamera')
+cam_data.lens_unit = 'FOV'
+cam_data.angle = math.radians(50)
+cam = bpy.data.objects.new('BenchCamera', cam_data)
+cam.location = (0, -radius * 3, radius * 1.5)
+cam.rotation_euler = cam.location.to_track_quat('Z', 'Y').to_euler()
+scene.collection.objects.link(cam)
+scene.camera = cam
+
+# 合成节点：Viewer 依次接到各通道
+scene.use_nodes = True
+tree = scene.node_tree
+tree.nodes.clear()
+rl = tree.nodes.new('CompositorNodeRLayers')
+id_mask = tree.nodes.new('CompositorNodeIDMask')
+id_mask.index = 1
+id_mask.use_antialiasing = True
+tree.links.new(rl.outputs['IndexOB'], id_mask.inputs[0])
+viewer = tree.nodes.new('CompositorNodeViewer')
+sources = {'depth': rl.outputs['Depth'], 'normal': rl.outputs['Normal'], 'silhouette': id_mask.outputs[0]}
+
+
+def capture(socket):
+    """把 socket 接到 Viewer 后渲染一次，返回 Viewer Node 的像素（平铺的 RGBA float32）"""
+    for link in list(viewer.inputs[0].links):
+        tree.links.remove(link)
+    tree.links.new(socket, viewer.inputs[0])
+    bpy.ops.render.render()
+    image = bpy.data.images['Viewer Node']
+    pixels = np.empty(resolution * resolution * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    return pixels
+
+
+captured = {name: capture(socket) for name, socket in sources.items()}
+output_dir = tempfile.mkdtemp(prefix='bench_output_profiles_')
+
+# 作为写出源的浮点图像（非颜色数据，保存时不做色彩变换）
+source = bpy.data.images.new('BenchSource', resolution, resolution, alpha=True, float_buffer=True)
+source.colorspace_settings.is_data = True
+
+results = []
+for profile_name, profile in OUTPUT_PROFILES.items():
+    for pass_name, pixels in captured.items():
+        settings = profile[pass_name]
+        apply_format(scene.render.image_settings, settings)
+        source.pixels.foreach_set(pixels)
+        ext = '.exr' if settings['file_format'] == 'OPEN_EXR' else '.png'
+        path = os.path.join(output_dir, f"{profile_name}_{pass_name}{ext}")
+
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            source.save_render(filepath=path, scene=scene)
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+
+        # 读回文件，与原始数据比较（遮罩只比较第一个通道）
+        loaded = bpy.data.images.load(path)
+        loaded.colorspace_settings.is_data = True
+        restored = np.empty(resolution * resolution * 4, dtype=np.float32)
+        loaded.pixels.foreach_get(restored)
+        bpy.data.images.remove(loaded)
+        channels = 3 if pass_name == 'normal' else 1
+        original = pixels.reshape(-1, 4)[:, :channels]
+        error = np.abs(restored.reshape(-1, 4)[:, :channels] - original)
+        # 深度背景为极大值，只统计模型上的像素
+        finite = np.isfinite(original).all(axis=1) & (np.abs(original) < 1e9).all(axis=1)
+
+        results.append({
+            'profile': profile_name,
+            'pass': pass_name,
+            'format': settings['file_format'],
+            'color_depth': settings['color_depth'],
+            'codec': settings.get('exr_codec'),
+            'bytes': os.path.getsize(path),
+            'write_s': best,
+            'max_abs_error': float(error[finite].max()) if finite.any() else 0.0,
+        })
+
+shutil.rmtree(output_dir, ignore_errors=True)
+
+print(f"模型: {os.path.basename(ply_path)}，分辨率 {resolution}，每项写 {repeat} 次取最小耗时")
+print(f"{'配置':<10}{'通道':<12}{'位深':>6}{'压缩':>8}{'大小(KB)':>12}{'写入(ms)':>12}{'最大误差':>12}")
+for r in results:
+    print(f"{r['profile']:<10}{r['pass']:<12}{r['color_depth']:>6}{r['codec'] or '-':>8}"
+          f"{r['bytes'] / 1024:>12.1f}{r['write_s'] * 1000:>12.2f}{r['max_abs_error']:>12.2e}")
+
+# 每个配置一个视角的合计
+print(f"{'配置':<10}{'每视角(KB)':>14}{'每视角写入(ms)':>18}")
+for profile_name in OUTPUT_PROFILES:
+    rows = [r for r in results if r['profile'] == profile_name]
+    print(f"{profile_name:<10}{sum(r['bytes'] for r in rows) / 1024:>14.1f}"
+          f"{sum(r['write_s'] for r in rows) * 1000:>18.2f}")
+print(json.dumps(results, indent=2))
@@ -0,0 +1,162 @@
+# render_v3 完整流水线基准测试：在样例模型上以固定的小分辨率/采样数无界面运行，分阶段计时并与基线对比
+#
+# 用普通 Python 运行即可，会启动 blender -b:
+#   python bench_pipeline.py --blender /path/to/blender                  运行并与 bench_baseline.json 对比
+#   python bench_pipeline.py --blender /path/to/blender --update-baseline 运行并把结果保存为新的基线
+#
+# 有阶段比基线慢超过容差时返回码为 1。
+# 基线与机器相关，仓库中不附带；在新的机器或检出上先运行一次 --update-baseline 生成 bench_baseline.json，
+# 之后的运行才会对比。当前配置下没有执行的阶段（例如默认 INDEX 遮罩模式下的 silhouette_render）标记为未启用，不参与对比。
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from stage_timing import PIPELINE_STAGES
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RENDER_SCRIPT = os.path.join(SCRIPT_DIR, 'render_v3.py')
+BENCH_MODELS = ('a_11.ply', 'a_16.ply', 'a_25.ply')
+DEFAULT_BASELINE = os.path.join(SCRIPT_DIR, 'bench_baseline.json')
+
+
+def run_pipeline(args, output_dir, timings_file):
+    """运行一次 render_v3.py，返回 Blender 进程的返回码"""
+    cmd = [args.blender, '-b']
+    if args.template:
+        cmd.append(args.template)
+    cmd += ['--python', RENDER_SCRIPT, '--',
+            '--input-dir', args.models_dir,
+            '--output-dir', output_dir,
+            '--models', *BENCH_MODELS,
+            '--views', str(args.views),
+            '--image-size', str(args.image_size),
+            '--samples', str(args.samples),
+            '--seed', str(args.seed),
+            '--device', args.device,
+            '--stage-timings', timings_file]
+    with open(os.path.join(output_dir, 'blender.log'), 'w') as log:
+        return subprocess.run(cmd, stdout=log, stderr=subprocess.STDOUT).returncode
+
+
+def compare_to_baseline(result, baseline, tolerance, min_seconds):
+    """
+    逐模型、逐阶段与基线对比
+
+    返回:
+        回归列表 [{'model', 'stage', 'baseline', 'current', 'ratio'}]；
+        比基线慢超过 tolerance 比例且绝对差值超过 min_seconds 才算回归（过滤掉计时抖动）
+    """
+    regressions = []
+    rows = [(None, stage, baseline['stages'].get(stage), result['stages'].get(stage)) for stage in PIPELINE_STAGES]
+    rows.append((None, 'total', baseline['total_seconds'], result['total_seconds']))
+    for model, stages in result['models'].items():
+        for stage, current in stages.items():
+            rows.append((model, stage, baseline['models'].get(model, {}).get(stage), current))
+
+    for model, stage, base, current in rows:
+        if not base or current is None:
+            continue
+        if current > base * (1.0 + tolerance) and current - base > min_seconds:
+            regressions.append({'model': model, 'stage': stage, 'baseline': base, 'current': current,
+                                'ratio': current / base})
+    return regressions
+
+
+def print_report(result, baseline):
+    print(f"{'阶段':<20}{'当前(s)':>12}{'基线(s)':>12}{'变化':>10}")
+    rows = [(stage, result['stages'].get(stage), baseline['stages'].get(stage) if baseline else None)
+            for stage in PIPELINE_STAGES]
+    rows.append(('total', result['total_seconds'], baseline['total_seconds'] if baseline else None))
+    for stage, current, base in rows:
+        if stage not in result['stages'] and stage != 'total':
+            print(f"{stage:<20}{'未启用':>12}")
+            continue
+        change = f"{(current / base - 1) * 100:+.1f}%" if base else '-'
+        base_text = f"{base:.3f}" if base is not None else '-'
+        print(f"{stage:<20}{current:>12.3f}{base_text:>12}{change:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='render_v3 流水线基准测试')
+    parser.add_argument('--blender', default='blender', help='Blender 可执行文件路径')
+    parser.add_argument('--models-dir', default=os.path.join(SCRIPT_DIR, 'models'), help='样例模型目录')
+    parser.add_argument('--template', help='渲染模板 .blend，与正式运行保持一致时使用')
+    parser.add_argument('--views', type=int, default=4, help='每个模型的视角数')
+    parser.add_argument('--image-size', type=int, default=256, help='渲染分辨率')
+    parser.add_argument('--samples', type=int, default=8, help='Cycles 采样数')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--device', default='CPU', choices=('AUTO', 'GPU', 'CPU'), help='渲染设备，默认 CPU 以便不同机器可比')
+    parser.add_argument('--repeat', type=int, default=1, help='重复运行次数，各阶段取最小值')
+    parser.add_argument('--output', default=os.path.join(SCRIPT_DIR, 'bench_result.json'), help='结果 JSON 路径')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基线 JSON 路径')
+    parser.add_argument('--update-baseline', action='store_true', help='把本次结果保存为基线')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='允许比基线慢的比例')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help='忽略小于该值的绝对差异')
+    parser.add_argument('--keep-output', action='store_true', help='保留渲染输出目录')
+    args = parser.parse_args(argv)
+    args.models_dir = os.path.abspath(args.models_dir)
+
+    runs = []
+    for k in range(args.repeat):
+        # 每次使用新的输出目录，避免断点续跑日志跳过已完成的视角
+        output_dir = tempfile.mkdtemp(prefix='render_v3_bench_')
+        timings_file = os.path.join(output_dir, 'stage_timings.json')
+        start = time.perf_counter()
+        returncode = run_pipeline(args, output_dir, timings_file)
+        print(f"第 {k + 1}/{args.repeat} 次运行: {time.perf_counter() - start:.1f}秒，返回码 {returncode}")
+        if returncode != 0 or not os.path.exists(timings_file):
+            print(f"流水线运行失败，日志: {os.path.join(output_dir, 'blender.log')}")
+            return 2
+        with open(timings_file, 'r') as f:
+            runs.append(json.load(f))
+        if not args.keep_output:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+    # 多次运行时每个阶段取最小值，减少系统噪声的影响
+    result = {key: runs[0][key] for key in ('image_size', 'samples', 'views', 'seed', 'device', 'model_files')}
+    result['total_seconds'] = min(r['total_seconds'] for r in runs)
+    # 只保留实际执行过的阶段，其余在当前配置下未启用
+    result['stages'] = {stage: min(r['stages'].get(stage, 0.0) for r in runs)
+                        for stage in PIPELINE_STAGES if any(stage in r['stages'] for r in runs)}
+    result['inactive_stages'] = [stage for stage in PIPELINE_STAGES if stage not in result['stages']]
+    result['models'] = {}
+    for model in runs[0]['models']:
+        stages = runs[0]['models'][model]
+        result['models'][model] = {stage: min(r['models'].get(model, {}).get(stage, 0.0) for r in runs) for stage in stages}
+    result['repeat'] = args.repeat
+    result['time'] = time.time()
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    elif not args.update_baseline:
+        print(f"没有基线 {args.baseline}，不做对比；先用 --update-baseline 生成基线")
+    print_report(result, baseline)
+
+    regressions = []
+    if baseline:
+        regressions = compare_to_baseline(result, baseline, args.tolerance, args.min_seconds)
+        for r in regressions:
+            where = f"{r['model']}/{r['stage']}" if r['model'] else r['stage']
+            print(f"回归: {where} {r['baseline']:.3f}s -> {r['current']:.3f}s ({r['ratio']:.2f}x)")
+        if not regressions:
+            print("没有发现回归")
+    result['regressions'] = regressions
+
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"基线已更新: {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
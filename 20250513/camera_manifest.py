@@ -0,0 +1,105 @@
+# 数据集级相机矩阵清单：所有模型、所有视角的内参 K 和外参写进一个可内存映射的 .npy
+#
+# 目录结构(OUTPUT_DIR/camera_manifest/):
+#   parts/<model>.npy     每个模型处理完后写出的记录
+#   cameras.npy           build_camera_manifest 合并后的结构化数组，字段见 CAMERA_RECORD_DTYPE
+#   models.json           model_id -> 模型名
+#
+# 读取:
+#   records, models = load_camera_manifest(manifest_dir)
+#   K = records['K'][idx]                # (3, 3)，不需要解析文本
+#   world_to_camera = records['world_to_camera'][records['model_id'] == 3]
+#
+# 不依赖 bpy。
+import json
+import os
+import numpy as np
+
+CAMERA_RECORD_DTYPE = np.dtype([
+    ('model_id', '<i4'),
+    ('view_id', '<i4'),
+    ('K', '<f8', (3, 3)),                  # 内参，OpenCV 约定（像素原点在左上角）
+    ('world_to_camera', '<f8', (4, 4)),    # 外参，OpenCV 约定（相机 +Z 朝前、+Y 朝下）
+])
+
+
+def write_model_cameras(manifest_dir, model, cameras):
+    """
+    写出一个模型的相机记录（文件已存在时保留本次没有重新计算的视角）
+
+    参数:
+        manifest_dir: 清单目录
+        model: 模型名
+        cameras: {视角序号: (K, world_to_camera)}
+
+    返回:
+        写出的文件路径
+    """
+    parts_dir = os.path.join(manifest_dir, 'parts')
+    os.makedirs(parts_dir, exist_ok=True)
+    path = os.path.join(parts_dir, f"{model}.npy")
+
+    cameras = dict(cameras)
+    if os.path.exists(path):
+        try:
+            for r in np.load(path):
+                cameras.setdefault(int(r['view_id']), (r['K'], r['world_to_camera']))
+        except (OSError, ValueError):
+            pass
+
+    records = np.zeros(len(cameras), dtype=CAMERA_RECORD_DTYPE)
+    for k, view in enumerate(sorted(cameras)):
+        K, world_to_camera = cameras[view]
+        records[k]['view_id'] = view
+        records[k]['K'] = K
+        records[k]['world_to_camera'] = world_to_camera
+
+    tmp = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp, records)
+    os.replace(tmp, path)
+    return path
+
+
+def build_camera_manifest(manifest_dir):
+    """
+    把 parts/ 下所有模型的记录合并为 cameras.npy 和 models.json（model_id 按模型名排序分配）
+
+    返回:
+        合并后的记录数
+    """
+    parts_dir = os.path.join(manifest_dir, 'parts')
+    names = sorted(os.path.splitext(f)[0] for f in os.listdir(parts_dir) if f.endswith('.npy')) \
+        if os.path.isdir(parts_dir) else []
+
+    chunks = []
+    for model_id, name in enumerate(names):
+        part = np.load(os.path.join(parts_dir, f"{name}.npy"))
+        part['model_id'] = model_id
+        chunks.append(part)
+    records = np.concatenate(chunks) if chunks else np.zeros(0, dtype=CAMERA_RECORD_DTYPE)
+
+    # 先写临时文件再改名，读取方不会看到写了一半的文件
+    os.makedirs(manifest_dir, exist_ok=True)
+    models_file = os.path.join(manifest_dir, 'models.json')
+    with open(models_file + '.tmp', 'w') as f:
+        json.dump(names, f, indent=2)
+    os.replace(models_file + '.tmp', models_file)
+
+    cameras_file = os.path.join(manifest_dir, 'cameras.npy')
+    np.save(cameras_file + '.tmp.npy', records)
+    os.replace(cameras_file + '.tmp.npy', cameras_file)
+    print(f"相机清单已合并: {len(names)} 个模型，{len(records)} 个视角 -> {cameras_file}")
+    return len(records)
+
+
+def load_camera_manifest(manifest_dir, mmap_mode='r'):
+    """
+    以内存映射方式读取相机清单
+
+    返回:
+        (records, models)，records 为 CAMERA_RECORD_DTYPE 结构化数组，models 为模型名列表(下标即 model_id)
+    """
+    records = np.load(os.path.join(manifest_dir, 'cameras.npy'), mmap_mode=mmap_mode)
+    with open(os.path.join(manifest_dir, 'models.json'), 'r') as f:
+        models = json.load(f)
+    return records, models
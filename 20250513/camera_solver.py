@@ -0,0 +1,151 @@
+# 相机取景求解：根据模型顶点、观察方向和视场角直接算出相机距离
+import numpy as np
+
+
+def get_camera_tan_half_fov(cam_data, res_x, res_y):
+    """
+    计算透视相机水平、垂直半视场角的正切值（考虑 sensor_fit 与画面宽高比）
+
+    参数:
+        cam_data: 相机数据 (bpy.types.Camera)
+        res_x, res_y: 渲染分辨率
+
+    返回:
+        (tan_x, tan_y)
+    """
+    fit = cam_data.sensor_fit
+    if fit == 'AUTO':
+        fit = 'HORIZONTAL' if res_x >= res_y else 'VERTICAL'
+        sensor = cam_data.sensor_width
+    elif fit == 'HORIZONTAL':
+        sensor = cam_data.sensor_width
+    else:
+        sensor = cam_data.sensor_height
+
+    tan_fit = sensor / (2.0 * cam_data.lens)
+    if fit == 'HORIZONTAL':
+        return tan_fit, tan_fit * res_y / res_x
+    return tan_fit * res_x / res_y, tan_fit
+
+
+def look_at_basis(directions):
+    """
+    相机位于 target + direction 处并看向 target 时的相机基向量
+
+    与 TRACK_TO 约束(-Z 朝前, Y 朝上)以及 to_track_quat('-Z', 'Y') 的结果一致：
+    相机的上方向尽量对齐世界 Z 轴。
+
+    参数:
+        directions: (K, 3) 从目标点指向相机的方向
+
+    返回:
+        (right, up, back) 三个 (K, 3) 单位向量数组，back 即相机的 +Z 轴
+    """
+    back = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+    back = back / np.maximum(np.linalg.norm(back, axis=1, keepdims=True), 1e-12)
+
+    world_up = np.tile([0.0, 0.0, 1.0], (len(back), 1))
+    # 正上方/正下方观察时改用世界 Y 轴作为参考
+    degenerate = np.abs(back[:, 2]) > 1.0 - 1e-9
+    world_up[degenerate] = [0.0, 1.0, 0.0]
+
+    right = np.cross(world_up, back)
+    right /= np.maximum(np.linalg.norm(right, axis=1, keepdims=True), 1e-12)
+    up = np.cross(back, right)
+    return right, up, back
+
+
+def solve_camera_distance(points, target, directions, tan_x, tan_y, margin=0.0, near=0.0):
+    """
+    求相机沿给定方向离目标点多远时，所有点恰好落在留出边距的画面内
+
+    对每个点 q（相对目标点），横向坐标 x 需满足 |x| <= t_x * (d - q·back)，
+    因此 d >= |x| / t_x + q·back，纵向同理；取所有点的最大值即为最小可行距离。
+    传入凸包或全部顶点均可，结果都是精确解。
+
+    参数:
+        points: (N, 3) 模型顶点（世界坐标）
+        target: 相机看向的目标点
+        directions: (3,) 或 (K, 3) 从目标点指向相机的方向
+        tan_x, tan_y: 半视场角正切，见 get_camera_tan_half_fov
+        margin: 画面边缘预留的比例，0.2 表示模型只占画面中间 80%
+        near: 相机近裁剪距离
+
+    返回:
+        (K,) 最小相机距离
+    """
+    q = np.asarray(points, dtype=np.float64) - np.asarray(target, dtype=np.float64)
+    right, up, back = look_at_basis(directions)
+
+    limit_x = tan_x * (1.0 - margin)
+    limit_y = tan_y * (1.0 - margin)
+
+    x = np.abs(q @ right.T)         # (N, K)
+    y = np.abs(q @ up.T)
+    along = q @ back.T
+
+    distance = np.maximum(x / limit_x, y / limit_y) + along
+    distance = distance.max(axis=0)
+    # 所有点都要在近裁剪面之前
+    return np.maximum(distance, along.max(axis=0) + near)
+
+
+def look_at_matrices(locations, target):
+    """
+    相机位于 locations 并看向 target 时的世界矩阵（相机 -> 世界）
+
+    参数:
+        locations: (K, 3) 相机位置
+        target: (3,) 目标点
+
+    返回:
+        (K, 4, 4) 世界矩阵
+    """
+    locations = np.asarray(locations, dtype=np.float64).reshape(-1, 3)
+    right, up, back = look_at_basis(locations - np.asarray(target, dtype=np.float64))
+
+    matrices = np.zeros((len(locations), 4, 4))
+    matrices[:, :3, 0] = right
+    matrices[:, :3, 1] = up
+    matrices[:, :3, 2] = back
+    matrices[:, :3, 3] = locations
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+def frustum_fit(points, camera_matrices, tan_x, tan_y, margin=0.0, near=0.0):
+    """
+    批量检查多个候选相机能否完整拍到模型
+
+    参数:
+        points: (N, 3) 模型顶点或凸包顶点（世界坐标）
+        camera_matrices: (4, 4) 或 (K, 4, 4) 相机世界矩阵（相机 -> 世界，已去除缩放）
+        tan_x, tan_y: 半视场角正切，见 get_camera_tan_half_fov
+        margin: 要求画面边缘预留的比例
+        near: 相机近裁剪距离
+
+    返回:
+        (fits, slack) 两个 (K,) 数组:
+            fits  - 模型是否完整落在留出 margin 的画面内
+            slack - 实际留出的边距比例（1 - 最大归一化坐标），相机后方有点时为 -inf
+    """
+    matrices = np.asarray(camera_matrices, dtype=np.float64).reshape(-1, 4, 4)
+    rotation = matrices[:, :3, :3]
+    location = matrices[:, :3, 3]
+
+    # 世界坐标 -> 相机坐标: R^T (p - t)，得到 (K, N, 3)；N 较大时应先传入凸包顶点
+    offset = np.asarray(points, dtype=np.float64)[None, :, :] - location[:, None, :]
+    cam_space = np.einsum('kji,knj->kni', rotation, offset)
+
+    depth = -cam_space[..., 2]
+    in_front = (depth > near).all(axis=1)
+    safe_depth = np.where(depth > 1e-12, depth, 1e-12)
+
+    extent_x = np.abs(cam_space[..., 0]) / (safe_depth * tan_x)
+    extent_y = np.abs(cam_space[..., 1]) / (safe_depth * tan_y)
+    extent = np.maximum(extent_x, extent_y).max(axis=1)
+
+    slack = np.where(in_front, 1.0 - extent, -np.inf)
+    # 容差：solve_camera_distance 解出的位置恰好留出 margin，浮点误差不应判为不满足
+    fits = slack >= margin - 1e-9
+    return fits, slack
@@ -0,0 +1,104 @@
+# 相机参数存储：只追加的 JSON Lines 文件 + 内存中的偏移索引，按模型名直接定位记录
+#
+# 每条记录一行 {"model": ..., "params": [...], "time": ...}，同一模型以最后一条为准。
+# 多个 worker 可以同时追加到同一个文件；读取时只扫描上次之后新增的部分。
+import json
+import os
+import time
+
+
+class CameraParamStore:
+    """
+    按模型名索引的相机参数存储
+
+    打开时扫描一次文件建立 {模型: (偏移, 长度)} 索引，之后 get() 只需一次 seek + 读一行；
+    put() 以单次 O_APPEND 写入追加一行，并发写入时各行不会交错。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index = {}
+        self._scanned = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._migrate_legacy_json()
+        self.refresh()
+
+    def _migrate_legacy_json(self):
+        """旧版 camera_params.json（整个文件一个字典）存在且新文件还没有时，导入一次"""
+        legacy = os.path.splitext(self.path)[0] + '.json'
+        if legacy == self.path or os.path.exists(self.path) or not os.path.exists(legacy):
+            return
+        try:
+            with open(legacy, 'r') as f:
+                all_params = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        for model, params in all_params.items():
+            self._append(model, params)
+        print(f"已从 {legacy} 导入 {len(all_params)} 个模型的相机参数")
+
+    def refresh(self):
+        """读取文件中新追加的记录（包括其他进程写入的），更新索引"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._scanned)
+            offset = self._scanned
+            for line in f:
+                # 最后一行可能正在被其他进程写入
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    model = json.loads(line)['model']
+                except (ValueError, KeyError, TypeError):
+                    offset += len(line)
+                    continue
+                self.index[model] = (offset, len(line))
+                offset += len(line)
+        self._scanned = offset
+
+    def __contains__(self, model):
+        if model not in self.index:
+            self.refresh()
+        return model in self.index
+
+    def keys(self):
+        self.refresh()
+        return list(self.index)
+
+    def get(self, model):
+        """返回模型的相机参数，没有时返回 None"""
+        # 只读取上次扫描之后新增的部分，其他进程刚更新的参数也能读到
+        self.refresh()
+        entry = self.index.get(model)
+        if entry is None:
+            return None
+        offset, length = entry
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length))['params']
+
+    def _append(self, model, params):
+        line = (json.dumps({'model': model, 'params': params, 'time': time.time()}) + '\n').encode('utf-8')
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def put(self, model, params):
+        """追加（覆盖）一个模型的相机参数"""
+        self._append(model, params)
+        self.refresh()
+
+    def items(self):
+        """按模型名返回 (模型, 参数)，每个模型只返回最新的一条"""
+        return [(model, self.get(model)) for model in self.keys()]
+
+    def export_json(self, path):
+        """导出为旧版的整文件 JSON 字典，供只读取 camera_params.json 的下游工具使用"""
+        all_params = dict(self.items())
+        with open(path, 'w') as f:
+            json.dump(all_params, f, indent=2)
+        return all_params
@@ -0,0 +1,77 @@
+# 数据块回收与内存记录：长时间批量渲染时清理孤立的网格、材质、灯光、图像和动作，并记录常驻内存
+import os
+import bpy
+
+# 每个模型处理完后需要清理的数据块类型
+GC_COLLECTIONS = ('meshes', 'materials', 'lights', 'images', 'actions')
+# 由 Blender 管理、不能删除的图像类型
+BLENDER_MANAGED_IMAGE_TYPES = {'RENDER_RESULT', 'COMPOSITING'}
+
+
+def get_rss_bytes():
+    """
+    当前进程的常驻内存(RSS)大小
+
+    返回:
+        字节数；无法获取时返回 None
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+
+    # Linux 下直接读取 /proc
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    return None
+
+
+def datablock_counts(collections=GC_COLLECTIONS + ('objects',)):
+    """返回各类数据块的数量，例如 {'meshes': 3, 'objects': 5, ...}"""
+    return {name: len(getattr(bpy.data, name)) for name in collections}
+
+
+def purge_orphans(collections=GC_COLLECTIONS):
+    """
+    删除没有用户的数据块（带 fake user 的共享数据块会保留）
+
+    删除对象后网格、灯光数据会变成孤立数据块，
+    Blender 只在保存并重新打开文件时才会自动清理，批量运行时需要手动删除。
+
+    返回:
+        各类型删除的数量
+    """
+    removed = {}
+    for name in collections:
+        datablocks = getattr(bpy.data, name)
+        orphans = [d for d in datablocks if d.users == 0 and not d.use_fake_user]
+        if name == 'images':
+            # 'Render Result'、'Viewer Node' 等由 Blender 管理的图像不能删除（灯光等数据块的 type 含义不同，不参与此判断）
+            orphans = [d for d in orphans if d.type not in BLENDER_MANAGED_IMAGE_TYPES]
+        for datablock in orphans:
+            datablocks.remove(datablock)
+        removed[name] = len(orphans)
+    return removed
+
+
+def collect_model_garbage(model=None):
+    """
+    清理孤立数据块并返回内存记录
+
+    返回:
+        字典: 'rss_mb' 常驻内存(MB，无法获取时为 None)、'removed' 各类型删除数量、'datablocks' 清理后的数量
+    """
+    removed = purge_orphans()
+    rss = get_rss_bytes()
+    stats = {
+        'rss_mb': round(rss / 1024 ** 2, 1) if rss is not None else None,
+        'removed': removed,
+        'datablocks': datablock_counts(),
+    }
+    counts = ', '.join(f"{k} {v}" for k, v in stats['datablocks'].items())
+    print(f"内存: {stats['rss_mb']} MB，数据块: {counts}" + (f" ({model})" if model else ""))
+    return stats
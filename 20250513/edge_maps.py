@@ -0,0 +1,202 @@
+# 后处理边缘图：用已输出的深度和法线 EXR 计算轮廓/边缘，代替渲染时的 Freestyle
+#
+# 边缘类型:
+#   silhouette  模型与背景的交界（背景深度为无穷大或极大值）
+#   contour     模型内部的深度跳变（自遮挡轮廓）
+#   crease      相邻像素法线夹角超过阈值（折痕）
+#
+# 对已有数据集补生成边缘图，不需要重新渲染:
+#   python edge_maps.py OUTPUT_DIR [--workers 4]
+#   blender -b --python edge_maps.py -- OUTPUT_DIR      （没有安装 OpenEXR 时用 Blender 读取 EXR）
+#
+# 结果写到 OUTPUT_DIR/edges/{模型}_{视角:03d}.png（8 位灰度，边缘为白色）。
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.append(SCRIPT_DIR)
+
+from async_writer import encode_png
+
+EDGE_KINDS = ('silhouette', 'contour', 'crease')
+BACKGROUND_DEPTH = 1e9                  # 深度大于该值视为背景（Cycles 背景的深度为 1e10）
+
+
+def read_exr(path):
+    """
+    读取 EXR 为 (H, W, C) float32，行顺序自上而下
+
+    优先使用 OpenEXR 包；没有安装时在 Blender 中用 bpy 读取。
+    """
+    try:
+        import OpenEXR
+        import Imath
+    except ImportError:
+        return read_exr_bpy(path)
+
+    exr = OpenEXR.InputFile(path)
+    try:
+        header = exr.header()
+        window = header['dataWindow']
+        width = window.max.x - window.min.x + 1
+        height = window.max.y - window.min.y + 1
+        names = [c for c in ('R', 'G', 'B', 'Y', 'V', 'Z') if c in header['channels']]
+        pixel_type = Imath.PixelType(Imath.PixelType.FLOAT)
+        channels = [np.frombuffer(exr.channel(c, pixel_type), dtype=np.float32).reshape(height, width) for c in names]
+    finally:
+        exr.close()
+    return np.stack(channels, axis=-1)
+
+
+def read_exr_bpy(path):
+    """用 Blender 读取 EXR（图像按数据读取，不做色彩变换）"""
+    import bpy
+    image = bpy.data.images.load(path)
+    try:
+        image.colorspace_settings.is_data = True
+        width, height = image.size
+        pixels = np.empty(width * height * image.channels, dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+        # Image.pixels 的行顺序自下而上
+        return pixels.reshape(height, width, image.channels)[::-1]
+    finally:
+        bpy.data.images.remove(image)
+
+
+def foreground_mask(depth, background_depth=BACKGROUND_DEPTH):
+    """深度有效且不是背景的像素"""
+    return np.isfinite(depth) & (depth < background_depth)
+
+
+def _neighbour_pairs(values):
+    """返回 (右邻, 左/本像素) 和 (下邻, 上/本像素) 两组相邻像素切片"""
+    return ((values[:, 1:], values[:, :-1]), (values[1:, :], values[:-1, :]))
+
+
+def silhouette_edges(mask):
+    """前景中与背景相邻（4 邻域）的像素"""
+    edges = np.zeros_like(mask)
+    for (b, a), (eb, ea) in zip(_neighbour_pairs(mask), _neighbour_pairs(edges)):
+        boundary = a != b
+        ea |= boundary & a
+        eb |= boundary & b
+    return edges
+
+
+def contour_edges(depth, mask, relative_threshold=0.02):
+    """
+    前景内部的深度跳变：相邻像素深度差超过较近一侧深度的 relative_threshold 倍时，标记较近的像素
+
+    参数:
+        depth: (H, W) 相机空间深度
+        mask: foreground_mask 的结果
+    """
+    edges = np.zeros_like(mask)
+    for (db, da), (mb, ma), (eb, ea) in zip(_neighbour_pairs(depth), _neighbour_pairs(mask), _neighbour_pairs(edges)):
+        both = ma & mb
+        near = np.minimum(da, db)
+        jump = both & (np.abs(da - db) > relative_threshold * near)
+        ea |= jump & (da <= db)
+        eb |= jump & (db < da)
+    return edges
+
+
+def crease_edges(normal, mask, angle_threshold=30.0):
+    """
+    法线夹角超过 angle_threshold(度) 的相邻前景像素，标记左/上一侧
+
+    参数:
+        normal: (H, W, 3) 法线
+    """
+    length = np.linalg.norm(normal, axis=-1, keepdims=True)
+    unit = normal / np.maximum(length, 1e-8)
+    cos_threshold = np.cos(np.radians(angle_threshold))
+    edges = np.zeros_like(mask)
+    for (nb, na), (mb, ma), (_, ea) in zip(_neighbour_pairs(unit), _neighbour_pairs(mask), _neighbour_pairs(edges)):
+        ea |= ma & mb & (np.einsum('...c,...c->...', na, nb) < cos_threshold)
+    return edges
+
+
+def compute_edge_map(depth, normal=None, kinds=EDGE_KINDS, depth_threshold=0.02, normal_angle=30.0):
+    """
+    从深度和法线计算边缘图
+
+    参数:
+        depth: (H, W) 深度
+        normal: (H, W, 3) 法线，为空时不计算折痕
+        kinds: 需要的边缘类型，见 EDGE_KINDS
+
+    返回:
+        (H, W) bool
+    """
+    mask = foreground_mask(depth)
+    edges = np.zeros(depth.shape, dtype=bool)
+    if 'silhouette' in kinds:
+        edges |= silhouette_edges(mask)
+    if 'contour' in kinds:
+        edges |= contour_edges(depth, mask, depth_threshold)
+    if 'crease' in kinds and normal is not None:
+        edges |= crease_edges(normal, mask, normal_angle)
+    return edges
+
+
+def write_edge_map(edges, path):
+    """把边缘图写成 8 位灰度 PNG"""
+    # encode_png 的输入与 Image.pixels 一样自下而上
+    pixels = np.repeat(edges[::-1, :, None].astype(np.float32), 4, axis=-1)
+    return encode_png(pixels, path, color_mode='BW', bit_depth=8)
+
+
+def process_view(depth_path, normal_path, edge_path, kinds=EDGE_KINDS, depth_threshold=0.02, normal_angle=30.0):
+    """读取一个视角的深度/法线 EXR，写出边缘图，返回边缘像素数"""
+    depth = read_exr(depth_path)[..., 0]
+    normal = read_exr(normal_path)[..., :3] if normal_path and os.path.exists(normal_path) else None
+    edges = compute_edge_map(depth, normal, kinds, depth_threshold, normal_angle)
+    write_edge_map(edges, edge_path)
+    return int(edges.sum())
+
+
+def find_views(output_dir, overwrite=False):
+    """列出 depth/ 下有深度 EXR、还没有边缘图的视角: [(depth_path, normal_path, edge_path)]"""
+    depth_dir = os.path.join(output_dir, 'depth')
+    jobs = []
+    for name in sorted(os.listdir(depth_dir)) if os.path.isdir(depth_dir) else []:
+        if not name.lower().endswith('.exr'):
+            continue
+        stem = os.path.splitext(name)[0]
+        edge_path = os.path.join(output_dir, 'edges', f"{stem}.png")
+        if os.path.exists(edge_path) and not overwrite:
+            continue
+        jobs.append((os.path.join(depth_dir, name), os.path.join(output_dir, 'normal', name), edge_path))
+    return jobs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='用深度和法线 EXR 生成边缘图')
+    parser.add_argument('output_dir', help='render_v3.py 的输出目录')
+    parser.add_argument('--kinds', nargs='+', choices=EDGE_KINDS, default=list(EDGE_KINDS), help='边缘类型')
+    parser.add_argument('--depth-threshold', type=float, default=0.02, help='深度跳变的相对阈值')
+    parser.add_argument('--normal-angle', type=float, default=30.0, help='折痕的法线夹角阈值(度)')
+    parser.add_argument('--workers', type=int, default=1, help='并行进程数（在 Blender 中运行时只能为 1）')
+    parser.add_argument('--overwrite', action='store_true', help='重新生成已存在的边缘图')
+    args = parser.parse_args(argv)
+
+    jobs = find_views(args.output_dir, args.overwrite)
+    os.makedirs(os.path.join(args.output_dir, 'edges'), exist_ok=True)
+    options = (args.kinds, args.depth_threshold, args.normal_angle)
+    if args.workers > 1:
+        with ProcessPoolExecutor(args.workers) as pool:
+            futures = [pool.submit(process_view, *job, *options) for job in jobs]
+            counts = [f.result() for f in futures]
+    else:
+        counts = [process_view(*job, *options) for job in jobs]
+    print(f"已生成 {len(counts)} 张边缘图: {os.path.join(args.output_dir, 'edges')}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else None))
@@ -0,0 +1,108 @@
+# HDRI 环境贴图池：一次性加载目录中的所有环境贴图，复用同一个世界节点树，每个视角只替换贴图
+#
+# 可选的缩小缓存：把每张贴图缩小到 max_size 宽后保存为 EXR，之后直接加载缓存。
+# Cycles 每次更换世界贴图都要重新上传贴图并重建重要性采样表，贴图越小越快。
+import os
+import random
+import bpy
+
+HDRI_EXTENSIONS = ('.hdr', '.exr')
+ENVIRONMENT_NODE_NAME = 'HDRIEnvironment'
+
+
+def list_hdri_files(path):
+    """path 为目录时返回其中所有的 .hdr/.exr 文件（按名称排序），为单个文件时返回 [path]"""
+    if os.path.isdir(path):
+        return [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.lower().endswith(HDRI_EXTENSIONS)]
+    if os.path.isfile(path) and path.lower().endswith(HDRI_EXTENSIONS):
+        return [path]
+    return []
+
+
+def cached_hdri_path(cache_dir, path, max_size):
+    """缩小缓存的文件路径，包含源文件的修改时间，源文件改动后自动失效"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}_{max_size}_{int(os.path.getmtime(path))}.exr")
+
+
+def build_downscaled_hdri(path, cached_path, max_size):
+    """把 HDRI 缩小到宽度不超过 max_size（保持比例）后保存为 32 位 EXR，返回缓存路径"""
+    image = bpy.data.images.load(path)
+    try:
+        width, height = image.size
+        if width > max_size:
+            image.scale(max_size, max(1, round(height * max_size / width)))
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+        tmp = f"{cached_path}.{os.getpid()}.tmp.exr"
+        image.filepath_raw = tmp
+        image.file_format = 'OPEN_EXR'
+        image.save()
+        os.replace(tmp, cached_path)
+    finally:
+        bpy.data.images.remove(image)
+    print(f"已生成缩小的 HDRI 缓存: {cached_path}")
+    return cached_path
+
+
+class HdriPool:
+    """
+    预加载的 HDRI 贴图池
+
+    用法:
+        pool = HdriPool(HDRI_DIR)
+        env = pool.setup_world(scene)     # 只创建一次世界节点树
+        pool.apply(env, pool.choose())    # 每个视角只替换贴图
+    """
+
+    def __init__(self, path, cache_dir=None, max_size=None):
+        self.images = []
+        for source in list_hdri_files(path):
+            if cache_dir and max_size:
+                cached = cached_hdri_path(cache_dir, source, max_size)
+                if not os.path.exists(cached):
+                    build_downscaled_hdri(source, cached, max_size)
+                source = cached
+            image = bpy.data.images.load(source, check_existing=True)
+            # 没被世界节点引用的贴图也要保留，不能被数据块回收删除
+            image.use_fake_user = True
+            self.images.append(image)
+        if self.images:
+            print(f"HDRI 池: 已加载 {len(self.images)} 张环境贴图")
+
+    def __len__(self):
+        return len(self.images)
+
+    def choose(self):
+        """随机选择一张贴图，池为空时返回 None"""
+        return random.choice(self.images) if self.images else None
+
+    def setup_world(self, scene):
+        """
+        获取或创建世界节点树：环境贴图 -> 背景 -> 世界输出（模板中已有时直接复用）
+
+        返回:
+            环境贴图节点
+        """
+        world = scene.world or bpy.data.worlds.get('World') or bpy.data.worlds.new('World')
+        scene.world = world
+        world.use_nodes = True
+        node_tree = world.node_tree
+        env_tex = node_tree.nodes.get(ENVIRONMENT_NODE_NAME)
+        if env_tex is not None:
+            return env_tex
+
+        for node in node_tree.nodes:
+            node_tree.nodes.remove(node)
+        env_tex = node_tree.nodes.new('ShaderNodeTexEnvironment')
+        env_tex.name = ENVIRONMENT_NODE_NAME
+        env_out = node_tree.nodes.new('ShaderNodeBackground')
+        output = node_tree.nodes.new('ShaderNodeOutputWorld')
+        node_tree.links.new(env_tex.outputs['Color'], env_out.inputs['Color'])
+        node_tree.links.new(env_out.outputs['Background'], output.inputs['Surface'])
+        return env_tex
+
+    @staticmethod
+    def apply(env_tex, image):
+        """替换环境贴图（与当前相同时不做修改，避免 Cycles 重建重要性采样表）"""
+        if image is not None and env_tex.image != image:
+            env_tex.image = image
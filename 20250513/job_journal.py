@@ -0,0 +1,108 @@
+# 断点续跑日志：只追加的 JSON Lines 文件，记录已完成的 (模型, 视角, 输出类型) 单元
+import json
+import os
+import time
+
+# 每个视角需要完成的输出类型，与 OUTPUT_DIR 下的子目录同名
+JOURNAL_PASSES = ('rgb', 'silhouette', 'caminfo', 'keypoints')
+
+
+def verify_output_file(path, size=None):
+    """
+    检查输出文件是否完整
+
+    参数:
+        path: 文件路径
+        size: 记录时的文件大小，为空时不比较大小
+
+    返回:
+        文件存在、大小一致、图像非空，且 PNG 文件带有结束块时返回 True
+    """
+    try:
+        actual = os.path.getsize(path)
+    except OSError:
+        return False
+    if size is not None and actual != size:
+        return False
+    # 图像不允许为空文件；文本输出（例如没有可见关键点时）可以为空
+    if actual == 0 and path.lower().endswith(('.png', '.exr', '.jpg')):
+        return False
+    # PNG 写到一半时缺少 IEND 结束块
+    if path.lower().endswith('.png'):
+        with open(path, 'rb') as f:
+            f.seek(max(0, actual - 12))
+            if b'IEND' not in f.read():
+                return False
+    return True
+
+
+class JobJournal:
+    """
+    已完成单元的追加日志
+
+    每条记录单独一行，写入后立即 fsync；进程崩溃时最多丢失正在写的那一行，
+    读取时会跳过不完整的行。多个 worker 可以共享同一个日志文件。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.units = {}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.units[(record['model'], record['view'], record['pass'])] = record
+
+    def get(self, model, view, pass_name):
+        """返回单元的记录，没有时返回 None"""
+        return self.units.get((model, view, pass_name))
+
+    def is_complete(self, model, view, pass_name):
+        """单元已记录，且记录中的所有输出文件仍然完整"""
+        record = self.get(model, view, pass_name)
+        if record is None:
+            return False
+        return all(verify_output_file(o['path'], o['size']) for o in record['outputs'])
+
+    def is_view_complete(self, model, view, passes=JOURNAL_PASSES):
+        return all(self.is_complete(model, view, p) for p in passes)
+
+    def is_model_complete(self, model, num_views, passes=JOURNAL_PASSES):
+        return all(self.is_view_complete(model, i, passes) for i in range(num_views))
+
+    def record(self, model, view, pass_name, output_paths, **extra):
+        """
+        记录一个已完成的单元
+
+        参数:
+            model: 模型名
+            view: 视角序号
+            pass_name: 输出类型（见 JOURNAL_PASSES）
+            output_paths: 该单元写出的文件路径列表
+            extra: 其他需要保存的信息（例如 RGB 单元的相机参数）
+
+        返回:
+            所有输出文件都完整并已写入日志时返回 True
+        """
+        outputs = []
+        for path in output_paths:
+            if not verify_output_file(path):
+                print(f"警告: 输出文件不完整，未写入日志: {path}")
+                return False
+            outputs.append({'path': path, 'size': os.path.getsize(path)})
+
+        record = {'model': model, 'view': view, 'pass': pass_name, 'outputs': outputs, 'time': time.time(), **extra}
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        # 单次 O_APPEND 写入，多个进程同时追加时各行不会交错
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self.units[(model, view, pass_name)] = record
+        return True
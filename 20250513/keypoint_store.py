@@ -0,0 +1,108 @@
+# 关键点合并存储：把一个模型所有视角的可见关键点写进一个压缩 .npz，训练时一次读入
+#
+# 文件内容:
+#   vertex_index  (K,) int32    可见顶点序号
+#   pixel         (K, 2) float32 像素坐标(与 txt 相同，原点在左下角)
+#   depth         (K,) float32  相机空间深度
+#   views         (V,) int32    视角序号
+#   view_offsets  (V + 1,) int64 第 k 个视角的数据为 [view_offsets[k], view_offsets[k + 1])
+#   resolution    (2,) int32    渲染分辨率
+import os
+import zipfile
+import numpy as np
+
+
+class KeypointAccumulator:
+    """累积一个模型各视角的可见关键点，模型处理完后一次写出"""
+
+    def __init__(self, model, resolution=None, stored_views=()):
+        self.model = model
+        self.resolution = resolution
+        self.views = {}
+        # 已写入现有 .npz 的视角，save() 合并时保留，不需要重新累积
+        self.stored_views = set(stored_views)
+
+    def __len__(self):
+        return len(self.views)
+
+    def add(self, view, vertex_index, pixel, depth):
+        self.views[int(view)] = (np.asarray(vertex_index, dtype=np.int32),
+                                 np.asarray(pixel, dtype=np.float32).reshape(-1, 2),
+                                 np.asarray(depth, dtype=np.float32))
+
+    def save(self, path, merge_existing=True):
+        """
+        写出 .npz（先写临时文件再改名）
+
+        参数:
+            path: 输出路径
+            merge_existing: 文件已存在时保留其中本次没有重新计算的视角
+
+        返回:
+            写出的视角序号列表
+        """
+        views = dict(self.views)
+        resolution = self.resolution
+        if merge_existing and os.path.exists(path):
+            try:
+                existing = load_keypoints(path)
+            except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+                existing = {}
+            for view, data in existing.items():
+                if view != 'resolution':
+                    views.setdefault(view, data)
+            if resolution is None and 'resolution' in existing:
+                resolution = existing['resolution']
+
+        order = sorted(views)
+        counts = [len(views[v][0]) for v in order]
+        offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        def concat(k, shape, dtype):
+            parts = [views[v][k] for v in order]
+            return np.concatenate(parts).astype(dtype) if parts else np.zeros(shape, dtype=dtype)
+
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(
+            tmp,
+            vertex_index=concat(0, (0,), np.int32),
+            pixel=concat(1, (0, 2), np.float32),
+            depth=concat(2, (0,), np.float32),
+            views=np.array(order, dtype=np.int32),
+            view_offsets=offsets,
+            resolution=np.array(resolution if resolution is not None else (0, 0), dtype=np.int32),
+        )
+        os.replace(tmp, path)
+        return order
+
+
+def stored_views(path):
+    """
+    合并的关键点文件中已有的视角序号（只读取 views 数组）；文件不存在或损坏时返回空集合
+
+    断点续跑时用它判断 .npz 是否已包含某个视角，而不是比较文件大小：
+    .npz 每次合并写出后大小都会变化，但已写入的视角仍然有效。
+    """
+    try:
+        with np.load(path) as data:
+            return {int(v) for v in data['views']}
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        return set()
+
+
+def load_keypoints(path):
+    """
+    读取合并的关键点文件
+
+    返回:
+        {视角序号: (vertex_index, pixel, depth), 'resolution': (res_x, res_y)}
+    """
+    with np.load(path) as data:
+        offsets = data['view_offsets']
+        result = {}
+        for k, view in enumerate(data['views']):
+            s, e = offsets[k], offsets[k + 1]
+            result[int(view)] = (data['vertex_index'][s:e], data['pixel'][s:e], data['depth'][s:e])
+        result['resolution'] = tuple(int(v) for v in data['resolution'])
+    return result
@@ -0,0 +1,315 @@
+# 关键点投影工具：用 NumPy 一次性完成顶点的相机投影
+import bpy
+import bmesh
+import numpy as np
+from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+
+
+def get_mesh_vertices_world(obj):
+    """
+    用 foreach_get 一次性取出网格顶点，并变换到世界空间
+
+    参数:
+        obj: 网格对象
+
+    返回:
+        (N, 3) float64 世界坐标数组
+    """
+    mesh = obj.data
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', co)
+    co = co.reshape(-1, 3).astype(np.float64)
+
+    mat = np.array(obj.matrix_world, dtype=np.float64)
+    return co @ mat[:3, :3].T + mat[:3, 3]
+
+
+def get_vertex_normals_world(obj):
+    """
+    用 foreach_get 取出顶点法线并变换到世界空间
+
+    返回:
+        (N, 3) float64 单位法线数组
+    """
+    mesh = obj.data
+    normals = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('normal', normals)
+    normals = normals.reshape(-1, 3).astype(np.float64)
+
+    # 法线需要用逆转置矩阵变换
+    normal_mat = np.array(obj.matrix_world.to_3x3().inverted_safe().transposed(), dtype=np.float64)
+    normals = normals @ normal_mat.T
+    normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+    return normals
+
+
+def get_hull_vertices_world(obj, verts_world=None):
+    """
+    模型凸包顶点的世界坐标，用于相机取景（画面和近裁剪面的约束对凸包顶点成立即对所有顶点成立）
+
+    凸包由 bmesh.ops.convex_hull 计算；网格退化（如共面）无法求凸包时，返回包围盒的 8 个角点，
+    结果偏保守但仍能保证整个模型在画面内。
+
+    参数:
+        obj: 网格对象
+        verts_world: 已取出的顶点世界坐标，为空时重新读取
+
+    返回:
+        (M, 3) float64 世界坐标数组
+    """
+    bm = bmesh.new()
+    try:
+        bm.from_mesh(obj.data)
+        bm.verts.index_update()
+        try:
+            result = bmesh.ops.convex_hull(bm, input=bm.verts[:])
+            index = sorted({v.index for v in result['geom'] if isinstance(v, bmesh.types.BMVert)})
+        except (RuntimeError, ValueError):
+            index = []
+    finally:
+        bm.free()
+
+    if len(index) < 4:
+        mat = np.array(obj.matrix_world, dtype=np.float64)
+        return np.array(obj.bound_box, dtype=np.float64) @ mat[:3, :3].T + mat[:3, 3]
+    if verts_world is None:
+        verts_world = get_mesh_vertices_world(obj)
+    return verts_world[np.array(index, dtype=np.int64)]
+
+
+def get_camera_matrices(scene, cam, depsgraph=None):
+    """
+    获取相机的视图矩阵和投影矩阵（包含约束的影响）
+
+    参数:
+        scene: 当前场景
+        cam: 相机对象
+        depsgraph: 已求值的依赖图，为空时自动获取
+
+    返回:
+        (view, projection) 两个 4x4 float64 数组
+    """
+    if depsgraph is None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+    cam_eval = cam.evaluated_get(depsgraph)
+    render = scene.render
+
+    view = np.array(cam_eval.matrix_world.normalized().inverted(), dtype=np.float64)
+    projection = np.array(cam_eval.calc_matrix_camera(
+        depsgraph,
+        x=render.resolution_x,
+        y=render.resolution_y,
+        scale_x=render.pixel_aspect_x,
+        scale_y=render.pixel_aspect_y,
+    ), dtype=np.float64)
+    return view, projection
+
+
+def get_camera_intrinsics(scene, cam):
+    """
+    由焦距、传感器尺寸、传感器适配方式、镜头偏移和分辨率计算相机内参矩阵 K
+
+    使用 OpenCV 约定：像素原点在图像左上角，v 轴向下。
+
+    返回:
+        (3, 3) float64 数组
+    """
+    data = cam.data
+    render = scene.render
+    scale = render.resolution_percentage / 100.0
+    res_x = render.resolution_x * scale
+    res_y = render.resolution_y * scale
+    pixel_aspect = render.pixel_aspect_y / render.pixel_aspect_x
+
+    fit = data.sensor_fit
+    sensor = data.sensor_height if fit == 'VERTICAL' else data.sensor_width
+    if fit == 'AUTO':
+        fit = 'HORIZONTAL' if res_x * render.pixel_aspect_x >= res_y * render.pixel_aspect_y else 'VERTICAL'
+    view_fac = res_x if fit == 'HORIZONTAL' else pixel_aspect * res_y
+
+    focal = data.lens / sensor * view_fac
+    return np.array([
+        [focal, 0.0, res_x / 2.0 - data.shift_x * view_fac],
+        [0.0, focal / pixel_aspect, res_y / 2.0 + data.shift_y * view_fac / pixel_aspect],
+        [0.0, 0.0, 1.0],
+    ], dtype=np.float64)
+
+
+def get_camera_extrinsics(cam, depsgraph=None):
+    """
+    世界坐标 -> 相机坐标的 4x4 外参矩阵（包含约束的影响），OpenCV 约定：相机 +Z 朝前、+Y 朝下
+
+    返回:
+        (4, 4) float64 数组
+    """
+    if depsgraph is None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+    cam_eval = cam.evaluated_get(depsgraph)
+    view = np.array(cam_eval.matrix_world.normalized().inverted(), dtype=np.float64)
+    # Blender 相机 -Z 朝前、+Y 朝上，翻转 Y、Z 轴得到 OpenCV 相机坐标
+    return np.diag([1.0, -1.0, -1.0, 1.0]) @ view
+
+
+def project_points(points_world, view_matrices, projection_matrices, res_x, res_y):
+    """
+    把世界坐标点批量投影到一个或多个相机
+
+    结果与逐点调用 world_to_camera_view 一致：归一化坐标以左下角为原点，
+    depth 为沿相机视线方向的距离。
+
+    参数:
+        points_world: (N, 3) 世界坐标
+        view_matrices: (4, 4) 或 (V, 4, 4) 视图矩阵（世界 -> 相机）
+        projection_matrices: (4, 4) 或 (V, 4, 4) 投影矩阵
+        res_x, res_y: 输出图像的像素分辨率
+
+    返回:
+        字典，各数组第一维为视角数 V:
+            'uv'        - (V, N, 2) 归一化相机平面坐标
+            'pixel'     - (V, N, 2) 像素坐标 (int64)
+            'depth'     - (V, N) 相机空间深度
+            'in_frustum'- (V, N) 是否落在画面内且位于相机前方
+    """
+    view = np.asarray(view_matrices, dtype=np.float64).reshape(-1, 4, 4)
+    proj = np.asarray(projection_matrices, dtype=np.float64).reshape(-1, 4, 4)
+    points = np.asarray(points_world, dtype=np.float64)
+    points_h = np.concatenate([points, np.ones((len(points), 1))], axis=1)
+
+    # (V, N, 4)：相机空间坐标与裁剪空间坐标
+    cam_space = np.einsum('vij,nj->vni', view, points_h)
+    clip = np.einsum('vij,vnj->vni', proj, cam_space)
+
+    w = clip[..., 3]
+    w = np.where(np.abs(w) < 1e-12, 1e-12, w)
+    uv = (clip[..., :2] / w[..., None] + 1.0) * 0.5
+    depth = -cam_space[..., 2]
+
+    pixel = np.rint(uv * np.array([res_x, res_y], dtype=np.float64)).astype(np.int64)
+    in_frustum = (
+        (uv[..., 0] >= 0.0) & (uv[..., 0] <= 1.0) &
+        (uv[..., 1] >= 0.0) & (uv[..., 1] <= 1.0) &
+        (depth >= 0.0)
+    )
+
+    return {
+        'uv': uv,
+        'pixel': pixel,
+        'depth': depth,
+        'in_frustum': in_frustum,
+    }
+
+
+def get_render_resolution(scene):
+    """返回考虑百分比缩放后的实际渲染分辨率 (res_x, res_y)"""
+    render = scene.render
+    res_x = int(render.resolution_x * render.resolution_percentage / 100.0)
+    res_y = int(render.resolution_y * render.resolution_percentage / 100.0)
+    return res_x, res_y
+
+
+def visible_by_scene_ray_cast(scene, depsgraph, verts_world, cam_location, candidates, visibility_threshold=0.2):
+    """
+    旧的可见性检查：对每个候选顶点调用一次 scene.ray_cast
+
+    返回:
+        候选顶点中可见的那部分索引
+    """
+    cam_location = Vector(cam_location)
+    visible = []
+    for i in candidates:
+        v = Vector(verts_world[i])
+        result, hit_loc, _, _, _, _ = scene.ray_cast(
+            depsgraph, cam_location, (v - cam_location).normalized()
+        )
+        if result and (v - hit_loc).length < visibility_threshold:
+            visible.append(i)
+    return np.asarray(visible, dtype=np.int64)
+
+
+class OcclusionEngine:
+    """
+    单个模型的遮挡检测器
+
+    BVH 在世界空间中构建一次，模型的所有视角共用。射线方向、背面剔除和命中距离判断用 NumPy 数组计算；
+    射线求交仍是逐条调用 BVHTree.ray_cast（Python 循环），循环内复用同一个方向向量，
+    并把搜索距离限制在 顶点距离 + 阈值 以内，远处的三角形不再参与求交。
+    """
+
+    def __init__(self, obj, verts_world=None):
+        mesh = obj.data
+        if verts_world is None:
+            verts_world = get_mesh_vertices_world(obj)
+
+        loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', loop_verts)
+        loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get('loop_start', loop_starts)
+        polygons = np.split(loop_verts, loop_starts[1:]) if len(loop_starts) else []
+
+        self.verts_world = verts_world
+        self.normals_world = get_vertex_normals_world(obj)
+        self.bvh = BVHTree.FromPolygons(verts_world.tolist(), [p.tolist() for p in polygons])
+
+    def visible(self, cam_location, candidates, visibility_threshold=0.2, backface_cull=True, backface_epsilon=0.1):
+        """
+        批量判断候选顶点是否可见
+
+        参数:
+            cam_location: 相机世界坐标
+            candidates: 候选顶点索引（通常是视锥内的顶点）
+            visibility_threshold: 射线命中点与顶点的距离阈值
+            backface_cull: 是否先用顶点法线剔除背向相机的顶点
+            backface_epsilon: 背面剔除的余弦容差，避免误删轮廓附近的顶点
+
+        返回:
+            候选顶点中可见的那部分索引
+        """
+        candidates = np.asarray(candidates, dtype=np.int64)
+        origin = np.asarray(cam_location, dtype=np.float64)
+
+        to_vert = self.verts_world[candidates] - origin
+        dist = np.linalg.norm(to_vert, axis=1)
+        dirs = to_vert / np.maximum(dist, 1e-12)[:, None]
+
+        # 背面剔除：法线与视线同向的顶点不可能被看到
+        if backface_cull:
+            facing = np.einsum('ij,ij->i', self.normals_world[candidates], -dirs) > -backface_epsilon
+            candidates, dist, dirs = candidates[facing], dist[facing], dirs[facing]
+
+        # 只保留最近命中距离，最后统一做阈值比较。命中点比 顶点距离 + 阈值 更远时顶点必然不可见，
+        # 因此射线只搜索到这个距离，超出范围按未命中处理，结果与不限距离时相同
+        hit_dist = np.full(len(candidates), np.inf)
+        origin_vec = Vector(origin)
+        direction = Vector((0.0, 0.0, 0.0))
+        ray_cast = self.bvh.ray_cast
+        for k, (d, limit) in enumerate(zip(dirs.tolist(), (dist + visibility_threshold).tolist())):
+            direction[:] = d
+            hit = ray_cast(origin_vec, direction, limit)
+            if hit[0] is not None:
+                hit_dist[k] = hit[3]
+
+        visible = np.abs(dist - hit_dist) < visibility_threshold
+        return candidates[visible]
+
+
+# 按对象缓存的遮挡检测器，模型删除前需调用 release_occlusion_engine
+_occlusion_engines = {}
+
+
+def get_occlusion_engine(obj, verts_world=None):
+    """获取（必要时构建）对象的遮挡检测器"""
+    key = obj.as_pointer()
+    engine = _occlusion_engines.get(key)
+    if engine is None:
+        engine = OcclusionEngine(obj, verts_world)
+        _occlusion_engines[key] = engine
+    return engine
+
+
+def release_occlusion_engine(obj=None):
+    """释放对象的遮挡检测器缓存，obj 为空时全部释放"""
+    if obj is None:
+        _occlusion_engines.clear()
+    else:
+        _occlusion_engines.pop(obj.as_pointer(), None)
@@ -0,0 +1,216 @@
+# render_v3 多进程分片启动器
+#
+# 把 PLY 列表切成 N 份，每份启动一个 blender -b --python render_v3.py 的 worker。
+# 各 worker 共同追加写入 camera_params.jsonl，结束后汇总进度记录、导出 camera_params.json 并合并相机矩阵清单。
+# 用普通 Python 运行即可，不需要 bpy。
+#
+# 用法:
+#   python launch_render.py --blender /path/to/blender --input-dir models --output-dir render --workers 4
+#   加 --template render_template.blend 时 worker 从预生成的模板启动，不再每次重建场景
+#   加 --calibrate 先校准本机的 worker 数/线程数，结果写入 render_profile.json，之后的运行不指定 --workers 时自动沿用
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from render_profile import DEFAULT_PROFILE_FILE, calibrate, load_profile
+from tracing import merge_chrome_traces
+from camera_store import CameraParamStore
+from camera_manifest import build_camera_manifest
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RENDER_SCRIPT = os.path.join(SCRIPT_DIR, 'render_v3.py')
+
+
+def split_shards(input_dir, ply_files, num_shards):
+    """
+    按文件大小把 PLY 列表均衡地分成若干份（最大的文件先分给当前最轻的分片）
+
+    返回:
+        长度为 num_shards 的列表，每项为该分片的文件名列表（空分片会被去掉）
+    """
+    shards = [[] for _ in range(num_shards)]
+    loads = [0] * num_shards
+    sizes = {f: os.path.getsize(os.path.join(input_dir, f)) for f in ply_files}
+    for f in sorted(ply_files, key=lambda name: sizes[name], reverse=True):
+        k = loads.index(min(loads))
+        shards[k].append(f)
+        loads[k] += sizes[f]
+    return [sorted(shard) for shard in shards if shard]
+
+
+def build_worker_command(args, models, threads, camera_params_file, progress_file, trace_file=None):
+    """生成单个 worker 的 Blender 命令行"""
+    cmd = [args.blender, '-b']
+    if args.template:
+        cmd.append(args.template)
+    cmd += ['-t', str(threads), '--python', RENDER_SCRIPT, '--',
+           '--input-dir', args.input_dir,
+           '--output-dir', args.output_dir,
+           '--camera-params-file', camera_params_file,
+           '--progress-file', progress_file,
+           '--threads', str(threads),
+           '--device', args.device,
+           '--no-camera-manifest-build',
+           '--models', *models]
+    if args.views:
+        cmd += ['--views', str(args.views)]
+    if args.mesh_cache_dir:
+        cmd += ['--mesh-cache-dir', args.mesh_cache_dir]
+    if trace_file:
+        cmd += ['--trace', trace_file]
+    return cmd
+
+
+def bake_template(args):
+    """运行一次 render_v3.py 生成渲染模板 .blend，worker 启动时直接打开它"""
+    cmd = [args.blender, '-b', '--python', RENDER_SCRIPT, '--',
+           '--output-dir', args.output_dir,
+           '--bake-template', args.template]
+    print(f"生成渲染模板: {args.template}")
+    subprocess.run(cmd, check=True)
+
+
+def pin_to_cpus(cpus):
+    """返回把子进程绑定到指定 CPU 核心的 preexec_fn（仅 Linux 支持）"""
+    if not cpus or not hasattr(os, 'sched_setaffinity'):
+        return None
+
+    def _pin():
+        os.sched_setaffinity(0, cpus)
+    return _pin
+
+
+def read_progress(progress_file):
+    """读取 worker 的进度记录，忽略写了一半的最后一行"""
+    records = []
+    if not os.path.exists(progress_file):
+        return records
+    with open(progress_file, 'r') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                pass
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='render_v3 多进程分片启动器')
+    parser.add_argument('--blender', default='blender', help='Blender 可执行文件路径')
+    parser.add_argument('--input-dir', required=True, help='PLY 文件夹')
+    parser.add_argument('--output-dir', required=True, help='渲染结果输出文件夹')
+    parser.add_argument('--workers', type=int, help='并行的 Blender 进程数，默认使用校准配置，没有配置时为 2')
+    parser.add_argument('--threads-per-worker', type=int, help='每个 worker 的线程数，默认平分 CPU 核心')
+    parser.add_argument('--views', type=int, help='每个模型渲染视角数，默认使用 render_v3.py 的配置')
+    parser.add_argument('--mesh-cache-dir', help='所有 worker 共用的预处理网格缓存目录')
+    parser.add_argument('--template', help='渲染模板 .blend 路径，不存在时先生成')
+    parser.add_argument('--rebuild-template', action='store_true', help='重新生成渲染模板')
+    parser.add_argument('--device', default='AUTO', choices=('AUTO', 'GPU', 'CPU'), help='渲染设备，AUTO 时没有 GPU 则用 CPU')
+    parser.add_argument('--profile', default=DEFAULT_PROFILE_FILE, help='本机校准配置文件')
+    parser.add_argument('--calibrate', action='store_true', help='重新校准 worker 数和线程数并写入配置文件')
+    parser.add_argument('--trace', action='store_true', help='各 worker 记录 trace，结束后合并为 trace.json')
+    parser.add_argument('--no-pin', action='store_true', help='不绑定 CPU 核心')
+    args = parser.parse_args(argv)
+
+    args.input_dir = os.path.abspath(args.input_dir)
+    args.output_dir = os.path.abspath(args.output_dir)
+    shard_dir = os.path.join(args.output_dir, 'shards')
+    os.makedirs(shard_dir, exist_ok=True)
+    # 所有 worker 共享的相机参数存储（只追加，支持并发写入）
+    camera_params_file = os.path.join(args.output_dir, 'camera_params.jsonl')
+    CameraParamStore(camera_params_file)
+    if args.template:
+        args.template = os.path.abspath(args.template)
+        if args.rebuild_template or not os.path.exists(args.template):
+            bake_template(args)
+
+    # 校准配置：显式指定 --workers / --threads-per-worker 时以命令行为准
+    profile = calibrate(args.blender, args.profile, device=args.device) if args.calibrate else load_profile(args.profile)
+    num_workers = args.workers or (profile['workers'] if profile else 2)
+    if profile and not args.workers:
+        print(f"使用校准配置 {args.profile}: {profile['workers']} worker x {profile['threads']} 线程 ({profile['device']})")
+
+    ply_files = [f for f in os.listdir(args.input_dir) if f.lower().endswith('.ply')]
+    shards = split_shards(args.input_dir, ply_files, max(1, num_workers))
+    cpu_count = os.cpu_count() or 1
+    if args.threads_per_worker:
+        threads = args.threads_per_worker
+    elif profile and not args.workers and len(shards) == profile['workers']:
+        threads = profile['threads']
+    else:
+        threads = max(1, cpu_count // len(shards))
+    print(f"{len(ply_files)} 个模型分成 {len(shards)} 份，每个 worker {threads} 线程")
+
+    workers = []
+    for k, models in enumerate(shards):
+        progress_file = os.path.join(shard_dir, f'progress_{k:02d}.jsonl')
+        log_file = os.path.join(shard_dir, f'worker_{k:02d}.log')
+        trace_file = os.path.join(shard_dir, f'trace_{k:02d}.json') if args.trace else None
+        for path in (progress_file, trace_file):
+            if path is None:
+                continue
+            if os.path.exists(path):
+                os.remove(path)
+
+        cpus = None
+        if not args.no_pin and (k + 1) * threads <= cpu_count:
+            cpus = set(range(k * threads, (k + 1) * threads))
+
+        env = dict(os.environ, OMP_NUM_THREADS=str(threads))
+        log = open(log_file, 'w')
+        proc = subprocess.Popen(build_worker_command(args, models, threads, camera_params_file, progress_file, trace_file),
+                                stdout=log, stderr=subprocess.STDOUT, env=env, preexec_fn=pin_to_cpus(cpus))
+        workers.append({
+            'index': k,
+            'models': models,
+            'process': proc,
+            'log': log,
+            'log_file': log_file,
+            'progress_file': progress_file,
+            'trace_file': trace_file,
+            'start': time.time(),
+        })
+
+    # 轮询各 worker 的进度文件，汇总显示
+    total_models = len(ply_files)
+    while any(w['process'].poll() is None for w in workers):
+        done = sum(1 for w in workers for r in read_progress(w['progress_file']) if r.get('event') == 'model')
+        print(f"\r已完成模型 {done}/{total_models}", end='')
+        time.sleep(2)
+    print()
+
+    summary = {'output_dir': args.output_dir, 'threads_per_worker': threads, 'workers': []}
+    for w in workers:
+        w['log'].close()
+        records = read_progress(w['progress_file'])
+        summary['workers'].append({
+            'index': w['index'],
+            'returncode': w['process'].returncode,
+            'seconds': time.time() - w['start'],
+            'models': w['models'],
+            'completed_models': [r['model'] for r in records if r.get('event') == 'model'],
+            'log_file': w['log_file'],
+            'progress': records,
+        })
+        if w['process'].returncode != 0:
+            print(f"worker {w['index']} 异常退出 (返回码 {w['process'].returncode})，日志: {w['log_file']}")
+
+    merged = CameraParamStore(camera_params_file).export_json(os.path.join(args.output_dir, 'camera_params.json'))
+    build_camera_manifest(os.path.join(args.output_dir, 'camera_manifest'))
+    with open(os.path.join(args.output_dir, 'run_summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    if args.trace:
+        trace_path = os.path.join(args.output_dir, 'trace.json')
+        count = merge_chrome_traces([w['trace_file'] for w in workers], trace_path)
+        print(f"已合并 {count} 个 trace 事件: {trace_path}")
+
+    completed = sum(len(w['completed_models']) for w in summary['workers'])
+    print(f"完成 {completed}/{total_models} 个模型，相机参数 {len(merged)} 条，汇总: run_summary.json")
+    return 0 if all(w['returncode'] == 0 for w in summary['workers']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# 固定数量的灯光组：只创建一次，每个视角原地随机位置、强度、颜色和启用数量
+#
+# 不再每个视角新建/删除灯光对象，数据块数量不变，持久数据模式下也不需要重新同步场景。
+# 随机数由 (种子, 模型, 视角) 决定，同一模型的同一视角总是得到相同的灯光。
+import random
+import zlib
+import bpy
+
+RIG_LIGHT_PREFIX = 'RigLight'
+
+
+def view_rng(seed, model, view):
+    """返回 (seed, model, view) 对应的独立随机数生成器（不受全局 random 状态和调用顺序影响）"""
+    return random.Random(zlib.crc32(f"{seed}:{model}:{view}".encode('utf-8')))
+
+
+class LightRig:
+    """
+    点光源组
+
+    用法:
+        rig = LightRig(scene, size=3)
+        rig.randomize(view_rng(seed, 'a_11', 0))
+    """
+
+    def __init__(self, scene, size=3, min_lights=1, energy_range=(500, 1500), color_jitter=0.1):
+        self.size = size
+        self.min_lights = max(0, min(min_lights, size))
+        self.energy_range = energy_range
+        self.color_jitter = color_jitter
+        self.lights = []
+        for k in range(size):
+            name = f"{RIG_LIGHT_PREFIX}_{k}"
+            # 模板或上一次运行中已有时直接复用
+            light = bpy.data.objects.get(name)
+            if light is None:
+                light_data = bpy.data.lights.get(name) or bpy.data.lights.new(name=name, type='POINT')
+                light = bpy.data.objects.new(name=name, object_data=light_data)
+            if light.name not in scene.collection.objects:
+                scene.collection.objects.link(light)
+            self.lights.append(light)
+
+    def randomize(self, rng):
+        """
+        原地随机灯光：启用数量、位置、强度和颜色
+
+        未启用的灯光把强度设为 0，而不是隐藏对象，避免改变场景中的对象集合。
+
+        返回:
+            启用的灯光数量
+        """
+        count = rng.randint(self.min_lights, self.size)
+        for k, light in enumerate(self.lights):
+            light.location = (rng.uniform(-1, 1), rng.uniform(-1, 1), rng.uniform(0.5, 2))
+            energy = rng.uniform(*self.energy_range)
+            light.data.energy = energy if k < count else 0.0
+            light.data.color = tuple(rng.uniform(1.0 - self.color_jitter, 1.0) for _ in range(3))
+        return count
+
+    def keyframe(self, frame):
+        """把所有灯光的当前状态记录为第 frame 帧的关键帧"""
+        for light in self.lights:
+            light.keyframe_insert('location', frame=frame)
+            light.data.keyframe_insert('energy', frame=frame)
+            light.data.keyframe_insert('color', frame=frame)
+
+    def datablocks(self):
+        """灯光对象和灯光数据，用于设置关键帧插值或清除动画"""
+        return [d for light in self.lights for d in (light, light.data)]
@@ -0,0 +1,164 @@
+# 预处理网格缓存：按 PLY 内容哈希保存居中后的顶点、面、颜色和包围数据，读取时使用内存映射
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+
+CACHE_ARRAYS = ('vertices', 'colors', 'face_indices', 'face_sizes')
+
+
+def hash_file(filepath, chunk_size=1 << 20):
+    """计算文件内容的 SHA1"""
+    h = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class MeshCache:
+    """
+    以内容哈希为键的 .npy 缓存目录
+
+    目录结构:
+        index.json              源文件 (路径, 大小, mtime) -> 内容哈希，文件未改动时不必重新计算哈希
+        <hash>-<variant>/       一个缓存条目: 各数组的 .npy 文件和 meta.json
+    条目的 meta.json 修改时间即最近使用时间，总大小超过上限时按 LRU 淘汰。
+    """
+
+    def __init__(self, cache_dir, max_bytes=10 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_file = os.path.join(cache_dir, 'index.json')
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self._read_index()
+
+    def _read_index(self):
+        """读取磁盘上的 index.json；不存在或损坏时返回空字典"""
+        if not os.path.exists(self.index_file):
+            return {}
+        try:
+            with open(self.index_file, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def key_for(self, filepath):
+        """
+        返回文件的内容哈希；大小和 mtime 与记录一致时直接复用
+
+        多个分片进程共享同一个缓存目录：内存中没有记录时先重新读取 index.json（可能已由其他进程算过），
+        写回前也重新读取并合并，不覆盖其他进程写入的记录。
+        """
+        path = os.path.abspath(filepath)
+        stat = os.stat(path)
+
+        def lookup():
+            entry = self.index.get(path)
+            if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                return entry['hash']
+            return None
+
+        digest = lookup()
+        if digest is None:
+            self.index.update(self._read_index())
+            digest = lookup()
+        if digest is not None:
+            return digest
+
+        digest = hash_file(path)
+        self.index = self._read_index()
+        self.index[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest}
+        tmp = f"{self.index_file}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.index_file)
+        return digest
+
+    def _entry_dir(self, key, variant):
+        return os.path.join(self.cache_dir, f"{key}-{variant}")
+
+    def load(self, filepath, variant='centered'):
+        """
+        读取缓存条目
+
+        返回:
+            (arrays, meta)，数组为写时复制的内存映射；未命中时返回 None
+        """
+        entry = self._entry_dir(self.key_for(filepath), variant)
+        meta_file = os.path.join(entry, 'meta.json')
+        if not os.path.exists(meta_file):
+            return None
+        try:
+            with open(meta_file, 'r') as f:
+                meta = json.load(f)
+            arrays = {}
+            for name in CACHE_ARRAYS:
+                path = os.path.join(entry, f"{name}.npy")
+                arrays[name] = np.load(path, mmap_mode='c') if os.path.exists(path) else None
+        except (OSError, ValueError):
+            return None
+        os.utime(meta_file)
+        return arrays, meta
+
+    def store(self, filepath, arrays, meta, variant='centered'):
+        """写入缓存条目（先写临时目录再改名，避免留下不完整的条目）"""
+        entry = self._entry_dir(self.key_for(filepath), variant)
+        tmp = f"{entry}.{os.getpid()}.tmp"
+        os.makedirs(tmp, exist_ok=True)
+        for name in CACHE_ARRAYS:
+            if arrays.get(name) is not None:
+                np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(arrays[name]))
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(dict(meta, source=os.path.abspath(filepath)), f, indent=2)
+        try:
+            os.replace(tmp, entry)
+        except OSError:
+            # 其他进程已经写入了同一条目
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict(keep=entry)
+
+    def get_or_create(self, filepath, build, variant='centered'):
+        """
+        命中时返回缓存，否则调用 build() 生成 (arrays, meta) 并写入缓存
+
+        返回:
+            (arrays, meta)
+        """
+        cached = self.load(filepath, variant)
+        if cached is not None:
+            return cached
+        arrays, meta = build()
+        self.store(filepath, arrays, meta, variant)
+        return arrays, meta
+
+    def evict(self, keep=None):
+        """总大小超过上限时，按最近使用时间从旧到新删除条目（keep 指定的条目除外）"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            # <条目>.<pid>.tmp 是其他进程正在写入的条目，不能删除
+            if name.endswith('.tmp'):
+                continue
+            entry = os.path.join(self.cache_dir, name)
+            meta_file = os.path.join(entry, 'meta.json')
+            if not os.path.isdir(entry) or not os.path.exists(meta_file):
+                continue
+            try:
+                size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+                mtime = os.path.getmtime(meta_file)
+            except OSError:
+                # 条目在统计期间被其他进程淘汰
+                continue
+            entries.append((mtime, size, entry))
+            total += size
+
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            print(f"网格缓存已淘汰: {os.path.basename(entry)}")
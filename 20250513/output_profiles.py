@@ -0,0 +1,103 @@
+# 输出精度与编码配置：按通道设置 File Output 节点的格式、位深和 EXR 压缩方式
+#
+# 每个配置为 {通道: 格式设置}，通道名与 render_v3.py 的合成节点对应:
+#   depth       DepthOutput 节点(Z 通道)
+#   normal      NormalOutput 节点(法线通道)
+#   silhouette  SilhouetteOutput 节点(遮罩 / ID)
+# 多层 EXR 节点所有图层共用一种位深，使用配置中的 multilayer 项。
+# 每项都显式给出 color_mode，不沿用节点或渲染设置中原有的值。深度在 FULL 中为 'RGBA'，与原来 File Output 节点
+# 的默认值一致，文件中仍有 R/G/B/A 通道；其余配置为单通道 'BW'，EXR 中只有 Y 通道（按 exr['R'] 读取的程序需改为 Y）。
+#
+# EXR 压缩方式: 'NONE' 不压缩(写入最快、文件最大); 'ZIP' 无损; 'PIZ' 无损，对噪声多的图像更小;
+# 'DWAA' 有损，只适合法线这类对精度不敏感的通道，深度不要使用。
+# 导入本模块不需要 bpy。
+
+OUTPUT_PROFILES = {
+    # 全精度：与 20250318/test.py 的 32 位浮点 + ZIP 一致
+    'FULL': {
+        'depth': {'file_format': 'OPEN_EXR', 'color_depth': '32', 'exr_codec': 'ZIP', 'color_mode': 'RGBA'},
+        'normal': {'file_format': 'OPEN_EXR', 'color_depth': '32', 'exr_codec': 'ZIP', 'color_mode': 'RGB'},
+        'silhouette': {'file_format': 'PNG', 'color_depth': '8', 'color_mode': 'BW', 'compression': 15},
+        'multilayer': {'file_format': 'OPEN_EXR_MULTILAYER', 'color_depth': '32', 'exr_codec': 'ZIP'},
+    },
+    # 深度保持 32 位，法线用半精度浮点
+    'BALANCED': {
+        'depth': {'file_format': 'OPEN_EXR', 'color_depth': '32', 'exr_codec': 'ZIP', 'color_mode': 'BW'},
+        'normal': {'file_format': 'OPEN_EXR', 'color_depth': '16', 'exr_codec': 'ZIP', 'color_mode': 'RGB'},
+        'silhouette': {'file_format': 'PNG', 'color_depth': '8', 'color_mode': 'BW', 'compression': 15},
+        'multilayer': {'file_format': 'OPEN_EXR_MULTILAYER', 'color_depth': '32', 'exr_codec': 'ZIP'},
+    },
+    # 最小文件：法线用有损 DWAA，深度用 PIZ
+    'COMPACT': {
+        'depth': {'file_format': 'OPEN_EXR', 'color_depth': '32', 'exr_codec': 'PIZ', 'color_mode': 'BW'},
+        'normal': {'file_format': 'OPEN_EXR', 'color_depth': '16', 'exr_codec': 'DWAA', 'color_mode': 'RGB'},
+        'silhouette': {'file_format': 'PNG', 'color_depth': '8', 'color_mode': 'BW', 'compression': 90},
+        'multilayer': {'file_format': 'OPEN_EXR_MULTILAYER', 'color_depth': '16', 'exr_codec': 'PIZ'},
+    },
+    # 最快写入：不压缩，适合本地高速盘上的临时数据
+    'FAST': {
+        'depth': {'file_format': 'OPEN_EXR', 'color_depth': '32', 'exr_codec': 'NONE', 'color_mode': 'BW'},
+        'normal': {'file_format': 'OPEN_EXR', 'color_depth': '16', 'exr_codec': 'NONE', 'color_mode': 'RGB'},
+        'silhouette': {'file_format': 'PNG', 'color_depth': '8', 'color_mode': 'BW', 'compression': 0},
+        'multilayer': {'file_format': 'OPEN_EXR_MULTILAYER', 'color_depth': '16', 'exr_codec': 'NONE'},
+    },
+}
+
+DEFAULT_OUTPUT_PROFILE = 'FULL'
+
+# render_v3.py 中合成节点名与通道的对应关系
+NODE_PASSES = {'DepthOutput': 'depth', 'NormalOutput': 'normal', 'SilhouetteOutput': 'silhouette'}
+
+
+def get_output_profile(name):
+    """按名称返回输出配置，名称不存在时抛出 ValueError"""
+    try:
+        return OUTPUT_PROFILES[name.upper()]
+    except KeyError:
+        raise ValueError(f"未知的输出配置: {name}，可选: {', '.join(OUTPUT_PROFILES)}") from None
+
+
+def apply_format(image_format, settings):
+    """把一项格式设置写入 ImageFormatSettings（先设格式，位深和压缩方式的可选值取决于格式）"""
+    image_format.file_format = settings['file_format']
+    for key in ('color_mode', 'color_depth', 'exr_codec', 'compression'):
+        if key in settings:
+            setattr(image_format, key, settings[key])
+
+
+def node_pass(node, node_passes=NODE_PASSES):
+    """File Output 节点对应的通道：先按节点名查找，再按标签(小写)匹配"""
+    if node.format.file_format == 'OPEN_EXR_MULTILAYER':
+        return 'multilayer'
+    return node_passes.get(node.name) or node.label.lower() or None
+
+
+def apply_output_profile(tree, profile, node_passes=NODE_PASSES):
+    """
+    把输出配置应用到节点树中的所有 File Output 节点
+
+    参数:
+        tree: 合成节点树
+        profile: 配置名或配置字典
+        node_passes: 节点名 -> 通道名
+
+    返回:
+        {节点名: 通道名}，没有对应通道的节点保持原设置
+    """
+    if isinstance(profile, str):
+        profile = get_output_profile(profile)
+    applied = {}
+    for node in tree.nodes:
+        if node.type != 'OUTPUT_FILE':
+            continue
+        pass_name = node_pass(node, node_passes)
+        if pass_name not in profile:
+            print(f"警告: 输出配置中没有 {node.name} 对应的通道，保持原设置")
+            continue
+        apply_format(node.format, profile[pass_name])
+        # 各文件槽使用节点的格式设置
+        if pass_name != 'multilayer':
+            for slot in node.file_slots:
+                slot.use_node_format = True
+        applied[node.name] = pass_name
+    return applied
@@ -0,0 +1,277 @@
+# PLY 读取：用 NumPy 直接解析文件，再通过 foreach_set 一次性构建网格
+import os
+import numpy as np
+
+PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1',
+    'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2',
+    'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4',
+    'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4',
+    'double': 'f8', 'float64': 'f8',
+}
+
+
+def read_ply_header(f):
+    """
+    读取 PLY 文件头
+
+    返回:
+        (format, elements, header_size)
+        format 为 'ascii' / 'binary_little_endian' / 'binary_big_endian'
+        elements 为 [{'name', 'count', 'properties': [(name, type) 或 (name, ('list', count_type, item_type))]}]
+    """
+    if f.readline().strip() != b'ply':
+        raise ValueError("不是 PLY 文件")
+
+    fmt = None
+    elements = []
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError("PLY 文件头不完整")
+        parts = line.decode('ascii', errors='replace').split()
+        if not parts or parts[0] in ('comment', 'obj_info'):
+            continue
+        if parts[0] == 'format':
+            fmt = parts[1]
+        elif parts[0] == 'element':
+            elements.append({'name': parts[1], 'count': int(parts[2]), 'properties': []})
+        elif parts[0] == 'property':
+            if parts[1] == 'list':
+                elements[-1]['properties'].append((parts[4], ('list', parts[2], parts[3])))
+            else:
+                elements[-1]['properties'].append((parts[2], parts[1]))
+        elif parts[0] == 'end_header':
+            return fmt, elements, f.tell()
+
+
+def _read_binary_element(data, offset, element, endian):
+    """从二进制数据中读取一个元素块，返回 (数据, 新偏移)"""
+    props = element['properties']
+    count = element['count']
+
+    if all(not isinstance(t, tuple) for _, t in props):
+        dtype = np.dtype([(name, endian + PLY_TYPES[t]) for name, t in props])
+        values = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        return values, offset + dtype.itemsize * count
+
+    if len(props) != 1:
+        raise ValueError(f"不支持的 PLY 元素: {element['name']}")
+
+    # 单个列表属性（面）：先假设每个面的顶点数相同，用结构化 dtype 一次读完
+    _, (_, count_type, item_type) = props[0]
+    count_dtype = np.dtype(endian + PLY_TYPES[count_type])
+    item_dtype = np.dtype(endian + PLY_TYPES[item_type])
+    if count == 0:
+        return (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)), offset
+
+    first = int(np.frombuffer(data, dtype=count_dtype, count=1, offset=offset)[0])
+    record = np.dtype([('n', count_dtype), ('v', item_dtype, (first,))])
+    if offset + record.itemsize * count <= len(data):
+        faces = np.frombuffer(data, dtype=record, count=count, offset=offset)
+        if (faces['n'] == first).all():
+            sizes = np.full(count, first, dtype=np.int32)
+            return (faces['v'].astype(np.int32).ravel(), sizes), offset + record.itemsize * count
+
+    # 面的顶点数不一致时逐个读取
+    sizes = np.empty(count, dtype=np.int32)
+    indices = []
+    for k in range(count):
+        n = int(np.frombuffer(data, dtype=count_dtype, count=1, offset=offset)[0])
+        offset += count_dtype.itemsize
+        indices.append(np.frombuffer(data, dtype=item_dtype, count=n, offset=offset))
+        offset += item_dtype.itemsize * n
+        sizes[k] = n
+    return (np.concatenate(indices).astype(np.int32), sizes), offset
+
+
+def _read_ascii_elements(text, elements):
+    """读取 ASCII 格式的全部元素"""
+    tokens = text.split()
+    pos = 0
+    result = {}
+    for element in elements:
+        props = element['properties']
+        if all(not isinstance(t, tuple) for _, t in props):
+            n = len(props)
+            values = np.array(tokens[pos:pos + n * element['count']], dtype=np.float64).reshape(-1, n)
+            pos += n * element['count']
+            result[element['name']] = {name: values[:, k] for k, (name, _) in enumerate(props)}
+        else:
+            sizes = np.empty(element['count'], dtype=np.int32)
+            indices = []
+            for k in range(element['count']):
+                n = int(tokens[pos])
+                indices.extend(tokens[pos + 1:pos + 1 + n])
+                pos += 1 + n
+                sizes[k] = n
+            result[element['name']] = (np.array(indices, dtype=np.int32), sizes)
+    return result
+
+
+def read_ply(filepath):
+    """
+    读取 PLY 文件中的顶点、面和顶点颜色
+
+    参数:
+        filepath: PLY 文件路径
+
+    返回:
+        字典:
+            'vertices'     - (N, 3) float32 顶点坐标
+            'colors'       - (N, 4) float32 RGBA 颜色(0~1)，文件没有颜色时为 None
+            'face_indices' - (M,) int32 所有面的顶点索引首尾相接
+            'face_sizes'   - (F,) int32 每个面的顶点数
+    """
+    with open(filepath, 'rb') as f:
+        fmt, elements, header_size = read_ply_header(f)
+        f.seek(header_size)
+        data = f.read()
+
+    if fmt == 'ascii':
+        parsed = _read_ascii_elements(data.decode('ascii'), elements)
+    elif fmt in ('binary_little_endian', 'binary_big_endian'):
+        endian = '<' if fmt == 'binary_little_endian' else '>'
+        parsed = {}
+        offset = 0
+        for element in elements:
+            parsed[element['name']], offset = _read_binary_element(data, offset, element, endian)
+    else:
+        raise ValueError(f"不支持的 PLY 格式: {fmt}")
+
+    vertex = parsed['vertex']
+    vertices = np.stack([vertex['x'], vertex['y'], vertex['z']], axis=1).astype(np.float32)
+
+    colors = None
+    names = vertex.dtype.names if hasattr(vertex, 'dtype') else tuple(vertex.keys())
+    if all(c in names for c in ('red', 'green', 'blue')):
+        channels = [vertex['red'], vertex['green'], vertex['blue']]
+        channels.append(vertex['alpha'] if 'alpha' in names else None)
+        vertex_types = dict(next(e for e in elements if e['name'] == 'vertex')['properties'])
+        scale = 255.0 if PLY_TYPES.get(vertex_types['red'], 'f4')[0] in 'iu' else 1.0
+        colors = np.ones((len(vertices), 4), dtype=np.float32)
+        for k, channel in enumerate(channels):
+            if channel is not None:
+                colors[:, k] = np.asarray(channel, dtype=np.float32) / scale
+
+    if 'face' in parsed:
+        face_indices, face_sizes = parsed['face']
+    else:
+        face_indices, face_sizes = np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+
+    return {
+        'vertices': vertices,
+        'colors': colors,
+        'face_indices': np.ascontiguousarray(face_indices, dtype=np.int32),
+        'face_sizes': np.ascontiguousarray(face_sizes, dtype=np.int32),
+    }
+
+
+def create_mesh_object(name, vertices, face_indices, face_sizes, colors=None, collection=None):
+    """
+    用 foreach_set 一次性构建网格对象
+
+    参数:
+        name: 对象与网格名称
+        vertices: (N, 3) 顶点坐标
+        face_indices: (M,) 面顶点索引
+        face_sizes: (F,) 每个面的顶点数
+        colors: (N, 4) 顶点颜色(sRGB, 0~1)，写入名为 'Col' 的颜色属性
+        collection: 对象链接到的集合，默认当前场景的主集合
+
+    返回:
+        新建的对象（已选中并设为活动对象）
+    """
+    import bpy
+
+    face_sizes = np.asarray(face_sizes, dtype=np.int32)
+    loop_starts = np.zeros(len(face_sizes), dtype=np.int32)
+    if len(face_sizes) > 1:
+        np.cumsum(face_sizes[:-1], out=loop_starts[1:])
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set('co', np.ascontiguousarray(vertices, dtype=np.float32).ravel())
+    mesh.loops.add(len(face_indices))
+    mesh.loops.foreach_set('vertex_index', np.ascontiguousarray(face_indices, dtype=np.int32))
+    mesh.polygons.add(len(face_sizes))
+    mesh.polygons.foreach_set('loop_start', loop_starts)
+    try:
+        # Blender 3.x 需要显式设置 loop_total，4.x 起由 loop_start 推导且该属性只读
+        mesh.polygons.foreach_set('loop_total', face_sizes)
+    except (AttributeError, TypeError, RuntimeError):
+        pass
+
+    if colors is not None:
+        attr = mesh.color_attributes.new(name='Col', type='BYTE_COLOR', domain='POINT')
+        attr.data.foreach_set('color_srgb', np.ascontiguousarray(colors, dtype=np.float32).ravel())
+        mesh.color_attributes.active_color = attr
+
+    mesh.update(calc_edges=True)
+
+    obj = bpy.data.objects.new(name, mesh)
+    (collection or bpy.context.scene.collection).objects.link(obj)
+    for other in bpy.context.view_layer.objects:
+        other.select_set(False)
+    obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+    return obj
+
+
+def preprocess_ply(ply, center=True):
+    """
+    居中处理并计算包围数据
+
+    参数:
+        ply: read_ply 的结果
+        center: 是否把几何中心(顶点平均值)移到原点，
+                与 origin_set(ORIGIN_GEOMETRY, MEDIAN) + location_clear 的结果一致
+
+    返回:
+        (ply, meta)，meta 包含 center、bbox_min、bbox_max、max_dim、radius
+    """
+    vertices = ply['vertices']
+    offset = vertices.mean(axis=0, dtype=np.float64) if len(vertices) else np.zeros(3)
+    if center:
+        vertices = (vertices - offset).astype(np.float32)
+    ply = dict(ply, vertices=vertices)
+
+    bbox_min = vertices.min(axis=0) if len(vertices) else np.zeros(3)
+    bbox_max = vertices.max(axis=0) if len(vertices) else np.zeros(3)
+    meta = {
+        'center': [float(c) for c in offset],
+        'centered': center,
+        'bbox_min': [float(c) for c in bbox_min],
+        'bbox_max': [float(c) for c in bbox_max],
+        'max_dim': float((bbox_max - bbox_min).max()),
+        'radius': float(np.linalg.norm(vertices - (bbox_min + bbox_max) / 2, axis=1).max()) if len(vertices) else 0.0,
+    }
+    return ply, meta
+
+
+def load_ply_object(filepath, center=True, cache=None):
+    """
+    读取 PLY 文件并创建网格对象，可直接用于 assign_bsdf_material_from_col
+
+    参数:
+        filepath: PLY 文件路径
+        center: 是否把几何中心(顶点平均值)移到原点
+        cache: 可选的 MeshCache，命中时直接使用内存映射的预处理结果，不再解析文件
+
+    返回:
+        新建的对象，文件不存在时返回 None
+    """
+    if not os.path.exists(filepath):
+        print(f"文件不存在: {filepath}")
+        return None
+
+    if cache is not None:
+        ply, _ = cache.get_or_create(filepath, lambda: preprocess_ply(read_ply(filepath), center), variant='centered' if center else 'raw')
+    else:
+        ply, _ = preprocess_ply(read_ply(filepath), center)
+
+    name = os.path.splitext(os.path.basename(filepath))[0]
+    return create_mesh_object(name, ply['vertices'], ply['face_indices'], ply['face_sizes'], ply['colors'])
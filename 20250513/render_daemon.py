@@ -0,0 +1,123 @@
+# 常驻渲染进程：在一个 blender -b 会话中循环领取队列任务，用 render_v3.py 渲染
+#
+# 由 render_queue.py serve 启动和守护，也可以直接运行:
+#   blender -b [render_template.blend] --python render_daemon.py -- --queue queue --max-jobs 20
+#
+# Blender 启动、模板加载、NumPy 等模块的导入只在进程启动时发生一次；每个任务在同一会话中重新执行
+# render_v3.py（辅助模块、HDRI 贴图、共享材质、灯光组等按名称复用）。处理完 --max-jobs 个任务或
+# 常驻内存超过 --max-rss-gb 后正常退出，由 render_queue.py serve 重新启动，以限制内存增长。
+import bpy
+import argparse
+import json
+import os
+import runpy
+import sys
+import time
+import traceback
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.append(SCRIPT_DIR)
+
+from render_queue import init_queue, claim_job, finish_job, write_json_atomic
+from datablock_gc import get_rss_bytes
+
+RENDER_SCRIPT = os.path.join(SCRIPT_DIR, 'render_v3.py')
+# render_v3.py 会注册的处理函数列表，每个任务结束后恢复，避免在同一会话中重复注册
+HANDLER_LISTS = ('render_stats', 'render_pre', 'render_post', 'frame_change_pre', 'frame_change_post')
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='render_daemon.py')
+    parser.add_argument('--queue', required=True, help='队列目录')
+    parser.add_argument('--max-jobs', type=int, default=20, help='处理多少个任务后退出')
+    parser.add_argument('--max-rss-gb', type=float, default=8.0, help='常驻内存超过该值(GB)时退出')
+    parser.add_argument('--idle-exit', type=float, default=0, help='空闲多少秒后退出，0 表示不退出')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='队列轮询间隔(秒)')
+    return parser.parse_args(argv)
+
+
+def job_argv(job):
+    """任务对应的 render_v3.py 命令行参数"""
+    return ['--input-dir', os.path.dirname(job['ply']),
+            '--models', os.path.basename(job['ply']),
+            '--views', str(job['views']),
+            '--output-dir', job['output_dir'],
+            *job.get('args', [])]
+
+
+def run_job(job):
+    """
+    在当前会话中执行一次 render_v3.py
+
+    返回:
+        结果字典（耗时、帧清单路径和内容）
+    """
+    handlers = {name: list(getattr(bpy.app.handlers, name)) for name in HANDLER_LISTS}
+    saved_argv = sys.argv
+    sys.argv = [saved_argv[0], '--', *job_argv(job)]
+    start = time.perf_counter()
+    try:
+        runpy.run_path(RENDER_SCRIPT, run_name='__main__')
+    finally:
+        sys.argv = saved_argv
+        for name, functions in handlers.items():
+            getattr(bpy.app.handlers, name)[:] = functions
+
+    stem = os.path.splitext(os.path.basename(job['ply']))[0]
+    manifest_path = os.path.join(job['output_dir'], 'manifest', f"{stem}.json")
+    manifest = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    return {'seconds': time.perf_counter() - start, 'manifest_path': manifest_path, 'manifest': manifest}
+
+
+def write_heartbeat(queue_dir, jobs_done, state, job_id=None):
+    write_json_atomic(os.path.join(queue_dir, 'daemon.json'), {
+        'pid': os.getpid(), 'state': state, 'job': job_id, 'jobs_done': jobs_done,
+        'rss_bytes': get_rss_bytes(), 'time': time.time(),
+    })
+
+
+def main(argv):
+    args = parse_args(argv)
+    init_queue(args.queue)
+    jobs_done = 0
+    idle_since = time.time()
+    print(f"常驻渲染进程已启动: pid {os.getpid()}，队列 {args.queue}")
+
+    while jobs_done < args.max_jobs:
+        job = claim_job(args.queue, os.getpid())
+        if job is None:
+            write_heartbeat(args.queue, jobs_done, 'idle')
+            if args.idle_exit and time.time() - idle_since > args.idle_exit:
+                print(f"空闲超过 {args.idle_exit} 秒，退出")
+                break
+            time.sleep(args.poll_interval)
+            continue
+
+        print(f"开始任务 {job['id']}: {job['ply']}，{job['views']} 个视角 -> {job['output_dir']}")
+        write_heartbeat(args.queue, jobs_done, 'running', job['id'])
+        try:
+            result = run_job(job)
+            state = finish_job(args.queue, job, result=result)
+        except BaseException as e:
+            # render_v3.py 的参数错误会以 SystemExit 结束
+            if isinstance(e, KeyboardInterrupt):
+                finish_job(args.queue, job, error='渲染进程被中断')
+                raise
+            state = finish_job(args.queue, job, error=f"{type(e).__name__}: {e}\n{traceback.format_exc()}")
+        jobs_done += 1
+        idle_since = time.time()
+        print(f"任务 {job['id']} {state}，本进程已处理 {jobs_done}/{args.max_jobs} 个任务")
+
+        rss = get_rss_bytes()
+        if rss is not None and rss > args.max_rss_gb * 1024 ** 3:
+            print(f"常驻内存 {rss / 1024 ** 3:.2f}GB 超过 {args.max_rss_gb}GB，退出以便重新启动")
+            break
+
+    write_heartbeat(args.queue, jobs_done, 'exited')
+
+
+main(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else [])
@@ -0,0 +1,166 @@
+# 渲染设备选择：检测可用的 Cycles 计算设备，没有 GPU 时回退到 CPU；并提供校准渲染入口
+#
+# 作为 Blender 脚本运行时执行一次校准渲染，供 launch_render.py --calibrate 调用:
+#   blender -b --python render_device.py -- --threads 8 --frames 16
+import json
+import os
+import sys
+import time
+import bpy
+
+# 按优先级尝试的 GPU 后端
+GPU_BACKENDS = ('OPTIX', 'CUDA', 'HIP', 'METAL', 'ONEAPI')
+
+
+def detect_compute_device():
+    """
+    检测 Cycles 可用的 GPU 计算设备并启用
+
+    返回:
+        (device, backend)，例如 ('GPU', 'CUDA')；没有可用 GPU 时返回 ('CPU', None)
+    """
+    try:
+        cprefs = bpy.context.preferences.addons['cycles'].preferences
+    except (KeyError, AttributeError):
+        return 'CPU', None
+
+    # 优先使用用户偏好里已配置的后端
+    current = getattr(cprefs, 'compute_device_type', 'NONE')
+    backends = ([current] if current not in ('NONE', None) else []) + [b for b in GPU_BACKENDS if b != current]
+    for backend in backends:
+        try:
+            cprefs.compute_device_type = backend
+        except TypeError:
+            # 当前平台/版本不支持该后端
+            continue
+        try:
+            cprefs.refresh_devices()
+        except AttributeError:
+            cprefs.get_devices()
+        gpus = [d for d in cprefs.devices if d.type == backend]
+        if gpus:
+            for d in cprefs.devices:
+                d.use = d.type == backend
+            return 'GPU', backend
+
+    try:
+        cprefs.compute_device_type = 'NONE'
+    except TypeError:
+        pass
+    return 'CPU', None
+
+
+def configure_render_device(scene, device='AUTO', threads=None):
+    """
+    设置 Cycles 渲染设备和线程数
+
+    参数:
+        scene: 场景
+        device: 'AUTO' 有 GPU 时用 GPU，否则用 CPU; 'GPU' / 'CPU' 强制指定（指定 GPU 但不可用时仍回退到 CPU）
+        threads: 渲染线程数，为空时由 Blender 自动决定
+
+    返回:
+        (device, backend) 实际使用的设备
+    """
+    backend = None
+    if device in ('AUTO', 'GPU'):
+        device, backend = detect_compute_device()
+    if device == 'GPU':
+        scene.cycles.device = 'GPU'
+    else:
+        scene.cycles.device = 'CPU'
+    if threads:
+        scene.render.threads_mode = 'FIXED'
+        scene.render.threads = threads
+    else:
+        scene.render.threads_mode = 'AUTO'
+    print(f"渲染设备: {device}" + (f" ({backend})" if backend else "") + (f"，{threads} 线程" if threads else ""))
+    return device, backend
+
+
+def build_calibration_scene(resolution=256, samples=16):
+    """搭建一个固定的小场景用于校准：细分球体、点光源和相机，结果只与机器性能有关"""
+    bpy.ops.wm.read_homefile(use_empty=True)
+    scene = bpy.context.scene
+    scene.render.engine = 'CYCLES'
+    scene.render.resolution_x = resolution
+    scene.render.resolution_y = resolution
+    scene.render.resolution_percentage = 100
+    scene.cycles.samples = samples
+    scene.cycles.use_denoising = False
+
+    bpy.ops.mesh.primitive_ico_sphere_add(subdivisions=5, radius=1.0)
+    light_data = bpy.data.lights.new(name='CalibrationLight', type='POINT')
+    light_data.energy = 1000
+    light = bpy.data.objects.new(name='CalibrationLight', object_data=light_data)
+    light.location = (2, -2, 3)
+    scene.collection.objects.link(light)
+
+    cam = bpy.data.objects.new('CalibrationCamera', bpy.data.cameras.new('CalibrationCamera'))
+    cam.location = (0, -4, 0)
+    cam.rotation_euler = (1.5708, 0, 0)
+    scene.collection.objects.link(cam)
+    scene.camera = cam
+    return scene
+
+
+def wait_barrier(barrier_dir, count, timeout=300.0):
+    """在 barrier_dir 中登记本进程已就绪，等待 count 个进程都就绪（超时后直接继续）"""
+    open(os.path.join(barrier_dir, f"{os.getpid()}.ready"), 'w').close()
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if sum(1 for f in os.listdir(barrier_dir) if f.endswith('.ready')) >= count:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def run_calibration_render(device='AUTO', threads=None, frames=16, output_dir=None, warmup=1,
+                           barrier_dir=None, barrier_count=1):
+    """
+    渲染校准场景若干次并计时
+
+    只计时渲染本身：Blender 启动、场景搭建和 warmup 次预热渲染（首次同步、内核加载）不计入。
+    多个进程同时校准时用 barrier_dir 等所有进程都准备好后再一起开始计时，保证计时段内确实在并行渲染。
+
+    返回:
+        {'device', 'backend', 'threads', 'frames', 'seconds', 'frame_seconds'}
+    """
+    scene = build_calibration_scene()
+    device, backend = configure_render_device(scene, device, threads)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    for _ in range(warmup):
+        bpy.ops.render.render()
+    if barrier_dir:
+        wait_barrier(barrier_dir, barrier_count)
+
+    start = time.perf_counter()
+    frame_seconds = []
+    for k in range(frames):
+        if output_dir:
+            scene.render.filepath = os.path.join(output_dir, f"calibration_{os.getpid()}_{k}.png")
+            bpy.ops.render.render(write_still=True)
+        else:
+            bpy.ops.render.render()
+        frame_seconds.append(time.perf_counter() - start - sum(frame_seconds))
+    seconds = time.perf_counter() - start
+    return {'device': device, 'backend': backend, 'threads': threads, 'frames': frames, 'seconds': seconds,
+            'frame_seconds': frame_seconds}
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(prog='render_device.py')
+    parser.add_argument('--device', default='AUTO', choices=('AUTO', 'GPU', 'CPU'))
+    parser.add_argument('--threads', type=int)
+    parser.add_argument('--frames', type=int, default=16)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--output-dir')
+    parser.add_argument('--barrier', help='多进程同时校准时的同步目录')
+    parser.add_argument('--barrier-count', type=int, default=1)
+    args = parser.parse_args(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else [])
+    result = run_calibration_render(args.device, args.threads, args.frames, args.output_dir, args.warmup,
+                                    args.barrier, args.barrier_count)
+    # 启动器从标准输出中解析这一行
+    print('CALIBRATION ' + json.dumps(result))
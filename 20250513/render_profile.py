@@ -0,0 +1,136 @@
+# 渲染配置文件：在本机上校准不同的线程数/并行 worker 数组合，记录吞吐量最高的配置供后续运行复用
+#
+# 不依赖 bpy，launch_render.py 和 render_v3.py 都可以导入。
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEVICE_SCRIPT = os.path.join(SCRIPT_DIR, 'render_device.py')
+DEFAULT_PROFILE_FILE = os.path.join(SCRIPT_DIR, 'render_profile.json')
+
+
+def machine_signature():
+    """标识当前机器，换了机器或 CPU 核心数变化时旧的配置文件不再适用"""
+    return {'host': platform.node(), 'cpu_count': os.cpu_count() or 1}
+
+
+def load_profile(path=DEFAULT_PROFILE_FILE):
+    """
+    读取配置文件
+
+    返回:
+        配置字典（'device', 'backend', 'threads', 'workers', 'throughput' 等）；
+        文件不存在、损坏或不是本机生成时返回 None
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            profile = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if profile.get('machine') != machine_signature():
+        print(f"配置文件 {path} 不是在本机生成的，忽略")
+        return None
+    return profile
+
+
+def save_profile(profile, path=DEFAULT_PROFILE_FILE):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(profile, f, indent=2)
+
+
+def calibration_grid(cpu_count, max_workers=8):
+    """
+    需要校准的 (worker 数, 每个 worker 的线程数) 组合
+
+    worker 数取 1, 2, 4, ...，线程数取平分核心数及其一半（留出超线程/IO 的余量）
+    """
+    grid = []
+    workers = 1
+    while workers <= min(cpu_count, max_workers):
+        full = max(1, cpu_count // workers)
+        for threads in sorted({full, max(1, full // 2)}, reverse=True):
+            grid.append((workers, threads))
+        workers *= 2
+    return grid
+
+
+def run_calibration(blender, workers, threads, frames=16, device='AUTO'):
+    """
+    同时启动 workers 个 Blender 进程渲染校准场景
+
+    吞吐量用各进程自己报告的渲染耗时计算（CALIBRATION 行中的 seconds），不包含 Blender 启动和场景搭建；
+    各进程预热后在同步目录处等齐再开始计时，计时段内确实是 workers 个进程在并行渲染。
+
+    返回:
+        {'workers', 'threads', 'device', 'backend', 'seconds', 'throughput'}，
+        seconds 为最慢进程的渲染耗时，throughput 为每秒完成的帧数；有进程失败时返回 None
+    """
+    env = dict(os.environ, OMP_NUM_THREADS=str(threads))
+    results = []
+    with tempfile.TemporaryDirectory(prefix='render_calibration_') as barrier:
+        cmd = [blender, '-b', '-t', str(threads), '--python', DEVICE_SCRIPT, '--',
+               '--device', device, '--threads', str(threads), '--frames', str(frames),
+               '--barrier', barrier, '--barrier-count', str(workers)]
+        # 输出写到临时文件而不是管道，进程不会因为管道写满而阻塞
+        logs = [tempfile.TemporaryFile('w+') for _ in range(workers)]
+        procs = [subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, env=env, text=True) for log in logs]
+        for proc in procs:
+            proc.wait()
+        for log in logs:
+            log.seek(0)
+            for line in log:
+                if line.startswith('CALIBRATION '):
+                    results.append(json.loads(line[len('CALIBRATION '):]))
+            log.close()
+    if len(results) != workers or any(p.returncode != 0 for p in procs):
+        return None
+    seconds = max(r['seconds'] for r in results)
+    return {
+        'workers': workers,
+        'threads': threads,
+        'device': results[0]['device'],
+        'backend': results[0]['backend'],
+        'seconds': seconds,
+        'throughput': workers * frames / seconds,
+    }
+
+
+def calibrate(blender, path=DEFAULT_PROFILE_FILE, frames=16, device='AUTO', max_workers=8):
+    """
+    校准所有组合并把吞吐量最高的配置写入配置文件
+
+    使用 GPU 时多个进程会争用同一块显卡，只校准单 worker 的情况。
+
+    返回:
+        写入的配置字典；所有组合都失败时返回 None
+    """
+    signature = machine_signature()
+    probe = run_calibration(blender, 1, signature['cpu_count'], frames, device)
+    if probe is None:
+        print("校准渲染失败，请检查 Blender 路径")
+        return None
+    grid = [(1, signature['cpu_count'])] if probe['device'] == 'GPU' else calibration_grid(signature['cpu_count'], max_workers)
+
+    trials = []
+    for workers, threads in grid:
+        result = probe if (workers, threads) == (1, signature['cpu_count']) else run_calibration(blender, workers, threads, frames, device)
+        if result is None:
+            print(f"  {workers} worker x {threads} 线程: 失败")
+            continue
+        print(f"  {workers} worker x {threads} 线程: {result['throughput']:.3f} 帧/秒")
+        trials.append(result)
+
+    if not trials:
+        return None
+    best = max(trials, key=lambda r: r['throughput'])
+    profile = dict(best, machine=signature, frames=frames, trials=trials, time=time.time())
+    save_profile(profile, path)
+    print(f"最佳配置: {best['workers']} worker x {best['threads']} 线程 ({best['device']})，已保存到 {path}")
+    return profile
@@ -0,0 +1,247 @@
+# 常驻渲染进程的文件任务队列：提交任务、查询状态，以及启动/回收常驻的 blender -b 进程
+#
+# 队列目录结构:
+#   pending/<id>.json     等待处理的任务
+#   running/<id>.json     正在处理（记录处理它的 Blender 进程 pid）
+#   done/<id>.json        完成，含结果
+#   failed/<id>.json      失败，含错误信息
+#   daemon.json           常驻进程的心跳（pid、已完成任务数、常驻内存）
+# 状态之间用 os.replace 移动文件，多个常驻进程可以共享同一个队列目录，一个任务只会被领取一次。
+# 用普通 Python 运行即可，不需要 bpy。
+#
+# 用法:
+#   python render_queue.py serve --blender /path/to/blender --queue queue [--template render_template.blend] [--max-jobs 20]
+#   python render_queue.py submit --queue queue scan.ply --views 4 --output-dir render [--wait] [-- render_v3.py 参数]
+#   python render_queue.py status --queue queue [任务 id]
+# 在队列目录中创建 stop 文件后，serve 在当前 Blender 进程退出时停止，不再重新启动。
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DAEMON_SCRIPT = os.path.join(SCRIPT_DIR, 'render_daemon.py')
+JOB_STATES = ('pending', 'running', 'done', 'failed')
+
+
+def init_queue(queue_dir):
+    for state in JOB_STATES:
+        os.makedirs(os.path.join(queue_dir, state), exist_ok=True)
+
+
+def job_path(queue_dir, state, job_id):
+    return os.path.join(queue_dir, state, f"{job_id}.json")
+
+
+def write_json_atomic(path, data):
+    """先写临时文件再改名，读取方不会看到写了一半的文件"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def submit_job(queue_dir, ply_path, views, output_dir, args=None):
+    """
+    提交一个渲染任务
+
+    参数:
+        ply_path: PLY 文件路径
+        views: 视角数
+        output_dir: 输出目录
+        args: 额外传给 render_v3.py 的命令行参数列表，例如 ['--image-size', '512']
+
+    返回:
+        任务 id
+    """
+    init_queue(queue_dir)
+    job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    job = {
+        'id': job_id,
+        'ply': os.path.abspath(ply_path),
+        'views': int(views),
+        'output_dir': os.path.abspath(output_dir),
+        'args': list(args or []),
+        'submitted': time.time(),
+    }
+    write_json_atomic(job_path(queue_dir, 'pending', job_id), job)
+    return job_id
+
+
+def claim_job(queue_dir, worker_pid):
+    """
+    领取最早提交的待处理任务（移动到 running/），没有任务时返回 None
+
+    多个进程同时领取同一个任务时只有一个 os.replace 会成功。
+    """
+    pending_dir = os.path.join(queue_dir, 'pending')
+    for name in sorted(f for f in os.listdir(pending_dir) if f.endswith('.json')):
+        job_id = name[:-len('.json')]
+        running = job_path(queue_dir, 'running', job_id)
+        try:
+            os.replace(os.path.join(pending_dir, name), running)
+        except FileNotFoundError:
+            continue
+        with open(running, 'r') as f:
+            job = json.load(f)
+        job.update(worker_pid=worker_pid, started=time.time())
+        write_json_atomic(running, job)
+        return job
+    return None
+
+
+def finish_job(queue_dir, job, result=None, error=None):
+    """把任务从 running/ 移到 done/ 或 failed/，并写入结果或错误信息"""
+    job = dict(job, finished=time.time())
+    if error is None:
+        job['result'] = result
+        state = 'done'
+    else:
+        job['error'] = error
+        state = 'failed'
+    write_json_atomic(job_path(queue_dir, state, job['id']), job)
+    try:
+        os.remove(job_path(queue_dir, 'running', job['id']))
+    except FileNotFoundError:
+        pass
+    return state
+
+
+def job_status(queue_dir, job_id):
+    """返回 (状态, 任务记录)，找不到时返回 (None, None)"""
+    for state in JOB_STATES:
+        path = job_path(queue_dir, state, job_id)
+        try:
+            with open(path, 'r') as f:
+                return state, json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+    return None, None
+
+
+def wait_job(queue_dir, job_id, poll_interval=0.5, timeout=None):
+    """等待任务完成或失败，返回 (状态, 任务记录)；超时返回当前状态"""
+    start = time.time()
+    while True:
+        state, job = job_status(queue_dir, job_id)
+        if state in ('done', 'failed'):
+            return state, job
+        if timeout is not None and time.time() - start > timeout:
+            return state, job
+        time.sleep(poll_interval)
+
+
+def fail_orphaned_jobs(queue_dir, worker_pid):
+    """常驻进程异常退出后，把它留在 running/ 中的任务标记为失败（不自动重试，避免崩溃循环）"""
+    running_dir = os.path.join(queue_dir, 'running')
+    failed = []
+    for name in os.listdir(running_dir):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(running_dir, name), 'r') as f:
+                job = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        if job.get('worker_pid') == worker_pid:
+            finish_job(queue_dir, job, error='渲染进程异常退出')
+            failed.append(job['id'])
+    return failed
+
+
+def serve(args):
+    """启动常驻的 Blender 进程；它处理完 --max-jobs 个任务或内存超限后退出，这里立即重新启动一个新的"""
+    init_queue(args.queue)
+    os.makedirs(os.path.join(args.queue, 'logs'), exist_ok=True)
+    generation = 0
+    while True:
+        cmd = [args.blender, '-b']
+        if args.template:
+            cmd.append(args.template)
+        cmd += ['--python', DAEMON_SCRIPT, '--',
+                '--queue', os.path.abspath(args.queue),
+                '--max-jobs', str(args.max_jobs),
+                '--max-rss-gb', str(args.max_rss_gb),
+                '--idle-exit', str(args.idle_exit)]
+        log_file = os.path.join(args.queue, 'logs', f"daemon_{generation:04d}.log")
+        print(f"启动常驻渲染进程 #{generation}，日志: {log_file}")
+        with open(log_file, 'w') as log:
+            proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+            try:
+                returncode = proc.wait()
+            except KeyboardInterrupt:
+                proc.terminate()
+                proc.wait()
+                fail_orphaned_jobs(args.queue, proc.pid)
+                return 0
+        if returncode != 0:
+            failed = fail_orphaned_jobs(args.queue, proc.pid)
+            print(f"常驻渲染进程 #{generation} 异常退出(返回码 {returncode})，失败任务: {failed}")
+            time.sleep(1.0)
+        generation += 1
+        if os.path.exists(os.path.join(args.queue, 'stop')):
+            print("检测到 stop 文件，停止服务")
+            return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='render_v3 常驻渲染进程的任务队列')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('serve', help='启动并守护常驻的 blender -b 进程')
+    p.add_argument('--blender', default='blender', help='Blender 可执行文件路径')
+    p.add_argument('--queue', required=True, help='队列目录')
+    p.add_argument('--template', help='渲染模板 .blend')
+    p.add_argument('--max-jobs', type=int, default=20, help='每个 Blender 进程处理多少个任务后重启')
+    p.add_argument('--max-rss-gb', type=float, default=8.0, help='常驻内存超过该值(GB)时处理完当前任务后重启')
+    p.add_argument('--idle-exit', type=float, default=0, help='空闲多少秒后让 Blender 进程退出重启，0 表示不退出')
+
+    p = sub.add_parser('submit', help='提交任务')
+    p.add_argument('--queue', required=True, help='队列目录')
+    p.add_argument('ply', help='PLY 文件路径')
+    p.add_argument('--views', type=int, default=4, help='视角数')
+    p.add_argument('--output-dir', required=True, help='输出目录')
+    p.add_argument('--wait', action='store_true', help='等待任务完成并打印结果')
+
+    p = sub.add_parser('status', help='查询任务状态')
+    p.add_argument('--queue', required=True, help='队列目录')
+    p.add_argument('job_id', nargs='?', help='任务 id，为空时列出各状态的任务数')
+
+    # -- 之后的参数原样传给 render_v3.py
+    argv = list(sys.argv[1:] if argv is None else argv)
+    render_args = argv[argv.index('--') + 1:] if '--' in argv else []
+    args = parser.parse_args(argv[:argv.index('--')] if '--' in argv else argv)
+    if args.command == 'serve':
+        return serve(args)
+
+    if args.command == 'submit':
+        job_id = submit_job(args.queue, args.ply, args.views, args.output_dir, render_args)
+        print(job_id)
+        if not args.wait:
+            return 0
+        state, job = wait_job(args.queue, job_id)
+        print(json.dumps(job, indent=2, ensure_ascii=False))
+        return 0 if state == 'done' else 1
+
+    if args.job_id:
+        state, job = job_status(args.queue, args.job_id)
+        if state is None:
+            print(f"没有找到任务: {args.job_id}")
+            return 1
+        print(json.dumps({'state': state, **job}, indent=2, ensure_ascii=False))
+        return 0
+    init_queue(args.queue)
+    for state in JOB_STATES:
+        print(f"{state}: {sum(1 for f in os.listdir(os.path.join(args.queue, state)) if f.endswith('.json'))}")
+    daemon_file = os.path.join(args.queue, 'daemon.json')
+    if os.path.exists(daemon_file):
+        with open(daemon_file, 'r') as f:
+            print(f"常驻进程: {f.read()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# 渲染计时：借助 render_stats 回调把一次渲染拆分为场景同步时间和采样渲染时间
+import time
+import bpy
+
+# 出现这些字样说明场景同步（导出对象、构建 BVH、加载内核等）已结束，开始采样
+SAMPLING_MARKERS = ('Sample', 'Rendered', 'Path Tracing')
+
+
+class RenderTimer:
+    """
+    记录每次 bpy.ops.render.render 的同步时间和渲染时间
+
+    Cycles 在同步阶段输出 "Synchronizing object"、"Updating Scene BVH" 等状态，
+    进入采样后输出 "Sample 1/50"；以第一条采样状态的时间作为同步结束时间。
+    """
+
+    def __init__(self):
+        self.start_time = None
+        self.sync_end = None
+        self.records = []
+
+    def _on_stats(self, stats, *args):
+        if self.start_time is not None and self.sync_end is None:
+            if any(marker in str(stats) for marker in SAMPLING_MARKERS):
+                self.sync_end = time.perf_counter()
+
+    def install(self):
+        if self._on_stats not in bpy.app.handlers.render_stats:
+            bpy.app.handlers.render_stats.append(self._on_stats)
+
+    def remove(self):
+        if self._on_stats in bpy.app.handlers.render_stats:
+            bpy.app.handlers.render_stats.remove(self._on_stats)
+
+    def render(self, **kwargs):
+        """
+        执行一次渲染并计时
+
+        返回:
+            {'sync': 同步秒数(无法区分时为 None), 'render': 采样渲染秒数, 'total': 总秒数}
+        """
+        self.start_time = time.perf_counter()
+        self.sync_end = None
+        bpy.ops.render.render(**kwargs)
+        end = time.perf_counter()
+
+        record = {'total': end - self.start_time, 'sync': None, 'render': end - self.start_time}
+        if self.sync_end is not None:
+            record['sync'] = self.sync_end - self.start_time
+            record['render'] = end - self.sync_end
+        self.start_time = None
+        self.records.append(record)
+        return record
+
+
+def summarize_batch(records):
+    """
+    汇总一批视角的计时：第一个视角包含完整的场景同步，其余视角在持久数据下只需更新变换
+
+    返回:
+        {'views', 'first_sync', 'mean_sync_rest', 'mean_render'}，没有记录时返回 None
+    """
+    if not records:
+        return None
+    syncs = [r['sync'] for r in records[1:] if r['sync'] is not None]
+    return {
+        'views': len(records),
+        'first_sync': records[0]['sync'],
+        'mean_sync_rest': sum(syncs) / len(syncs) if syncs else None,
+        'mean_render': sum(r['render'] for r in records) / len(records),
+    }
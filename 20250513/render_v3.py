@@ -7,70 +7,245 @@ from mathutils import Vector, Matrix
 import json
 import time
 import sys
-from bpy_extras.object_utils import world_to_camera_view
+import numpy as np
+from functools import partial
+
+# 将脚本所在目录加入搜索路径，以便导入同目录下的辅助模块
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.append(SCRIPT_DIR)
+
+from keypoints import (get_mesh_vertices_world, get_hull_vertices_world, get_camera_matrices, get_render_resolution,
+                       project_points, visible_by_scene_ray_cast, get_occlusion_engine, release_occlusion_engine,
+                       get_camera_intrinsics, get_camera_extrinsics)
+from job_journal import JobJournal, JOURNAL_PASSES
+from ply_loader import load_ply_object
+from mesh_cache import MeshCache
+from camera_solver import get_camera_tan_half_fov, solve_camera_distance, look_at_matrices, frustum_fit
+from datablock_gc import collect_model_garbage
+from render_timing import RenderTimer, summarize_batch
+from render_device import configure_render_device
+from render_profile import load_profile, DEFAULT_PROFILE_FILE
+from stage_timing import StageTimer
+from tracing import Tracer
+from keypoint_store import KeypointAccumulator, stored_views
+from camera_store import CameraParamStore
+from camera_manifest import write_model_cameras, build_camera_manifest
+from async_writer import AsyncWriter, encode_render_png, write_text
+from hdri_pool import HdriPool
+from light_rig import LightRig, view_rng
+from edge_maps import read_exr, compute_edge_map, write_edge_map
+from output_profiles import OUTPUT_PROFILES, DEFAULT_OUTPUT_PROFILE, apply_output_profile
 
 # === 用户配置区 ===
 INPUT_PLY_DIR = 'C:/Users/KZ/Softwares/Script/Bpy/多角度渲染/models'    # PLY 文件夹
 OUTPUT_DIR = 'C:/Users/KZ/Softwares/Script/Bpy/多角度渲染/render'           # 渲染结果输出文件夹
-HDRI_DIR = 'D:/data-beifen/3d软件/blender安装/2.82/scripts/addons/Extreme PBR Combo 2_8/Extreme PBR Risorse/HDRi/Photo studio.hdr'       # 可选 HDRI 环境贴图
+HDRI_DIR = 'D:/data-beifen/3d软件/blender安装/2.82/scripts/addons/Extreme PBR Combo 2_8/Extreme PBR Risorse/HDRi/Photo studio.hdr'       # 可选 HDRI 环境贴图(单个文件或目录)
+HDRI_PER_VIEW = True                    # 每个视角从 HDRI 池中随机选一张环境贴图；关闭时整次运行只用一张
+HDRI_CACHE_DIR = None                   # HDRI 缩小缓存目录，为空则直接使用原图
+HDRI_MAX_SIZE = 1024                    # 缩小缓存的最大宽度(像素)
 NUM_VIEWS_PER_MODEL = 2               # 每个模型渲染视角数
 IMAGE_SIZE = 1024                       # 渲染分辨率
+RENDER_SAMPLES = 50                     # Cycles 采样数
+RANDOM_SEED = None                      # 随机种子(相机采样、灯光)，设置后结果可复现
+LIGHT_SEED = 0                          # 灯光组的种子，同一 (模型, 视角) 总是得到相同的灯光；设置 RANDOM_SEED 时使用它
+LIGHT_RIG_SIZE = 3                      # 灯光组中的点光源数量(只创建一次)
+LIGHT_RIG_MIN_LIGHTS = 1                # 每个视角至少启用的灯光数，实际数量在 [LIGHT_RIG_MIN_LIGHTS, LIGHT_RIG_SIZE] 中随机
+STAGE_TIMINGS_FILE = None               # 分阶段计时结果(JSON)，供 bench_pipeline.py 使用，为空则不写出
+TRACE_FILE = None                       # Chrome/Perfetto trace-event JSON 路径，为空则不追踪(无额外开销)
 CENTER_MODEL = True                     # 是否将模型居中处理
 ADAPTIVE_CAMERA = True                  # 是否自动调整相机确保拍摄完整
 CAMERA_FOV = 50                         # 相机视场角(度)，较小的值会有更窄的视角和更少的透视变形
 CAMERA_MARGIN = 0.2                     # 模型与视图边界的边距比例(0.2表示保留20%的边距)
 SAVE_CAMERA_PARAMS = True               # 是否保存相机参数
+CAMERA_MANIFEST = True                  # 是否输出数据集级相机矩阵清单(OUTPUT_DIR/camera_manifest，内参 K 与外参，可内存映射)
+BUILD_CAMERA_MANIFEST = True            # 运行结束时把各模型的记录合并为 cameras.npy；分片启动器的 worker 关闭，由启动器统一合并
 LOAD_CAMERA_PARAMS = False              # 是否加载已保存的相机参数
-CAMERA_PARAMS_FILE = os.path.join(OUTPUT_DIR, 'camera_params.json')  # 相机参数文件路径
+CAMERA_PARAMS_FILE = os.path.join(OUTPUT_DIR, 'camera_params.jsonl')  # 相机参数文件路径(只追加的 JSONL，同目录下旧的 camera_params.json 会在首次打开时导入)
 UNIFORM_CAMERA_DISTRIBUTION = True      # 是否使用均匀分布的相机位置(而不是完全随机)
 USE_CAMERA_CONSTRAINTS = True           # 是否使用相机约束功能(锁定焦点)
 TEETH_MODE = True                       # 牙列模式，如果为真，专门针对牙列模型优化相机角度
+KEYPOINT_OCCLUSION = 'BVH'              # 关键点遮挡检测方式: 'BVH' 每个模型缓存一棵 BVH; 'SCENE' 旧的 scene.ray_cast 逐点检查
+KEYPOINT_FORMAT = 'TXT'                 # 关键点输出格式: 'TXT' 每个视角一个 idx,px,py 文本; 'NPZ' 每个模型一个压缩 .npz(含深度和视角偏移表); 'BOTH' 两者都写
+KEYPOINT_BACKFACE_CULL = True           # BVH 模式下是否先用顶点法线剔除背向相机的顶点
+KEYPOINT_BATCH_VIEWS = 8                # 动画模式下一次 project_points 投影的视角数（内存约为 顶点数 × 视角数 × 56 字节）
+CAMERA_SOLVER = 'ANALYTIC'              # 自适应相机的求解方式: 'ANALYTIC' 按采样方向直接解出满足 CAMERA_MARGIN 的距离; 'SAMPLING' 旧的随机尝试
+CAMERA_DISTANCE_JITTER = 0.0            # ANALYTIC 模式下相机距离随机放大的比例上限(放大后模型只会更小，仍满足边距)
+PLY_IMPORTER = 'NATIVE'                 # PLY 导入方式: 'NATIVE' NumPy 直接解析并用 foreach_set 建网格(支持 blender -b); 'BLENDER' 旧的 bpy.ops.wm.ply_import
+MESH_CACHE_DIR = None                   # 预处理网格缓存目录(NATIVE 导入时生效)，为空则不使用缓存
+MESH_CACHE_MAX_GB = 10                  # 网格缓存大小上限(GB)，超出后按最近使用时间淘汰
+SILHOUETTE_MODE = 'INDEX'               # 遮罩生成方式: 'INDEX' 物体索引通道(单次渲染); 'ALPHA' 透明背景的 Alpha 通道(单次渲染，RGB 不再显示 HDRI 背景); 'RENDER' 旧的白色自发光二次渲染
+OUTPUT_PROFILE = DEFAULT_OUTPUT_PROFILE  # 深度/法线/遮罩的位深和 EXR 压缩方式，见 output_profiles.py: 'FULL' / 'BALANCED' / 'COMPACT' / 'FAST'
+FREESTYLE_EDGES = False                 # 渲染时启用 Freestyle 轮廓线(明显增加 Cycles 渲染时间)；默认关闭，边缘图由 EDGE_MAPS 在后处理中生成
+EDGE_MAPS = True                        # 每个模型渲染完后由深度和法线 EXR 计算边缘图(OUTPUT_DIR/edges)，已有数据集可用 edge_maps.py 补生成
+SILHOUETTE_PASS_INDEX = 1               # INDEX 模式下模型使用的物体索引
+MODEL_FILES = None                      # 只处理这些 PLY 文件(相对 INPUT_PLY_DIR)，为空则处理整个目录；通常由命令行 --models 指定
+RENDER_THREADS = None                   # 渲染线程数，为空则使用校准配置文件中的线程数或由 Blender 自动决定
+RENDER_DEVICE = 'AUTO'                  # 渲染设备: 'AUTO' 检测到可用 GPU 时用 GPU，否则用 CPU; 'GPU' / 'CPU' 强制指定
+RENDER_PROFILE_FILE = DEFAULT_PROFILE_FILE  # launch_render.py --calibrate 生成的本机校准配置文件
+PROGRESS_FILE = None                    # 进度记录文件(JSON Lines)，供分片启动器汇总
+RESUME_JOURNAL = True                   # 是否记录断点续跑日志，重跑时跳过输出已完整的视角
+JOURNAL_FILE = os.path.join(OUTPUT_DIR, 'journal.jsonl')  # 断点续跑日志路径
+VIEW_BATCH = True                       # 同一模型的所有视角作为一批渲染: 开启 render.use_persistent_data，视角之间只移动相机和灯光，不再重建场景和 BVH
+ANIMATION_RENDER = True                 # 把一个模型各视角的相机/灯光位置写成连续帧的关键帧，用一次 render(animation=True) 渲染全部视角(第 i 帧即第 i 个视角)
+ASYNC_WRITER = True                     # 相机信息、关键点文本和 RGB PNG 交给后台线程写出，写盘与下一个视角的渲染重叠(动画模式下 RGB 仍由 Blender 写出)；开启时视图变换改为 Standard，RGB 色调与 Filmic/AgX 不同
+ASYNC_WRITER_THREADS = 2                # 后台写入线程数
+ASYNC_WRITER_QUEUE = 4                  # 最多排队的写入任务数，限制待写像素占用的内存
+GC_AFTER_MODEL = True                   # 每个模型处理完后清理孤立的网格、材质、灯光和图像数据块
+MEMORY_LOG_FILE = os.path.join(OUTPUT_DIR, 'memory.jsonl')  # 每个模型的常驻内存和数据块数量记录(JSON Lines)，为空则不记录
+BAKE_TEMPLATE = None                    # 只生成渲染模板 .blend 到该路径后退出；通常由命令行 --bake-template 指定
+TEMPLATE_MARKER = 'render_v3_template'  # 模板场景上的自定义属性名，值为生成模板时的 SILHOUETTE_MODE
+SHARED_MATERIAL_NAME = 'VertexCol_Mat'  # 所有模型共用的顶点色材质名称
+
+# === 命令行参数 ===
+# 以 blender -b --python render_v3.py -- [参数] 方式运行时，命令行参数覆盖上面的配置
+def parse_cli_args(argv):
+    """解析 '--' 之后的命令行参数"""
+    import argparse
+    parser = argparse.ArgumentParser(prog='render_v3.py')
+    parser.add_argument('--input-dir', help='PLY 文件夹')
+    parser.add_argument('--output-dir', help='渲染结果输出文件夹')
+    parser.add_argument('--models', nargs='+', help='只处理这些 PLY 文件')
+    parser.add_argument('--hdri-dir', help='HDRI 环境贴图文件或目录')
+    parser.add_argument('--hdri-cache-dir', help='HDRI 缩小缓存目录')
+    parser.add_argument('--views', type=int, help='每个模型渲染视角数')
+    parser.add_argument('--image-size', type=int, help='渲染分辨率')
+    parser.add_argument('--samples', type=int, help='Cycles 采样数')
+    parser.add_argument('--seed', type=int, help='随机种子')
+    parser.add_argument('--stage-timings', help='分阶段计时结果输出路径')
+    parser.add_argument('--trace', help='Chrome/Perfetto trace 输出路径')
+    parser.add_argument('--camera-params-file', help='相机参数文件路径')
+    parser.add_argument('--threads', type=int, help='渲染线程数')
+    parser.add_argument('--device', choices=('AUTO', 'GPU', 'CPU'), help='渲染设备')
+    parser.add_argument('--progress-file', help='进度记录文件')
+    parser.add_argument('--mesh-cache-dir', help='预处理网格缓存目录')
+    parser.add_argument('--output-profile', choices=tuple(OUTPUT_PROFILES), help='深度/法线/遮罩的输出精度与压缩配置')
+    parser.add_argument('--freestyle', action='store_true', help='渲染时启用 Freestyle 轮廓线')
+    parser.add_argument('--no-edge-maps', action='store_true', help='不生成后处理边缘图')
+    parser.add_argument('--keypoint-format', choices=('TXT', 'NPZ', 'BOTH'), help='关键点输出格式')
+    parser.add_argument('--no-async-writer', action='store_true', help='所有输出都在主线程同步写出')
+    parser.add_argument('--no-camera-manifest-build', action='store_true', help='结束时不合并相机矩阵清单')
+    parser.add_argument('--bake-template', help='生成渲染模板 .blend 到该路径后退出')
+    return parser.parse_args(argv)
+
+cli_args = parse_cli_args(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else [])
+if cli_args.input_dir:
+    INPUT_PLY_DIR = cli_args.input_dir
+if cli_args.output_dir:
+    OUTPUT_DIR = cli_args.output_dir
+    CAMERA_PARAMS_FILE = os.path.join(OUTPUT_DIR, 'camera_params.jsonl')
+    JOURNAL_FILE = os.path.join(OUTPUT_DIR, 'journal.jsonl')
+    MEMORY_LOG_FILE = os.path.join(OUTPUT_DIR, 'memory.jsonl')
+if cli_args.camera_params_file:
+    CAMERA_PARAMS_FILE = cli_args.camera_params_file
+if cli_args.hdri_dir:
+    HDRI_DIR = cli_args.hdri_dir
+if cli_args.hdri_cache_dir:
+    HDRI_CACHE_DIR = cli_args.hdri_cache_dir
+if cli_args.models:
+    MODEL_FILES = cli_args.models
+if cli_args.views:
+    NUM_VIEWS_PER_MODEL = cli_args.views
+if cli_args.image_size:
+    IMAGE_SIZE = cli_args.image_size
+if cli_args.samples:
+    RENDER_SAMPLES = cli_args.samples
+if cli_args.seed is not None:
+    RANDOM_SEED = cli_args.seed
+if RANDOM_SEED is not None:
+    LIGHT_SEED = RANDOM_SEED
+if cli_args.stage_timings:
+    STAGE_TIMINGS_FILE = os.path.abspath(cli_args.stage_timings)
+if cli_args.trace:
+    TRACE_FILE = os.path.abspath(cli_args.trace)
+
+if RANDOM_SEED is not None:
+    random.seed(RANDOM_SEED)
+    np.random.seed(RANDOM_SEED)
+
+# 区间追踪：模型、视角、各阶段以及 Cycles 同步/采样的起止时间
+tracer = Tracer(enabled=bool(TRACE_FILE), process_name=f"render_v3 {os.getpid()}")
+
+# 分阶段计时：导入、相机搜索、RGB 渲染、遮罩渲染、相机信息导出、关键点导出、边缘图导出
+stage_timer = StageTimer(tracer)
+if cli_args.threads:
+    RENDER_THREADS = cli_args.threads
+if cli_args.device:
+    RENDER_DEVICE = cli_args.device
+if cli_args.progress_file:
+    PROGRESS_FILE = cli_args.progress_file
+if cli_args.mesh_cache_dir:
+    MESH_CACHE_DIR = cli_args.mesh_cache_dir
+if cli_args.keypoint_format:
+    KEYPOINT_FORMAT = cli_args.keypoint_format
+if cli_args.freestyle:
+    FREESTYLE_EDGES = True
+if cli_args.no_edge_maps:
+    EDGE_MAPS = False
+if cli_args.output_profile:
+    OUTPUT_PROFILE = cli_args.output_profile
+if cli_args.no_async_writer:
+    ASYNC_WRITER = False
+if cli_args.no_camera_manifest_build:
+    BUILD_CAMERA_MANIFEST = False
+if cli_args.bake_template:
+    BAKE_TEMPLATE = os.path.abspath(cli_args.bake_template)
 
 # === 场景初始化 ===
 # 不清空场景，保留用户手动导入的网格对象
 # bpy.ops.wm.read_homefile(use_empty=True)
 
 # 创建输出目录结构
-for sub in ['rgb', 'depth', 'normal', 'silhouette', 'caminfo','keypoints']:
+for sub in ['rgb', 'depth', 'normal', 'silhouette', 'edges', 'caminfo','keypoints', 'manifest']:
     os.makedirs(os.path.join(OUTPUT_DIR, sub), exist_ok=True)
 
 # 设置渲染参数
 scene = bpy.context.scene
 scene.render.engine = 'CYCLES'
-scene.cycles.device = 'GPU'
 scene.render.resolution_x = IMAGE_SIZE
 scene.render.resolution_y = IMAGE_SIZE
 scene.render.resolution_percentage = 100
-scene.cycles.samples = 50
+scene.cycles.samples = RENDER_SAMPLES
+# 视角批量渲染：保留上一次渲染的同步数据，相机/灯光只改变换时不需要重新同步几何体
+scene.render.use_persistent_data = VIEW_BATCH
+# 单独运行时沿用校准出的单 worker 线程数；多 worker 的配置由 launch_render.py 通过 --threads 传入
+render_profile = load_profile(RENDER_PROFILE_FILE)
+if render_profile and not RENDER_THREADS and render_profile['workers'] == 1 and render_profile['device'] == 'CPU':
+    RENDER_THREADS = render_profile['threads']
+configure_render_device(scene, RENDER_DEVICE, RENDER_THREADS)
 
 # 启用必要的 passes
 view_layer = scene.view_layers[0]
 view_layer.use_pass_normal = True  # 启用法线通道
 view_layer.use_pass_z = True       # 启用深度通道
-
-# 设置 Freestyle 边缘渲染 (Silhouette)
-view_layer.use_freestyle = True
+if SILHOUETTE_MODE == 'INDEX':
+    view_layer.use_pass_object_index = True  # 启用物体索引通道，用于生成遮罩
+scene.render.film_transparent = SILHOUETTE_MODE == 'ALPHA'
+
+# 以预生成的模板启动时(blender -b template.blend --python render_v3.py)，Freestyle、合成节点、
+# HDRI 世界节点、相机约束和共享材质都已保存在模板中，只需按名称取回，不再重建
+template_mode = scene.get(TEMPLATE_MARKER)
+TEMPLATE_LOADED = template_mode is not None and not BAKE_TEMPLATE
+if TEMPLATE_LOADED and template_mode != SILHOUETTE_MODE:
+    print(f"警告: 模板的遮罩模式为 {template_mode}，与当前配置 {SILHOUETTE_MODE} 不一致，重新创建场景设置")
+    TEMPLATE_LOADED = False
+if TEMPLATE_LOADED:
+    print(f"使用渲染模板: {bpy.data.filepath}")
+
+# 设置 Freestyle 边缘渲染 (Silhouette)：默认关闭，边缘图改为从深度/法线通道后处理生成
+view_layer.use_freestyle = FREESTYLE_EDGES
+scene.render.use_freestyle = FREESTYLE_EDGES
 freestyle = view_layer.freestyle_settings
-line_set = freestyle.linesets.new('LineSet')
-line_set.select_silhouette = True
-line_set.select_border = False
-line_set.select_contour = False
-line_set.select_crease = False
+if FREESTYLE_EDGES and not TEMPLATE_LOADED:
+    line_set = freestyle.linesets.new('LineSet')
+    line_set.select_silhouette = True
+    line_set.select_border = False
+    line_set.select_contour = False
+    line_set.select_crease = False
 
 # === 渲染节点（用于 Depth & Normal） ===
 scene.use_nodes = True
 tree = scene.node_tree
-for node in tree.nodes:
-    tree.nodes.remove(node)
-
-# 输入渲染层
-rl = tree.nodes.new('CompositorNodeRLayers')
-rl.location = (-300, 300)
-
-# 打印所有可用的输出通道，辅助调试
-print("可用的输出通道:")
-for output in rl.outputs:
-    print(f"- {output.name}")
 
 # 添加一个函数来安全地连接节点，避免不存在的输出通道导致错误
 def safe_link(outputs, output_names, input_socket):
@@ -82,66 +257,157 @@ def safe_link(outputs, output_names, input_socket):
             return True
     return False
 
-# Normal 输出
-norm = tree.nodes.new('CompositorNodeOutputFile')
-norm.label = 'Normal'
-norm.base_path = os.path.join(OUTPUT_DIR, 'normal')
-norm.file_slots[0].path = 'normal_'
-norm.format.file_format = 'OPEN_EXR'
-norm.format.color_mode = 'RGB'
-# 尝试多个可能的法线通道名称
-normal_success = safe_link(rl.outputs, ['Normal', 'Normal Pass', 'normalPass'], norm.inputs[0])
-if not normal_success:
-    print("警告: 无法找到法线通道，请检查 View Layer 设置")
-
-# Depth 输出
-depth = tree.nodes.new('CompositorNodeOutputFile')
-depth.label = 'Depth'
-depth.base_path = os.path.join(OUTPUT_DIR, 'depth')
-depth.file_slots[0].path = 'depth_'
-depth.format.file_format = 'OPEN_EXR'
-# 尝试多个可能的深度通道名称
-depth_success = safe_link(rl.outputs, ['Z', 'Depth', 'depthPass'], depth.inputs[0])
-if not depth_success:
-    print("警告: 无法找到深度通道，请检查 View Layer 设置")
+def build_compositor_nodes():
+    """重建合成节点树：Normal、Depth 以及单次渲染模式下的 Silhouette 输出"""
+    for node in tree.nodes:
+        tree.nodes.remove(node)
+
+    # 输入渲染层
+    rl = tree.nodes.new('CompositorNodeRLayers')
+    rl.location = (-300, 300)
+
+    # 打印所有可用的输出通道，辅助调试
+    print("可用的输出通道:")
+    for output in rl.outputs:
+        print(f"- {output.name}")
+
+    # Normal 输出
+    norm = tree.nodes.new('CompositorNodeOutputFile')
+    norm.name = 'NormalOutput'
+    norm.label = 'Normal'
+    norm.file_slots[0].path = 'normal_'
+    norm.format.file_format = 'OPEN_EXR'
+    norm.format.color_mode = 'RGB'
+    # 尝试多个可能的法线通道名称
+    normal_success = safe_link(rl.outputs, ['Normal', 'Normal Pass', 'normalPass'], norm.inputs[0])
+    if not normal_success:
+        print("警告: 无法找到法线通道，请检查 View Layer 设置")
+
+    # Depth 输出
+    depth = tree.nodes.new('CompositorNodeOutputFile')
+    depth.name = 'DepthOutput'
+    depth.label = 'Depth'
+    depth.file_slots[0].path = 'depth_'
+    depth.format.file_format = 'OPEN_EXR'
+    # 尝试多个可能的深度通道名称
+    depth_success = safe_link(rl.outputs, ['Z', 'Depth', 'depthPass'], depth.inputs[0])
+    if not depth_success:
+        print("警告: 无法找到深度通道，请检查 View Layer 设置")
+
+    # Silhouette 输出：单次渲染模式下由合成器从同一次渲染中写出遮罩
+    if SILHOUETTE_MODE in ('INDEX', 'ALPHA'):
+        sil = tree.nodes.new('CompositorNodeOutputFile')
+        sil.name = 'SilhouetteOutput'
+        sil.label = 'Silhouette'
+        sil.file_slots[0].path = 'silhouette_'
+        sil.format.file_format = 'PNG'
+        sil.format.color_mode = 'BW'
+        if SILHOUETTE_MODE == 'INDEX':
+            id_mask = tree.nodes.new('CompositorNodeIDMask')
+            id_mask.index = SILHOUETTE_PASS_INDEX
+            id_mask.use_antialiasing = True
+            sil_success = safe_link(rl.outputs, ['IndexOB', 'Object Index'], id_mask.inputs[0])
+            tree.links.new(id_mask.outputs[0], sil.inputs[0])
+        else:
+            sil_success = safe_link(rl.outputs, ['Alpha'], sil.inputs[0])
+        if not sil_success:
+            print("警告: 无法找到遮罩所需的通道，请检查 View Layer 设置")
+
+    add_viewer_node(rl)
+
+def add_viewer_node(rl):
+    """添加 Viewer 节点：异步写入时从 'Viewer Node' 图像读取渲染结果的像素"""
+    viewer = tree.nodes.new('CompositorNodeViewer')
+    viewer.name = 'AsyncViewer'
+    viewer.location = (300, -300)
+    safe_link(rl.outputs, ['Image'], viewer.inputs[0])
+    if 'Alpha' in viewer.inputs:
+        safe_link(rl.outputs, ['Alpha'], viewer.inputs['Alpha'])
+    return viewer
+
+if not TEMPLATE_LOADED:
+    build_compositor_nodes()
+elif tree.nodes.get('AsyncViewer') is None:
+    # 旧模板中没有 Viewer 节点
+    render_layers = next((n for n in tree.nodes if n.type == 'R_LAYERS'), None)
+    if render_layers is not None:
+        add_viewer_node(render_layers)
+
+# 输出目录每次运行都可能不同，模板中的节点也要重新指定
+for node_name, sub in (('NormalOutput', 'normal'), ('DepthOutput', 'depth'), ('SilhouetteOutput', 'silhouette')):
+    node = tree.nodes.get(node_name)
+    if node is not None:
+        node.base_path = os.path.join(OUTPUT_DIR, sub)
+
+# 按输出配置设置每个 File Output 节点的位深和压缩方式（模板中的节点也按本次配置覆盖）
+apply_output_profile(tree, OUTPUT_PROFILE)
+print(f"输出配置: {OUTPUT_PROFILE}")
 
 # RGB 直接由渲染设置输出
 
 # === 材质与照明准备 ===
-# 环境光：随机 HDRI
-if os.path.isdir(HDRI_DIR):
-    hdri_files = [f for f in os.listdir(HDRI_DIR) if f.lower().endswith(('.hdr', '.exr'))]
-    if hdri_files:
-        # 确保世界存在
-        if "World" not in bpy.data.worlds:
-            world = bpy.data.worlds.new("World")
-            scene.world = world
-        else:
-            world = bpy.data.worlds["World"]
-            
-        # 确保世界使用节点
-        if not world.use_nodes:
-            world.use_nodes = True
-            
-        # 创建或获取节点树
-        node_tree = world.node_tree
-        
-        # 清理现有节点
-        for node in node_tree.nodes:
-            node_tree.nodes.remove(node)
-            
-        # 创建新节点
-        env_tex = node_tree.nodes.new('ShaderNodeTexEnvironment')
-        env_out = node_tree.nodes.new('ShaderNodeBackground')
-        output = node_tree.nodes.new('ShaderNodeOutputWorld')
-        
-        # 选择随机 HDRI
-        hdri_path = os.path.join(HDRI_DIR, random.choice(hdri_files))
-        env_tex.image = bpy.data.images.load(hdri_path)
-        
-        # 连接节点
-        node_tree.links.new(env_tex.outputs['Color'], env_out.inputs['Color'])
-        node_tree.links.new(env_out.outputs['Background'], output.inputs['Surface'])
+# 环境光：HDRI 池只加载一次，世界节点树也只建一次，之后每个视角只替换环境贴图
+hdri_pool = HdriPool(HDRI_DIR, HDRI_CACHE_DIR, HDRI_MAX_SIZE)
+hdri_env = hdri_pool.setup_world(scene) if len(hdri_pool) else None
+if hdri_env is not None:
+    hdri_pool.apply(hdri_env, hdri_pool.choose())
+
+# 动画模式下各帧(视角)使用的 HDRI，渲染到该帧时由 frame_change_pre 处理函数替换
+hdri_frames = {}
+
+def choose_view_hdri(view_index):
+    """为视角选择环境贴图并应用，返回贴图名称（没有 HDRI 时返回 None）"""
+    if hdri_env is None:
+        return None
+    image = hdri_pool.choose() if HDRI_PER_VIEW else hdri_env.image
+    hdri_frames[view_index] = image
+    hdri_pool.apply(hdri_env, image)
+    return image.name
+
+def apply_frame_hdri(scene, *args):
+    """frame_change_pre 处理函数：切换到某帧时换成该视角选中的环境贴图"""
+    image = hdri_frames.get(scene.frame_current)
+    if image is not None:
+        HdriPool.apply(hdri_env, image)
+
+if ANIMATION_RENDER and HDRI_PER_VIEW and hdri_env is not None:
+    bpy.app.handlers.frame_change_pre.append(apply_frame_hdri)
+
+# 所有模型共用的顶点色材质；模板中已有时直接复用
+def get_vertex_color_material():
+    """返回共享的顶点色 BSDF 材质（读取 'Col' 顶点颜色），不存在时创建"""
+    mat = bpy.data.materials.get(SHARED_MATERIAL_NAME)
+    if mat is not None:
+        return mat
+
+    mat = bpy.data.materials.new(name=SHARED_MATERIAL_NAME)
+    # 模型删除后材质没有用户，也要保留到模板中
+    mat.use_fake_user = True
+    mat.use_nodes = True
+    nodes = mat.node_tree.nodes
+    links = mat.node_tree.links
+
+    # 清除默认节点
+    for node in nodes:
+        nodes.remove(node)
+
+    # 创建必要节点
+    output_node = nodes.new(type='ShaderNodeOutputMaterial')
+    output_node.location = (300, 0)
+
+    bsdf_node = nodes.new(type='ShaderNodeBsdfPrincipled')
+    bsdf_node.location = (0, 0)
+
+    color_node = nodes.new(type='ShaderNodeVertexColor')
+    color_node.location = (-300, 0)
+    color_node.layer_name = 'Col'
+
+    # 连接节点
+    links.new(color_node.outputs['Color'], bsdf_node.inputs['Base Color'])
+    links.new(bsdf_node.outputs['BSDF'], output_node.inputs['Surface'])
+    return mat
+
+vertex_color_material = get_vertex_color_material()
 
 # 定义setup_camera_constraints函数
 def setup_camera_constraints(cam_obj, scene):
@@ -182,16 +448,139 @@ scene.camera = cam_obj
 cam_obj.data.lens_unit = 'FOV'
 cam_obj.data.angle = math.radians(CAMERA_FOV)  # 设置FOV角度
 
-# 设置相机约束
-camera_target = setup_camera_constraints(cam_obj, scene)
+# 设置相机约束（模板中已带有约束和目标点）
+if TEMPLATE_LOADED and USE_CAMERA_CONSTRAINTS and 'CameraTarget' in bpy.data.objects:
+    camera_target = bpy.data.objects['CameraTarget']
+else:
+    camera_target = setup_camera_constraints(cam_obj, scene)
+
+# 随机光源：固定数量的灯光组只创建一次，每个视角原地随机
+light_rig = LightRig(scene, LIGHT_RIG_SIZE, LIGHT_RIG_MIN_LIGHTS)
+
+def randomize_view_lights(model, view_index):
+    """按 (LIGHT_SEED, 模型, 视角) 随机灯光组，返回启用的灯光数"""
+    return light_rig.randomize(view_rng(LIGHT_SEED, model, view_index))
+
+# 渲染计时：区分场景同步时间与采样渲染时间
+render_timer = RenderTimer()
+render_timer.install()
+
+# 异步写入池：渲染下一个视角时，上一个视角的 PNG 编码和文本写入在后台线程中进行
+writer = AsyncWriter(ASYNC_WRITER_THREADS, ASYNC_WRITER_QUEUE) if ASYNC_WRITER else None
+
+def async_rgb_supported():
+    """RGB 能否由后台线程编码：需要 PNG 输出、Standard 视图变换（其余变换只能由 Blender 写出）和会执行的 Viewer 节点"""
+    view = scene.view_settings
+    viewer = tree.nodes.get('AsyncViewer')
+    return (writer is not None and scene.render.image_settings.file_format == 'PNG'
+            and view.view_transform == 'Standard' and view.look == 'None' and not view.use_curve_mapping
+            and scene.use_nodes and scene.render.use_compositing
+            and viewer is not None and not viewer.mute and viewer.inputs[0].is_linked)
+
+if writer is not None and (scene.view_settings.view_transform != 'Standard' or scene.view_settings.look != 'None'):
+    # 后台编码只实现了 Standard 视图变换；Blender 默认的 Filmic/AgX 会让 RGB 一直由 Blender 同步写出。
+    # 这里改为 Standard，RGB 的色调会与 Filmic/AgX 渲染的结果不同；需要原来的色调时用 --no-async-writer
+    print(f"异步写入: 视图变换由 {scene.view_settings.view_transform} 改为 Standard")
+    scene.view_settings.view_transform = 'Standard'
+    scene.view_settings.look = 'None'
+
+if writer is not None and not async_rgb_supported():
+    print("输出格式不是 PNG、开启了曲线映射或没有 Viewer 节点，RGB 仍由 Blender 同步写出，只异步写出文本输出")
+
+def clear_viewer_image():
+    """
+    渲染前删除 Viewer 图像，合成器执行 Viewer 节点时会重新创建
+
+    渲染后图像不存在说明 Viewer 节点没有执行，不能把上一个视角留下的同尺寸像素当作本视角的结果。
+    """
+    image = bpy.data.images.get('Viewer Node')
+    if image is not None:
+        bpy.data.images.remove(image)
+
+def read_viewer_pixels():
+    """读取 Viewer 节点的渲染结果，返回 (H, W, 4) float32；没有有效结果时返回 None（渲染前需调用 clear_viewer_image）"""
+    image = bpy.data.images.get('Viewer Node')
+    res_x, res_y = get_render_resolution(scene)
+    if image is None or tuple(image.size) != (res_x, res_y):
+        return None
+    pixels = np.empty(res_x * res_y * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    return pixels.reshape(res_y, res_x, 4)
+
+def write_output(func, *args, on_written=None):
+    """有写入池时交给后台线程，否则立即写入；写完后调用 on_written（例如记录断点续跑日志）"""
+    if writer is not None:
+        writer.submit(func, *args, on_done=on_written)
+        return
+    func(*args)
+    if on_written is not None:
+        on_written()
+
+def flush_writer(model=None):
+    """等待已提交的写入全部完成"""
+    if writer is None:
+        return
+    errors = writer.flush()
+    if errors:
+        print(f"警告: {model or ''} 有 {len(errors)} 个输出写入失败，对应单元未记录到断点续跑日志")
+
+def render_view(model, view_index, rgb_path=None, on_written=None):
+    """
+    渲染当前视角，打印并返回同步/渲染耗时
 
-# 随机光源（可选三点光）
-def add_random_point_light():
-    light_data = bpy.data.lights.new(name='PointLight', type='POINT')
-    light = bpy.data.objects.new(name='PointLight', object_data=light_data)
-    scene.collection.objects.link(light)
-    light.location = (random.uniform(-1,1), random.uniform(-1,1), random.uniform(0.5,2))
-    light.data.energy = random.uniform(500, 1500)
+    参数:
+        rgb_path: RGB 输出路径；支持异步写入时像素由后台线程编码，否则由 Blender 写到 scene.render.filepath
+        on_written: RGB 文件写完后的回调
+    """
+    use_async = rgb_path is not None and async_rgb_supported()
+    with stage_timer.stage('rgb_render', model, view_index):
+        if use_async:
+            clear_viewer_image()
+        timing = render_timer.render(write_still=not use_async)
+        pixels = read_viewer_pixels() if use_async else None
+    if use_async and pixels is None:
+        # Viewer 节点没有结果（例如关闭了合成），退回到 Blender 保存
+        bpy.data.images['Render Result'].save_render(filepath=rgb_path)
+    if pixels is not None:
+        settings = scene.render.image_settings
+        write_output(encode_render_png, pixels, rgb_path, settings.color_mode, int(settings.color_depth),
+                     scene.view_settings.exposure, scene.view_settings.gamma, scene.render.film_transparent,
+                     on_written=on_written)
+    elif on_written is not None:
+        on_written()
+    if tracer.enabled and timing['sync'] is not None:
+        start = time.perf_counter() - timing['total']
+        tracer.add('cycles_sync', start, timing['sync'], cat='cycles', model=model, view=view_index)
+        tracer.add('cycles_sampling', start + timing['sync'], timing['render'], cat='cycles', model=model, view=view_index)
+    sync = f"{timing['sync']:.2f}秒" if timing['sync'] is not None else "未知"
+    print(f"{model} 视角 {view_index}: 同步 {sync}，渲染 {timing['render']:.2f}秒")
+    return timing
+
+def report_batch_timing(model, timings):
+    """打印一个模型所有视角的计时汇总"""
+    summary = summarize_batch(timings)
+    if summary is None:
+        return None
+    fmt = lambda t: f"{t:.2f}秒" if t is not None else "未知"
+    print(f"{model}: {summary['views']} 个视角，首次同步 {fmt(summary['first_sync'])}，"
+          f"其余视角平均同步 {fmt(summary['mean_sync_rest'])}，平均渲染 {fmt(summary['mean_render'])}")
+    return summary
+
+# === 生成渲染模板 ===
+# 只运行一次: blender -b --python render_v3.py -- --bake-template template.blend
+# 之后用 blender -b template.blend --python render_v3.py -- [参数] 启动，跳过上面的场景重建
+if BAKE_TEMPLATE:
+    # 模板只保留场景设置，去掉启动场景中的网格(如默认立方体)
+    for obj in [o for o in scene.objects if o.type == 'MESH']:
+        mesh = obj.data
+        bpy.data.objects.remove(obj, do_unlink=True)
+        if mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+    scene[TEMPLATE_MARKER] = SILHOUETTE_MODE
+    os.makedirs(os.path.dirname(BAKE_TEMPLATE), exist_ok=True)
+    bpy.ops.wm.save_as_mainfile(filepath=BAKE_TEMPLATE, copy=True)
+    print(f"渲染模板已保存: {BAKE_TEMPLATE}")
+    sys.exit(0)
 
 # === 批量渲染主循环 ===
 # 尝试列出所有已启用的插件
@@ -209,130 +598,113 @@ for op_name in dir(bpy.ops):
         print(f" - {op_name}")
 
 # 记录要处理的PLY文件列表
-ply_files = [f for f in os.listdir(INPUT_PLY_DIR) if f.lower().endswith('.ply')]
+if MODEL_FILES:
+    ply_files = list(MODEL_FILES)
+else:
+    ply_files = [f for f in os.listdir(INPUT_PLY_DIR) if f.lower().endswith('.ply')]
 print(f"找到 {len(ply_files)} 个PLY文件需要处理")
 
 # 检查当前场景中已加载的对象
 scene_objects = [obj for obj in bpy.data.objects if obj.type == 'MESH']
 print(f"场景中已有 {len(scene_objects)} 个网格对象")
 
-# 添加检查模型是否在相机视野内的函数
-def is_object_in_camera_view(scene, cam, obj, threshold=CAMERA_MARGIN):
+# 指定了模型列表时(例如分片启动器的 worker)，总是处理 PLY 文件，并隐藏启动场景中的网格(如默认立方体)
+if MODEL_FILES and scene_objects:
+    print("已指定模型列表，隐藏场景中已有的网格对象")
+    for obj in scene_objects:
+        obj.hide_render = True
+    scene_objects = []
+
+# 断点续跑日志
+journal = JobJournal(JOURNAL_FILE) if RESUME_JOURNAL else None
+if journal:
+    print(f"断点续跑日志: {JOURNAL_FILE}，已记录 {len(journal.units)} 个完成单元")
+
+def journal_done(model, view, pass_name):
+    """该单元是否已完成并通过校验"""
+    return journal is not None and journal.is_complete(model, view, pass_name)
+
+def keypoints_done(model, view, npz_views):
     """
-    检查物体是否在相机视野内
-    
+    关键点输出是否完整：txt 由断点续跑日志校验，.npz 检查文件中是否已有该视角
+
     参数:
-        scene: 当前场景
-        cam: 相机对象
-        obj: 被检查的物体
-        threshold: 边缘缓冲区大小(CAMERA_MARGIN表示边界内预留的边距)
-    
-    返回:
-        完全在视野内返回True，否则返回False
+        npz_views: stored_views() 读出的该模型 .npz 中已有的视角
     """
-    # 获取相机矩阵
-    depsgraph = bpy.context.evaluated_depsgraph_get()
-    cam_matrix = cam.matrix_world.normalized()
-    
-    # 获取物体的边界点
-    corners = [obj.matrix_world @ Vector(corner) for corner in obj.bound_box]
-    
-    # 转换边界点到相机空间
-    cam_matrix_inv = cam_matrix.inverted()
-    corners_cam = [cam_matrix_inv @ corner for corner in corners]
-    
-    # 检查所有点是否在相机视锥体内
-    min_x = min_y = 1.0
-    max_x = max_y = -1.0
-    
-    # 相机设置
-    render = scene.render
-    res_x = render.resolution_x
-    res_y = render.resolution_y
-    scale = render.resolution_percentage / 100.0
-    aspect = res_x * scale / (res_y * scale)
-    
-    # 相机参数
-    if cam.data.type == 'PERSP':
-        lens = cam.data.lens
-        sensor_size = cam.data.sensor_width
-        sensor_fit = cam.data.sensor_fit
-        
-        if sensor_fit == 'VERTICAL':
-            sensor_size = cam.data.sensor_height
-            aspect = 1 / aspect
-        
-        fov = 2 * math.atan(sensor_size / (2 * lens))
-        
-    elif cam.data.type == 'ORTHO':
-        fov = 1.0
-    
-    # 检查各点是否在视野内
-    for corner in corners_cam:
-        # 转换到NDC空间
-        if corner.z <= 0:  # 相机后方
-            return False
-            
-        # 透视除法
-        x = corner.x / corner.z
-        y = corner.y / corner.z
-        
-        # 更新最大/最小坐标
-        min_x = min(min_x, x)
-        max_x = max(max_x, x)
-        min_y = min(min_y, y)
-        max_y = max(max_y, y)
-    
-    # 检查坐标是否在范围内(加上阈值)
-    if min_x < -1 + threshold or max_x > 1 - threshold or min_y < -1 + threshold or max_y > 1 - threshold:
-        return False
-    
-    return True
+    txt_done = KEYPOINT_FORMAT == 'NPZ' or journal_done(model, view, 'keypoints')
+    npz_done = KEYPOINT_FORMAT == 'TXT' or view in npz_views
+    return txt_done and npz_done
+
+def view_outputs_done(model, view, npz_views):
+    """
+    返回本视角各输出是否已完成 {输出类型: bool}
+
+    RGB 未完成时本视角会重新采样相机并重新渲染，已记录的遮罩、相机信息和关键点属于旧的相机位置，
+    一律视为未完成（异步写入时小文件可能先于 RGB 写完并记录）。
+    """
+    view_done = {p: journal_done(model, view, p) for p in JOURNAL_PASSES}
+    view_done['keypoints'] = keypoints_done(model, view, npz_views)
+    if not view_done['rgb']:
+        view_done = dict.fromkeys(view_done, False)
+    return view_done
+
+def journal_record(model, view, pass_name, output_paths, **extra):
+    """记录已完成的单元"""
+    if journal is not None:
+        journal.record(model, view, pass_name, output_paths, **extra)
+
+def report_progress(event, **fields):
+    """向进度文件追加一条 JSON 记录"""
+    if not PROGRESS_FILE:
+        return
+    record = {'event': event, 'time': time.time(), **fields}
+    with open(PROGRESS_FILE, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+@tracer.traced()
+def collect_garbage(model):
+    """模型处理完后清理孤立数据块，并记录常驻内存和数据块数量"""
+    if not GC_AFTER_MODEL:
+        return
+    stats = collect_model_garbage(model)
+    if MEMORY_LOG_FILE:
+        with open(MEMORY_LOG_FILE, 'a') as f:
+            f.write(json.dumps({'model': model, 'time': time.time(), **stats}) + '\n')
+    report_progress('memory', model=model, **stats)
+
+# 相机参数存储：只追加的 JSONL 文件，按模型名索引，多个 worker 可以共享同一个文件
+camera_stores = {}
+
+def get_camera_store(filepath):
+    """返回 filepath 对应的 CameraParamStore（每个文件只建立一次索引）"""
+    if filepath not in camera_stores:
+        camera_stores[filepath] = CameraParamStore(filepath)
+    return camera_stores[filepath]
 
 # 加载相机参数
 def load_camera_params(filepath, obj_name):
-    """从JSON文件加载特定对象的相机参数"""
-    if not os.path.exists(filepath):
+    """从相机参数存储加载特定对象的相机参数"""
+    if not os.path.exists(filepath) and not os.path.exists(os.path.splitext(filepath)[0] + '.json'):
         print(f"相机参数文件不存在: {filepath}")
         return None
-    
+
     try:
-        with open(filepath, 'r') as f:
-            all_params = json.load(f)
-        
-        if obj_name in all_params:
-            return all_params[obj_name]
-        else:
-            print(f"没有找到对象 {obj_name} 的相机参数")
-            return None
-    except Exception as e:
+        params = get_camera_store(filepath).get(obj_name)
+    except (OSError, ValueError) as e:
         print(f"加载相机参数失败: {e}")
         return None
+    if params is None:
+        print(f"没有找到对象 {obj_name} 的相机参数")
+    return params
 
 # 保存相机参数
+@tracer.traced()
 def save_camera_params(filepath, obj_name, camera_params):
-    """将相机参数保存到JSON文件"""
-    # 确保输出目录存在
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    
-    # 读取现有参数或创建新字典
-    all_params = {}
-    if os.path.exists(filepath):
-        try:
-            with open(filepath, 'r') as f:
-                all_params = json.load(f)
-        except:
-            pass
-    
-    # 更新当前对象的参数
-    all_params[obj_name] = camera_params
-    
-    # 保存到文件
+    """把对象的相机参数追加到相机参数存储（不再重写整个文件）"""
     try:
-        with open(filepath, 'w') as f:
-            json.dump(all_params, f, indent=2)
+        get_camera_store(filepath).put(obj_name, camera_params)
         print(f"相机参数已保存: {filepath}")
-    except Exception as e:
+    except OSError as e:
         print(f"保存相机参数失败: {e}")
 
 def setup_viewlayer_override_with_emission():
@@ -394,6 +766,203 @@ def restore_render_settings(backup):
     if world and backup.get("world_visibility") is not None:
         world.cycles_visibility.camera = backup["world_visibility"]
 
+def set_view_output_paths(stem, view_index):
+    """
+    设置当前视角的合成器输出路径
+
+    File Output 节点总会在文件名后附加帧号，这里把帧号设为视角序号，
+    并用 ### 占位，使遮罩、深度、法线文件名与 RGB 一致: {stem}_{view_index:03d}.png/.exr
+    """
+    scene.frame_current = view_index
+    for node_name in ('NormalOutput', 'DepthOutput', 'SilhouetteOutput'):
+        node = tree.nodes.get(node_name)
+        if node:
+            node.file_slots[0].path = f"{stem}_###"
+
+def view_output_paths(stem, view_index):
+    """返回一个视角各类输出文件的路径"""
+    name = f"{stem}_{view_index:03d}"
+    return {
+        'rgb': os.path.join(OUTPUT_DIR, 'rgb', f"{name}.png"),
+        'silhouette': os.path.join(OUTPUT_DIR, 'silhouette', f"{name}.png"),
+        'depth': os.path.join(OUTPUT_DIR, 'depth', f"{name}.exr"),
+        'normal': os.path.join(OUTPUT_DIR, 'normal', f"{name}.exr"),
+        'edges': os.path.join(OUTPUT_DIR, 'edges', f"{name}.png"),
+        'caminfo': os.path.join(OUTPUT_DIR, 'caminfo', f"{name}.txt"),
+        'keypoints': os.path.join(OUTPUT_DIR, 'keypoints', f"{name}.txt"),
+        'keypoints_npz': os.path.join(OUTPUT_DIR, 'keypoints', f"{stem}.npz"),
+    }
+
+def keyframe_view(frame):
+    """把当前相机、目标点和灯光组的状态记录为第 frame 帧的关键帧"""
+    cam_obj.keyframe_insert('location', frame=frame)
+    cam_obj.keyframe_insert('rotation_euler', frame=frame)
+    if camera_target:
+        camera_target.keyframe_insert('location', frame=frame)
+    light_rig.keyframe(frame)
+    # 只渲染整数帧，用常量插值保证每帧都是精确的关键帧值
+    for datablock in (cam_obj, camera_target, *light_rig.datablocks()):
+        if datablock and datablock.animation_data and datablock.animation_data.action:
+            for fcurve in datablock.animation_data.action.fcurves:
+                for point in fcurve.keyframe_points:
+                    point.interpolation = 'CONSTANT'
+
+def clear_view_keyframes():
+    """删除相机、目标点和灯光上的视角关键帧"""
+    for datablock in (cam_obj, camera_target, *light_rig.datablocks()):
+        if datablock:
+            datablock.animation_data_clear()
+
+def contiguous_runs(frames):
+    """把升序的帧号列表拆成连续的段，例如 [0, 1, 3] -> [[0, 1], [3]]"""
+    runs = []
+    for frame in frames:
+        if runs and frame == runs[-1][-1] + 1:
+            runs[-1].append(frame)
+        else:
+            runs.append([frame])
+    return runs
+
+def render_views_animation(stem, frames):
+    """
+    用一次动画渲染输出一段连续帧（每帧一个视角），RGB 和合成器输出的文件名都带视角序号
+
+    返回:
+        计时记录，另含 'frames' 帧数
+    """
+    set_view_output_paths(stem, frames[0])
+    scene.frame_start = frames[0]
+    scene.frame_end = frames[-1]
+    scene.frame_step = 1
+    scene.render.filepath = os.path.join(OUTPUT_DIR, 'rgb', f"{stem}_###")
+    with stage_timer.stage('rgb_render', stem):
+        timing = render_timer.render(animation=True)
+    timing['frames'] = len(frames)
+    print(f"{stem}: 动画渲染 {len(frames)} 个视角(帧 {frames[0]}-{frames[-1]})，耗时 {timing['total']:.2f}秒")
+    return timing
+
+@tracer.traced()
+def save_model_keypoints(stem, keypoints):
+    """把一个模型累积的关键点写成 .npz（是否完成由 .npz 中的视角判断，不写断点续跑日志）"""
+    if keypoints is None or not len(keypoints):
+        return None
+    path = view_output_paths(stem, 0)['keypoints_npz']
+    with stage_timer.stage('keypoint_export', stem):
+        views = keypoints.save(path)
+    print(f"{stem}: {len(views)} 个视角的关键点已写入 {path}")
+    return path
+
+def write_view_edges(depth, normal, path):
+    """计算并写出一个视角的边缘图（可在写入线程中运行）"""
+    write_edge_map(compute_edge_map(depth, normal), path)
+
+def export_edge_maps(stem, views):
+    """
+    由已写出的深度和法线 EXR 生成边缘图（代替 Freestyle）；EXR 在主线程读取，计算和写入交给写入池
+
+    参数:
+        views: [(视角序号, 帧号, 是否本次渲染)]，本次渲染的视角总是重新生成，其余视角只补缺失的
+    """
+    for view_index, _, rendered in views:
+        paths = view_output_paths(stem, view_index)
+        if not os.path.exists(paths['depth']) or (os.path.exists(paths['edges']) and not rendered):
+            continue
+        with stage_timer.stage('edge_export', stem, view_index):
+            depth = read_exr(paths['depth'])[..., 0]
+            normal = read_exr(paths['normal'])[..., :3] if os.path.exists(paths['normal']) else None
+            write_output(write_view_edges, depth, normal, paths['edges'])
+
+@tracer.traced()
+def write_frame_manifest(stem, views):
+    """
+    写出帧与视角的对应关系及各视角的输出文件
+
+    参数:
+        stem: 模型名
+        views: [(视角序号, 帧号, 是否本次渲染)]
+    """
+    manifest = {'model': stem, 'frames': []}
+    for view_index, frame, rendered in views:
+        manifest['frames'].append({'frame': frame, 'view': view_index, 'rendered': rendered,
+                                   **view_output_paths(stem, view_index)})
+    path = os.path.join(OUTPUT_DIR, 'manifest', f"{stem}.json")
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return path
+
+def finish_view_outputs(stem, view_index, obj, view_done, keypoints=None, cameras=None, verts_world=None, projection=None):
+    """
+    RGB 渲染完成后补齐一个视角的其余输出：旧模式遮罩、相机信息和关键点
+
+    参数:
+        keypoints: KEYPOINT_FORMAT 为 'NPZ' / 'BOTH' 时累积本模型关键点的 KeypointAccumulator
+        cameras: CAMERA_MANIFEST 开启时累积本模型相机矩阵的字典 {视角: (K, world_to_camera)}
+        verts_world, projection: 可选，批量投影得到的顶点世界坐标和本视角的投影结果，见 project_view_batch
+
+    返回:
+        当前相机参数
+    """
+    paths = view_output_paths(stem, view_index)
+
+    # 渲染遮罩（仅旧模式需要第二次渲染）
+    if SILHOUETTE_MODE == 'RENDER' and not view_done['silhouette']:
+        render_silhouette_legacy(stem, view_index)
+        journal_record(stem, view_index, 'silhouette', [paths['silhouette']])
+
+    if not view_done['caminfo']:
+        with stage_timer.stage('caminfo_export', stem, view_index):
+            export_camera_info(cam_obj, paths['caminfo'],
+                               on_written=partial(journal_record, stem, view_index, 'caminfo', [paths['caminfo']]))
+    if cameras is not None:
+        cameras[view_index] = (get_camera_intrinsics(scene, cam_obj), get_camera_extrinsics(cam_obj))
+
+    # 导出摄像机可见顶点的像素坐标：txt 和 .npz 分别判断，.npz 缺少该视角时即使 txt 已完成也要重新计算并累积；
+    # RGB 重新渲染过的视角两者都要重写
+    rerendered = not view_done['rgb']
+    if not view_done['keypoints']:
+        txt_done = KEYPOINT_FORMAT == 'NPZ' or (not rerendered and journal_done(stem, view_index, 'keypoints'))
+        txt_path = None if txt_done else paths['keypoints']
+        with stage_timer.stage('keypoint_export', stem, view_index):
+            visible = export_visible_vertex_projection(
+                obj, cam_obj, txt_path, verts_world=verts_world, projection=projection,
+                on_written=partial(journal_record, stem, view_index, 'keypoints', [txt_path]) if txt_path else None)
+        if keypoints is not None and (rerendered or view_index not in keypoints.stored_views):
+            keypoints.add(view_index, *visible)
+
+    return get_camera_params(cam_obj)
+
+def project_view_batch(views, pending_views, verts_world):
+    """
+    动画模式下批量投影关键点：逐帧取出相机矩阵，合并成 (V, 4, 4) 后只调用一次 project_points
+
+    参数:
+        views: 一批视角（帧号）
+        pending_views: {视角: 各输出是否已完成}
+        verts_world: (N, 3) 模型顶点世界坐标
+
+    返回:
+        {视角: 该视角的投影结果(V=1)}，关键点已完成的视角不包含在内
+    """
+    views = [i for i in views if not pending_views[i]['keypoints']]
+    if not views:
+        return {}
+    matrices = []
+    for i in views:
+        scene.frame_set(i)
+        matrices.append(get_camera_matrices(scene, cam_obj))
+    view_matrices, projection_matrices = (np.stack(m) for m in zip(*matrices))
+    projection = project_points(verts_world, view_matrices, projection_matrices, *get_render_resolution(scene))
+    return {i: {key: value[k:k + 1] for key, value in projection.items()} for k, i in enumerate(views)}
+
+def render_silhouette_legacy(stem, view_index):
+    """旧的遮罩生成方式：白色自发光材质覆盖后再完整渲染一次"""
+    with stage_timer.stage('silhouette_render', stem, view_index):
+        backup = backup_render_settings()
+        setup_viewlayer_override_with_emission()
+        scene.render.filepath = os.path.join(OUTPUT_DIR, 'silhouette', f"{stem}_{view_index:03d}.png")
+        bpy.ops.render.render(write_still=True)
+        restore_render_settings(backup)
+
 # 生成均匀分布在球面上的点
 def generate_uniform_sphere_points(count):
     """
@@ -453,23 +1022,138 @@ def show_progress(iteration, total, prefix='', suffix='', decimals=1, length=50,
     if iteration == total: 
         print()
 
-def update_camera_target(target_obj, obj):
-    """更新相机目标的位置"""
-    if USE_CAMERA_CONSTRAINTS and target_obj:
-        # 设置目标对象位置（如果模型不居中，则使用模型中心）
-        target_point = (0, 0, 0) if CENTER_MODEL else obj.location
-        target_obj.location = target_point
-        
-        # 更新场景以确保约束生效
-        bpy.context.view_layer.update()
+def get_camera_params(cam):
+    """记录当前视角的相机参数（位置和包含约束影响的旋转），格式与 load_camera_params 读取的一致"""
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    matrix = cam.evaluated_get(depsgraph).matrix_world
+    return {
+        'location': list(matrix.translation),
+        'rotation': list(matrix.to_euler()),
+    }
+
+def get_camera_target_point(obj):
+    """相机看向的点，与相机目标对象及手动朝向的逻辑一致"""
+    if USE_CAMERA_CONSTRAINTS and camera_target and not CENTER_MODEL:
+        return obj.location.copy()
+    return Vector((0, 0, 0))
+
+def solve_camera_location(model_points, target_point, sampled_location):
+    """
+    保持采样得到的观察方向，解析求出使模型刚好留出 CAMERA_MARGIN 边距的相机位置
+
+    参数:
+        model_points: (N, 3) 模型凸包顶点世界坐标，见 get_hull_vertices_world
+        target_point: 相机看向的点
+        sampled_location: 采样得到的相机位置，只使用其方向
+
+    返回:
+        相机位置 (Vector)
+    """
+    direction = sampled_location - target_point
+    if direction.length < 1e-9:
+        direction = Vector((0, -1, 0))
+    tan_x, tan_y = get_camera_tan_half_fov(cam_obj.data, *get_render_resolution(scene))
+    distance = solve_camera_distance(model_points, np.array(target_point), np.array(direction),
+                                     tan_x, tan_y, CAMERA_MARGIN, cam_obj.data.clip_start)[0]
+    distance *= random.uniform(1.0, 1.0 + CAMERA_DISTANCE_JITTER)
+    return target_point + direction.normalized() * distance
+
+def sample_camera_location(view_index, uniform_points, min_camera_distance, max_dim, adjust_elevation=True, rotate_y90=False):
+    """
+    按原有的随机规则采样一个相机位置
 
-def export_camera_info(cam, filepath):
+    参数:
+        view_index: 视角序号，均匀分布模式下取对应的球面点
+        uniform_points: generate_uniform_sphere_points 的结果，为空时完全随机
+        min_camera_distance: 最小相机距离
+        max_dim: 模型最大尺寸
+        adjust_elevation: 均匀分布模式下是否按 TEETH_MODE 调整仰角
+        rotate_y90: 均匀分布模式下是否把位置绕 Y 轴旋转 90°
+
+    返回:
+        相机位置 (Vector)
+    """
+    if UNIFORM_CAMERA_DISTRIBUTION and uniform_points:
+        # 使用预生成的均匀分布点
+        azimuth, elevation = uniform_points[view_index]
+
+        if adjust_elevation:
+            # 针对牙列模型优化相机角度
+            if TEETH_MODE:
+                # 牙列模型通常需要更多从上方和侧面的视角
+                if random.random() < 0.7:  # 70%的概率偏向上方视角
+                    elevation = random.uniform(0.1, 0.7)  # 更多从上方看的角度
+                else:
+                    elevation = random.uniform(-0.3, 0.3)  # 其余从侧面看
+            else:
+                # 调整高度角范围，避免过高或过低
+                elevation = max(min(elevation, math.pi/4), -math.pi/4)
+
+        # 随机调整距离
+        radius = random.uniform(min_camera_distance, min_camera_distance * 1.5)
+
+        # 转换为笛卡尔坐标
+        x = radius * math.cos(elevation) * math.cos(azimuth)
+        y = radius * math.cos(elevation) * math.sin(azimuth)
+        z = radius * math.sin(elevation)
+        z = abs(z) + min_camera_distance * 0.3  # 确保高度总是有一定值
+        position = Vector((x, y, z))
+
+        if rotate_y90:
+            # 绕 Y 轴旋转 90°
+            position = Matrix.Rotation(math.radians(90), 4, 'Y') @ position
+        return position
+
+    # 完全随机生成
+    angle = random.uniform(0, 2*math.pi)
+
+    # 针对牙列模型优化相机角度
+    if TEETH_MODE:
+        if random.random() < 0.7:  # 70%的概率偏向上方视角
+            elev = random.uniform(0.5, 1.0)  # 更多从上方看的角度
+        else:
+            elev = random.uniform(0.2, 0.5)  # 其余从侧面看
+    else:
+        elev = random.uniform(0.2, 1.0)
+
+    radius = random.uniform(min_camera_distance, min_camera_distance * 2)
+    return Vector((radius * math.cos(angle), radius * math.sin(angle), elev * max_dim))
+
+def find_camera_location(model_points, target_point, sample, max_attempts=20):
+    """
+    为自适应相机找到一个能完整拍到模型的位置
+
+    ANALYTIC 模式只采样一次方向并解析求出距离；SAMPLING 模式一次性采样
+    max_attempts 个候选位置，用 NumPy 同时检查全部候选，取第一个满足边距的。
+
+    参数:
+        model_points: (N, 3) 模型凸包顶点世界坐标，见 get_hull_vertices_world
+        target_point: 相机看向的点
+        sample: 无参函数，每次调用返回一个采样的相机位置
+        max_attempts: SAMPLING 模式下的候选数量
+
+    返回:
+        (相机位置, 是否满足边距)；没有候选满足时返回边距最大的那个
+    """
+    if CAMERA_SOLVER == 'ANALYTIC':
+        return solve_camera_location(model_points, target_point, sample()), True
+
+    candidates = np.array([sample() for _ in range(max_attempts)])
+    tan_x, tan_y = get_camera_tan_half_fov(cam_obj.data, *get_render_resolution(scene))
+    fits, slack = frustum_fit(model_points, look_at_matrices(candidates, np.array(target_point)),
+                              tan_x, tan_y, CAMERA_MARGIN, cam_obj.data.clip_start)
+    if fits.any():
+        return Vector(candidates[np.flatnonzero(fits)[0]]), True
+    return Vector(candidates[int(np.argmax(slack))]), False
+
+def export_camera_info(cam, filepath, on_written=None):
     """
     导出摄像机的基本参数信息到 txt 文件（包含约束影响的旋转）。
     
     参数:
         cam: 摄像机对象
         filepath: 保存的 txt 文件路径
+        on_written: 文件写完后的回调（异步写入时在后台线程中调用）
     """
     depsgraph = bpy.context.evaluated_depsgraph_get()
     cam_eval = cam.evaluated_get(depsgraph)
@@ -478,62 +1162,71 @@ def export_camera_info(cam, filepath):
     rot_world = cam_eval.matrix_world.to_euler()  # 世界空间旋转（带约束）
     data = cam_eval.data
 
-    with open(filepath, 'w') as f:
-        f.write("Camera Info:\n")
-        f.write(f"Location: {loc.x:.6f}, {loc.y:.6f}, {loc.z:.6f}\n")
-        f.write(f"Rotation (Euler XYZ, in degrees): {rot_world.x * 57.2958:.2f}, {rot_world.y * 57.2958:.2f}, {rot_world.z * 57.2958:.2f}\n")
-        f.write(f"Shift X: {data.shift_x:.6f}\n")
-        f.write(f"Shift Y: {data.shift_y:.6f}\n")
-        f.write(f"Focal Angle: {data.lens:.2f} \n")
+    # 在主线程读取相机数据，文件写入交给写入池
+    text = ("Camera Info:\n"
+            f"Location: {loc.x:.6f}, {loc.y:.6f}, {loc.z:.6f}\n"
+            f"Rotation (Euler XYZ, in degrees): {rot_world.x * 57.2958:.2f}, {rot_world.y * 57.2958:.2f}, {rot_world.z * 57.2958:.2f}\n"
+            f"Shift X: {data.shift_x:.6f}\n"
+            f"Shift Y: {data.shift_y:.6f}\n"
+            f"Focal Angle: {data.lens:.2f} \n")
+    write_output(write_text, filepath, text, on_written=on_written)
 
     print(f"摄像机信息已写入: {filepath}")
 
-def export_visible_vertex_projection(obj, cam, txt_path,  point_radius=5, visibility_threshold=0.2, cleanup_prefix="temp_cube_"):
+def export_visible_vertex_projection(obj, cam, txt_path,  point_radius=5, visibility_threshold=0.2, cleanup_prefix="temp_cube_", verts_world=None, projection=None, on_written=None):
     """
     导出摄像机可见顶点的像素坐标和投影图像。
 
     参数:
         obj: 要处理的 Blender 对象
         cam: 摄像机对象
-        txt_path: txt 文件保存路径
+        txt_path: txt 文件保存路径，为空时不写文本文件
         img_path: PNG 图像保存路径
         point_radius: 在图像上绘制点的半径
         visibility_threshold: 可见性判断的距离阈值
+        verts_world: 可选，预先取出的 (N, 3) 世界坐标顶点
+        projection: 可选，project_points 针对当前视角的结果（V=1），用于批量投影后复用
+        on_written: txt 文件写完后的回调（异步写入时在后台线程中调用）
+
+    返回:
+        (vertex_index, pixel, depth) 可见顶点的序号、像素坐标和相机空间深度
     """
     scene = bpy.context.scene
-    render = scene.render
-    res_x = int(render.resolution_x * render.resolution_percentage / 100.0)
-    res_y = int(render.resolution_y * render.resolution_percentage / 100.0)
-
-    verts_world = [obj.matrix_world @ v.co for v in obj.data.vertices]
-    visible_points = []
-
-    for i, v in enumerate(verts_world):
-        co2D = world_to_camera_view(scene, cam, v)
-        x, y, z = co2D
-        
-        # 可选：添加辅助立方体（用于调试）
-        # bpy.ops.mesh.primitive_cube_add(size=0.02, location=v)
-        # cube = bpy.context.active_object
-        # cube.name = f"{cleanup_prefix}{i}"  # 给临时物体命名，方便后续删除
+    res_x, res_y = get_render_resolution(scene)
+
+    # 一次性取出全部顶点并用 NumPy 完成投影
+    if verts_world is None:
+        verts_world = get_mesh_vertices_world(obj)
+    if projection is None:
+        view, proj = get_camera_matrices(scene, cam)
+        projection = project_points(verts_world, view, proj, res_x, res_y)
+
+    in_frustum = projection['in_frustum'][0]
+    pixels = projection['pixel'][0]
+    candidates = np.flatnonzero(in_frustum)
+
+    # 可选：添加辅助立方体（用于调试）
+    # bpy.ops.mesh.primitive_cube_add(size=0.02, location=v)
+    # cube = bpy.context.active_object
+    # cube.name = f"{cleanup_prefix}{i}"  # 给临时物体命名，方便后续删除
+
+    # 只对视野内的顶点做遮挡检查
+    cam_location = np.array(cam.matrix_world.translation)
+    if KEYPOINT_OCCLUSION == 'BVH':
+        engine = get_occlusion_engine(obj, verts_world)
+        visible = engine.visible(cam_location, candidates, visibility_threshold,
+                                 backface_cull=KEYPOINT_BACKFACE_CULL)
+    else:
+        visible = visible_by_scene_ray_cast(scene, bpy.context.view_layer.depsgraph, verts_world,
+                                            cam_location, candidates, visibility_threshold)
+    visible = np.asarray(visible, dtype=np.int64)
 
-        
-        if 0.0 <= x <= 1.0 and 0.0 <= y <= 1.0 and z >= 0.0:
-            # 检查是否可见
-            result, hit_loc, _, _, _, _ = scene.ray_cast(
-                bpy.context.view_layer.depsgraph, cam.location, (v - cam.location).normalized()
-            )
-            if result and (v - hit_loc).length < visibility_threshold:
-                px = round(x * res_x)
-                py = round(y * res_y)
-                visible_points.append((i, px, py))
-    
     # 写入可见顶点坐标到 txt 文件
-    with open(txt_path, 'w') as f:
-        for idx, px, py in visible_points:
-            f.write(f"{idx},{px},{py}\n")
-
-    print(f"可见顶点数: {len(visible_points)}，已写入: {txt_path}")
+    if txt_path:
+        visible_points = [(int(i), int(pixels[i, 0]), int(pixels[i, 1])) for i in visible]
+        text = ''.join(f"{idx},{px},{py}\n" for idx, px, py in visible_points)
+        write_output(write_text, txt_path, text, on_written=on_written)
+        print(f"可见顶点数: {len(visible_points)}，已写入: {txt_path}")
 
     # 创建图像并绘制点
     # img = Image.new("RGB", (res_x, res_y), color=(255, 255, 255))
@@ -552,6 +1245,8 @@ def export_visible_vertex_projection(obj, cam, txt_path,  point_radius=5, visibi
             obj.select_set(True)
     bpy.ops.object.delete()
 
+    return visible, pixels[visible], projection['depth'][0][visible]
+
 if len(scene_objects) > 0:
     # 使用场景中已有的对象
     print("使用场景中已有的对象进行渲染...")
@@ -568,11 +1263,13 @@ if len(scene_objects) > 0:
         obj.hide_viewport = True
     
     for obj in scene_objects:
+        model_start_perf = time.perf_counter()
         print(f"处理对象: {obj.name}")
         
         # 显示当前要处理的对象
         obj.hide_render = False
         obj.hide_viewport = False
+        obj.pass_index = SILHOUETTE_PASS_INDEX
         
         # 计算模型的中心点
         local_bbox_center = sum((Vector(b) for b in obj.bound_box), Vector()) / 8
@@ -585,6 +1282,11 @@ if len(scene_objects) > 0:
         if CENTER_MODEL:
             print(f"将模型 {obj.name} 居中处理...")
             obj.location = (0, 0, 0)
+            bpy.context.view_layer.update()
+        
+        # 相机取景使用的模型凸包顶点与目标点
+        model_points = get_hull_vertices_world(obj)
+        target_point = get_camera_target_point(obj)
         
         # 计算模型的边界框尺寸，用于确定合适的相机距离
         bound_box = [obj.matrix_world @ Vector(corner) for corner in obj.bound_box]
@@ -605,6 +1307,7 @@ if len(scene_objects) > 0:
         
         # 存储当前对象的相机参数
         camera_params = []
+        view_timings = []
         
         # 预生成均匀分布的相机位置
         if UNIFORM_CAMERA_DISTRIBUTION and not loaded_camera_params:
@@ -616,6 +1319,7 @@ if len(scene_objects) > 0:
         # 渲染多视角
         for i in range(NUM_VIEWS_PER_MODEL):
             view_start_time = time.time()
+            view_start_perf = time.perf_counter()
             
             # 计算并显示总体进度
             current_render += 1
@@ -639,129 +1343,53 @@ if len(scene_objects) > 0:
             else:
                 # 生成新的相机参数
                 # 尝试找到一个合适的相机角度，确保模型在视野内
-                attempts = 0
-                max_attempts = 20  # 最多尝试次数
+                max_attempts = 20  # SAMPLING 模式下的候选位置数
                 camera_position_found = False
-                
-                while (not camera_position_found) and attempts < max_attempts and ADAPTIVE_CAMERA:
-                    if UNIFORM_CAMERA_DISTRIBUTION and uniform_points:
-                        # 使用预生成的均匀分布点
-                        azimuth, elevation = uniform_points[i]
-                        
-                        # 针对牙列模型优化相机角度
-                        if TEETH_MODE:
-                            # 牙列模型通常需要更多从上方和侧面的视角
-                            if random.random() < 0.7:  # 70%的概率偏向上方视角
-                                elevation = random.uniform(0.1, 0.7)  # 更多从上方看的角度
-                            else:
-                                elevation = random.uniform(-0.3, 0.3)  # 其余从侧面看
-                        else:
-                            # 调整高度角范围，避免过高或过低
-                            elevation = max(min(elevation, math.pi/4), -math.pi/4)
-                        
-                        # 随机调整距离
-                        radius = random.uniform(min_camera_distance, min_camera_distance * 1.5)
-                        
-                        # 转换为笛卡尔坐标
-                        x = radius * math.cos(elevation) * math.cos(azimuth)
-                        y = radius * math.cos(elevation) * math.sin(azimuth)
-                        z = radius * math.sin(elevation)
-                        z = abs(z) + min_camera_distance * 0.3  # 确保高度总是有一定值
-                    else:
-                        # 完全随机生成
-                        angle = random.uniform(0, 2*math.pi)
-                        
-                        # 针对牙列模型优化相机角度
-                        if TEETH_MODE:
-                            if random.random() < 0.7:  # 70%的概率偏向上方视角
-                                elev = random.uniform(0.5, 1.0)  # 更多从上方看的角度
-                            else:
-                                elev = random.uniform(0.2, 0.5)  # 其余从侧面看
-                        else:
-                            elev = random.uniform(0.2, 1.0)
-                        
-                        radius = random.uniform(min_camera_distance, min_camera_distance * 2)
-                        
-                        x = radius * math.cos(angle)
-                        y = radius * math.sin(angle)
-                        z = elev * max_dim
-                    
-                    cam_obj.location = (x, y, z)
-                    
+
+                if ADAPTIVE_CAMERA:
+                    with stage_timer.stage('camera_search', obj.name, i):
+                        cam_obj.location, camera_position_found = find_camera_location(
+                            model_points, target_point,
+                            lambda: sample_camera_location(i, uniform_points, min_camera_distance, max_dim, adjust_elevation=True),
+                            max_attempts)
+
                     # 如果不使用约束，手动设置相机朝向
                     if not USE_CAMERA_CONSTRAINTS:
                         # 让相机朝向原点(0,0,0)
                         direction = mathutils.Vector((0, 0, 0)) - cam_obj.location
                         rot_quat = direction.to_track_quat('-Z', 'Y')
                         cam_obj.rotation_euler = rot_quat.to_euler()
-                    # 更新相机目标位置
-                    update_camera_target(camera_target, obj)
-                    
-                    # 检查模型是否在相机视野内
-                    if is_object_in_camera_view(scene, cam_obj, obj):
-                        camera_position_found = True
-                    else:
-                        attempts += 1
-                
+                    # 候选位置已用 NumPy 检查过，只需设置目标点，不必刷新依赖图
+                    if camera_target:
+                        camera_target.location = target_point
+
                 if not camera_position_found and ADAPTIVE_CAMERA:
-                    print(f"警告: 无法找到合适的相机位置拍摄到完整模型 {obj.name}，使用最后一次尝试的位置")
+                    print(f"警告: 无法找到合适的相机位置拍摄到完整模型 {obj.name}，使用边距最大的候选位置")
                 elif not ADAPTIVE_CAMERA:
-                    # 如果不使用自适应相机，则直接设置随机角度
-                    if UNIFORM_CAMERA_DISTRIBUTION and uniform_points:
-                        azimuth, elevation = uniform_points[i]
-                        
-                        # 针对牙列模型优化相机角度
-                        if TEETH_MODE:
-                            if random.random() < 0.7:
-                                elevation = random.uniform(0.1, 0.7)
-                            else:
-                                elevation = random.uniform(-0.3, 0.3)
-                        else:
-                            elevation = max(min(elevation, math.pi/4), -math.pi/4)
-                            
-                        radius = random.uniform(min_camera_distance, min_camera_distance * 1.5)
-                        
-                        x = radius * math.cos(elevation) * math.cos(azimuth)
-                        y = radius * math.cos(elevation) * math.sin(azimuth)
-                        z = radius * math.sin(elevation)
-                        z = abs(z) + min_camera_distance * 0.3
-                    else:
-                        angle = random.uniform(0, 2*math.pi)
-                        
-                        # 针对牙列模型优化相机角度
-                        if TEETH_MODE:
-                            if random.random() < 0.7:
-                                elev = random.uniform(0.5, 1.0)
-                            else:
-                                elev = random.uniform(0.2, 0.5)
-                        else:
-                            elev = random.uniform(0.2, 1.0)
-                            
-                        radius = random.uniform(min_camera_distance, min_camera_distance * 2)
-                        
-                        x = radius * math.cos(angle)
-                        y = radius * math.sin(angle)
-                        z = elev * max_dim
-                    
-                    cam_obj.location = (x, y, z)
+                    # 如果不使用自适应相机，则直接使用随机采样的位置
+                    cam_obj.location = sample_camera_location(i, uniform_points, min_camera_distance, max_dim)
             
-            # 随机灯光
-            add_random_point_light()
+            # 随机灯光和环境贴图
+            randomize_view_lights(obj.name, i)
+            choose_view_hdri(i)
     
-            # 渲染 RGB
+            # 渲染 RGB（单次渲染模式下遮罩由合成器同时写出）
+            set_view_output_paths(obj.name, i)
             scene.render.filepath = os.path.join(OUTPUT_DIR, 'rgb', f"{obj.name}_{i:03d}.png")
-            bpy.ops.render.render(write_still=True)
+            timing = render_view(obj.name, i)
+            view_timings.append(timing)
             
             # 显示单个视角渲染时间
             view_time = time.time() - view_start_time
             print(f"\n完成视角渲染，耗时 {view_time:.2f}秒")
     
-            scene.render.filepath = os.path.join(OUTPUT_DIR, 'silhouette', f"{obj.name}_{i:03d}.png")
-            bpy.ops.render.render(write_still=True)
-    
-            # 清理光源
-            for obj_light in [o for o in scene.objects if o.type=='LIGHT' and o.name.startswith('PointLight')]:
-                bpy.data.objects.remove(obj_light, do_unlink=True)
+            if SILHOUETTE_MODE == 'RENDER':
+                render_silhouette_legacy(obj.name, i)
+
+            camera_params.append(get_camera_params(cam_obj))
+            report_progress('view', model=obj.name, view=i, seconds=view_time,
+                            sync_seconds=timing['sync'], render_seconds=timing['render'])
+            tracer.record('view', view_start_perf, model=obj.name, view=i)
         
         # 恢复模型的原始位置
         if CENTER_MODEL:
@@ -770,10 +1398,17 @@ if len(scene_objects) > 0:
         # 保存最终的相机参数
         if SAVE_CAMERA_PARAMS and camera_params:
             save_camera_params(CAMERA_PARAMS_FILE, obj.name, camera_params)
+        if EDGE_MAPS:
+            export_edge_maps(obj.name, [(i, i, True) for i in range(NUM_VIEWS_PER_MODEL)])
+        flush_writer(obj.name)
+        report_progress('model', model=obj.name, views=NUM_VIEWS_PER_MODEL,
+                        timing=report_batch_timing(obj.name, view_timings))
+        tracer.record('model', model_start_perf, model=obj.name)
         
         # 处理完后，再次隐藏当前对象
         obj.hide_render = True
         obj.hide_viewport = True
+        collect_garbage(obj.name)
     
     # 渲染完所有对象后，恢复它们的可见性
     for obj in bpy.data.objects:
@@ -790,12 +1425,20 @@ else:
     
     start_time = time.time()
 
+    # 预处理网格缓存：命中时跳过 PLY 解析和居中计算
+    mesh_cache = MeshCache(MESH_CACHE_DIR, int(MESH_CACHE_MAX_GB * 1024 ** 3)) if MESH_CACHE_DIR else None
+
     def import_single_ply(ply_dir, ply_file):
         full_path = os.path.join(ply_dir, ply_file)
         if not os.path.exists(full_path):
             print(f"文件不存在: {full_path}")
             return None
         
+        # 后台模式(blender -b)下没有窗口，直接调用导入算子
+        if not bpy.context.window_manager.windows:
+            bpy.ops.wm.ply_import(filepath=full_path)
+            return [o for o in bpy.context.view_layer.objects if o.select_get()][0]
+
         # 遍历所有窗口和区域，寻找 VIEW_3D 区域
         for window in bpy.context.window_manager.windows:
             screen = window.screen
@@ -816,7 +1459,7 @@ else:
         return obj
     def assign_bsdf_material_from_col(obj):
         """
-        为对象创建并分配一个使用顶点颜色 'Col' 的 BSDF 材质。
+        为对象分配共享的顶点色 BSDF 材质（读取顶点颜色 'Col'）。
         """
         if obj.type != 'MESH':
             print(f"{obj.name} 不是 Mesh 类型，跳过")
@@ -829,30 +1472,7 @@ else:
             print(f"{obj.name} 不包含 'Col' 顶点颜色")
             return
 
-        # 创建材质
-        mat = bpy.data.materials.new(name=f"{obj.name}_Mat")
-        mat.use_nodes = True
-        nodes = mat.node_tree.nodes
-        links = mat.node_tree.links
-
-        # 清除默认节点
-        for node in nodes:
-            nodes.remove(node)
-
-        # 创建必要节点
-        output_node = nodes.new(type='ShaderNodeOutputMaterial')
-        output_node.location = (300, 0)
-
-        bsdf_node = nodes.new(type='ShaderNodeBsdfPrincipled')
-        bsdf_node.location = (0, 0)
-
-        color_node = nodes.new(type='ShaderNodeVertexColor')
-        color_node.location = (-300, 0)
-        color_node.layer_name = 'Col'
-
-        # 连接节点
-        links.new(color_node.outputs['Color'], bsdf_node.inputs['Base Color'])
-        links.new(bsdf_node.outputs['BSDF'], output_node.inputs['Surface'])
+        mat = vertex_color_material
 
         # 分配材质
         if obj.data.materials:
@@ -860,12 +1480,31 @@ else:
         else:
             obj.data.materials.append(mat)
 
-        print(f"已为 {obj.name} 创建并分配顶点色材质")
+        print(f"已为 {obj.name} 分配顶点色材质")
 
     for ply_file in ply_files:
+        model_start_perf = time.perf_counter()
+        stem = os.path.splitext(os.path.basename(ply_file))[0]
+
+        # 所有视角的输出都已完整时，连模型都不需要导入
+        npz_views = stored_views(view_output_paths(stem, 0)['keypoints_npz']) if KEYPOINT_FORMAT != 'TXT' else set()
+        if journal and all(all(view_outputs_done(stem, i, npz_views).values()) for i in range(NUM_VIEWS_PER_MODEL)):
+            print(f"跳过已完成的模型: {ply_file}")
+            current_render += NUM_VIEWS_PER_MODEL
+            report_progress('model', model=stem, views=NUM_VIEWS_PER_MODEL, skipped=True)
+            continue
+
         print(f"处理模型: {ply_file}")
-        obj = import_single_ply(INPUT_PLY_DIR, ply_file)
+        with stage_timer.stage('import', stem):
+            if PLY_IMPORTER == 'NATIVE':
+                # 读取时已把几何中心移到原点
+                obj = load_ply_object(os.path.join(INPUT_PLY_DIR, ply_file), center=True, cache=mesh_cache)
+            else:
+                obj = import_single_ply(INPUT_PLY_DIR, ply_file)
+        if obj is None:
+            continue
         assign_bsdf_material_from_col(obj)
+        obj.pass_index = SILHOUETTE_PASS_INDEX
         
         # 创建立方体
         # print(f"创建立方体代替 {ply_file}...")
@@ -882,14 +1521,19 @@ else:
         
         # if new_objects:
         #     obj = list(new_objects)[0]  # 获取新创建的对象
-        #     obj.name = os.path.splitext(ply_file)[0]
+        #     obj.name = stem
         #     print(f"创建了对象: {obj.name}")
         # else:
         #     print("警告: 无法创建新对象")
         #     continue
         
-        bpy.ops.object.origin_set(type='ORIGIN_GEOMETRY', center='MEDIAN')
-        bpy.ops.object.location_clear(clear_delta=False)
+        if PLY_IMPORTER != 'NATIVE':
+            bpy.ops.object.origin_set(type='ORIGIN_GEOMETRY', center='MEDIAN')
+            bpy.ops.object.location_clear(clear_delta=False)
+
+        # 相机取景使用的模型凸包顶点与目标点
+        model_points = get_hull_vertices_world(obj)
+        target_point = get_camera_target_point(obj)
         
         # 获取立方体尺寸作为基准距离
         bound_box = [obj.matrix_world @ Vector(corner) for corner in obj.bound_box]
@@ -905,6 +1549,12 @@ else:
         
         # 存储当前对象的相机参数
         camera_params = []
+        view_timings = []
+        # 动画模式下等待渲染的视角 {视角序号: 各输出是否已完成}，以及帧清单 [(视角, 帧, 是否渲染)]
+        pending_views = {}
+        model_keypoints = KeypointAccumulator(stem, get_render_resolution(scene), npz_views) if KEYPOINT_FORMAT != 'TXT' else None
+        model_cameras = {} if CAMERA_MANIFEST else None
+        manifest_views = []
         
         # 预生成均匀分布的相机位置
         if UNIFORM_CAMERA_DISTRIBUTION and not loaded_camera_params:
@@ -916,6 +1566,7 @@ else:
         # 渲染多视角
         for i in range(NUM_VIEWS_PER_MODEL):
             view_start_time = time.time()
+            view_start_perf = time.perf_counter()
             
             # 计算并显示总体进度
             current_render += 1
@@ -927,9 +1578,23 @@ else:
             progress_prefix = f"模型 {ply_file} ({ply_files.index(ply_file)+1}/{len(ply_files)})"
             progress_suffix = f"视角 {i+1}/{NUM_VIEWS_PER_MODEL} | 剩余时间: {remaining_time:.1f}秒"
             show_progress(current_render, total_renders, prefix=progress_prefix, suffix=progress_suffix)
+
+            # 断点续跑：检查本视角哪些输出已经完成
+            view_done = view_outputs_done(stem, i, npz_views)
+            resume_record = journal.get(stem, i, 'rgb') if view_done['rgb'] else None
+            if all(view_done.values()):
+                print(f"跳过已完成的视角 {i+1}/{NUM_VIEWS_PER_MODEL}")
+                camera_params.append(resume_record['camera'])
+                manifest_views.append((i, i, False))
+                continue
             
             # 使用已加载的相机参数或生成新的参数
-            if loaded_camera_params and i < len(loaded_camera_params):
+            if resume_record:
+                # RGB 已渲染过，恢复当时的相机位置，保证补做的输出与图像一致
+                cam_obj.location = tuple(resume_record['camera']['location'])
+                cam_obj.rotation_euler = mathutils.Euler(resume_record['camera']['rotation'])
+                camera_position_found = True
+            elif loaded_camera_params and i < len(loaded_camera_params):
                 # 使用保存的相机参数
                 params = loaded_camera_params[i]
                 cam_obj.location = tuple(params['location'])
@@ -939,62 +1604,15 @@ else:
             else:
                 # 生成新的相机参数
                 # 尝试找到一个合适的相机角度，确保模型在视野内
-                attempts = 0
-                max_attempts = 20  # 最多尝试次数
+                max_attempts = 20  # SAMPLING 模式下的候选位置数
                 camera_position_found = False
-                
-                while (not camera_position_found) and attempts < max_attempts and ADAPTIVE_CAMERA:
-                    if UNIFORM_CAMERA_DISTRIBUTION and uniform_points:
-                        # 使用预生成的均匀分布点
-                        azimuth, elevation = uniform_points[i]
-                        
-                        # 针对牙列模型优化相机角度
-#                        if TEETH_MODE:
-#                            # 牙列模型通常需要更多从上方和侧面的视角
-#                            if random.random() < 0.7:  # 70%的概率偏向上方视角
-#                                elevation = random.uniform(0.1, 0.7)  # 更多从上方看的角度
-#                            else:
-#                                elevation = random.uniform(-0.3, 0.3)  # 其余从侧面看
-#                        else:
-#                            # 调整高度角范围，避免过高或过低
-#                            elevation = max(min(elevation, math.pi/4), -math.pi/4)
-#                        
-                        # 随机调整距离
-                        radius = random.uniform(min_camera_distance, min_camera_distance * 1.5)
-                        # 转换为笛卡尔坐标
-                        x = radius * math.cos(elevation) * math.cos(azimuth)
-                        y = radius * math.cos(elevation) * math.sin(azimuth)
-                        z = radius * math.sin(elevation)
-                        z = abs(z) + min_camera_distance * 0.3  # 确保高度总是有一定值
-
-                        position = Vector((x, y, z))
-                        # 创建绕 Y 轴旋转 90° 的旋转矩阵
-                        angle_rad = math.radians(90)
-                        rotation_matrix = Matrix.Rotation(angle_rad, 4, 'Y')  # 4x4 旋转矩阵
-                        # 执行旋转
-                        rotated_position = rotation_matrix @ position
-                        (x, y, z) = rotated_position
-                        
-                    else:
-                        # 完全随机生成
-                        angle = random.uniform(0, 2*math.pi)
-                        
-                        # 针对牙列模型优化相机角度
-                        if TEETH_MODE:
-                            if random.random() < 0.7:  # 70%的概率偏向上方视角
-                                elev = random.uniform(0.5, 1.0)  # 更多从上方看的角度
-                            else:
-                                elev = random.uniform(0.2, 0.5)  # 其余从侧面看
-                        else:
-                            elev = random.uniform(0.2, 1.0)
-                        
-                        radius = random.uniform(min_camera_distance, min_camera_distance * 2)
-                        
-                        x = radius * math.cos(angle)
-                        y = radius * math.sin(angle)
-                        z = elev * max_dim
-                    
-                    cam_obj.location = (x, y, z)
+
+                if ADAPTIVE_CAMERA:
+                    with stage_timer.stage('camera_search', stem, i):
+                        cam_obj.location, camera_position_found = find_camera_location(
+                            model_points, target_point,
+                            lambda: sample_camera_location(i, uniform_points, min_camera_distance, max_dim, adjust_elevation=False, rotate_y90=True),
+                            max_attempts)
 
                     # 如果不使用约束，手动设置相机朝向
                     if not USE_CAMERA_CONSTRAINTS:
@@ -1002,98 +1620,118 @@ else:
                         direction = mathutils.Vector((0, 0, 0)) - cam_obj.location
                         rot_quat = direction.to_track_quat('-Z', 'Y')
                         cam_obj.rotation_euler = rot_quat.to_euler()
-                    # 更新相机目标位置
-                    update_camera_target(camera_target, obj)
-                    
-                    # 检查模型是否在相机视野内
-                    if is_object_in_camera_view(scene, cam_obj, obj):
-                        camera_position_found = True
-                    else:
-                        attempts += 1
-                
+                    # 候选位置已用 NumPy 检查过，只需设置目标点，不必刷新依赖图
+                    if camera_target:
+                        camera_target.location = target_point
+
                 if not camera_position_found and ADAPTIVE_CAMERA:
-                    print(f"警告: 无法找到合适的相机位置拍摄到完整模型 {obj.name}，使用最后一次尝试的位置")
+                    print(f"警告: 无法找到合适的相机位置拍摄到完整模型 {obj.name}，使用边距最大的候选位置")
                 elif not ADAPTIVE_CAMERA:
-                    # 如果不使用自适应相机，则直接设置随机角度
-                    if UNIFORM_CAMERA_DISTRIBUTION and uniform_points:
-                        azimuth, elevation = uniform_points[i]
-                        
-                        # 针对牙列模型优化相机角度
-                        if TEETH_MODE:
-                            if random.random() < 0.7:
-                                elevation = random.uniform(0.1, 0.7)
-                            else:
-                                elevation = random.uniform(-0.3, 0.3)
-                        else:
-                            elevation = max(min(elevation, math.pi/4), -math.pi/4)
-                            
-                        radius = random.uniform(min_camera_distance, min_camera_distance * 1.5)
-                        
-                        x = radius * math.cos(elevation) * math.cos(azimuth)
-                        y = radius * math.cos(elevation) * math.sin(azimuth)
-                        z = radius * math.sin(elevation)
-                        z = abs(z) + min_camera_distance * 0.3
-                    else:
-                        angle = random.uniform(0, 2*math.pi)
-                        
-                        # 针对牙列模型优化相机角度
-                        if TEETH_MODE:
-                            if random.random() < 0.7:
-                                elev = random.uniform(0.5, 1.0)
-                            else:
-                                elev = random.uniform(0.2, 0.5)
-                        else:
-                            elev = random.uniform(0.2, 1.0)
-                            
-                        radius = random.uniform(min_camera_distance, min_camera_distance * 2)
-                        
-                        x = radius * math.cos(angle)
-                        y = radius * math.sin(angle)
-                        z = elev * max_dim
-                    
-                    cam_obj.location = (x, y, z)
+                    # 如果不使用自适应相机，则直接使用随机采样的位置
+                    cam_obj.location = sample_camera_location(i, uniform_points, min_camera_distance, max_dim)
 
             # 创建一个球体 mesh 并设置位置和缩放
 #            pos = Vector((x, y, z)) 
 #            bpy.ops.mesh.primitive_uv_sphere_add(radius=0.01, location=pos)
-            # 随机灯光
-            add_random_point_light()
+            # 随机灯光和环境贴图
+            randomize_view_lights(stem, i)
+            view_hdri = choose_view_hdri(i)
     
-            # 渲染 RGB
-            scene.render.filepath = os.path.join(OUTPUT_DIR, 'rgb', f"{os.path.splitext(ply_file)[0]}_{i:03d}.png")
-            bpy.ops.render.render(write_still=True)
+            # 渲染 RGB（单次渲染模式下遮罩由合成器同时写出）
+            timing = None
+            paths = view_output_paths(stem, i)
+            rgb_path, sil_path = paths['rgb'], paths['silhouette']
+            needs_render = not view_done['rgb'] or (SILHOUETTE_MODE != 'RENDER' and not view_done['silhouette'])
+            manifest_views.append((i, i, needs_render))
+            if needs_render and ANIMATION_RENDER:
+                # 先记录关键帧，所有视角的位置都确定后再一次性渲染
+                keyframe_view(i)
+                pending_views[i] = view_done
+                camera_params.append(None)
+                continue
+            if needs_render:
+                set_view_output_paths(stem, i)
+                scene.render.filepath = rgb_path
+                # RGB 文件完整写出后才记录日志（异步写入时在后台线程中记录）
+                timing = render_view(stem, i, rgb_path, on_written=partial(
+                    journal_record, stem, i, 'rgb', [rgb_path], camera=get_camera_params(cam_obj), hdri=view_hdri))
+                view_timings.append(timing)
+                if SILHOUETTE_MODE != 'RENDER':
+                    journal_record(stem, i, 'silhouette', [sil_path])
             
             # 显示单个视角渲染时间
             view_time = time.time() - view_start_time
             print(f"\n完成视角渲染，耗时 {view_time:.2f}秒")
-    
-            # 渲染遮罩
-            # 备份设置
-            backup = backup_render_settings()
-            setup_viewlayer_override_with_emission()
-            scene.render.filepath = os.path.join(OUTPUT_DIR, 'silhouette', f"{os.path.splitext(ply_file)[0]}_{i:03d}.png")
-            bpy.ops.render.render(write_still=True)
-            restore_render_settings(backup)
-
-            # 清理光源
-            for obj_light in [o for o in scene.objects if o.type=='LIGHT' and o.name.startswith('PointLight')]:
-                bpy.data.objects.remove(obj_light, do_unlink=True)
 
-            cam_info_path = os.path.join(OUTPUT_DIR, 'caminfo', f"{os.path.splitext(ply_file)[0]}_{i:03d}.txt")
-            export_camera_info(cam_obj, cam_info_path)
-
-            # 导出摄像机可见顶点的像素坐标
-            txt_output = os.path.join(OUTPUT_DIR, 'keypoints', f"{os.path.splitext(ply_file)[0]}_{i:03d}.txt")
-            export_visible_vertex_projection(obj, cam_obj, txt_output)
+            camera_params.append(finish_view_outputs(stem, i, obj, view_done, model_keypoints, model_cameras))
+            report_progress('view', model=stem, view=i, seconds=time.time() - view_start_time,
+                            sync_seconds=timing and timing['sync'], render_seconds=timing and timing['render'])
+            tracer.record('view', view_start_perf, model=stem, view=i)
+
+        # 动画模式：按连续的帧段一次性渲染所有待渲染视角，再逐帧导出其余输出
+        # 模型在动画中不动，顶点只取一次；关键点按 KEYPOINT_BATCH_VIEWS 个视角一批投影
+        verts_world = get_mesh_vertices_world(obj) if pending_views else None
+        for run in contiguous_runs(sorted(pending_views)):
+            run_start_time = time.time()
+            view_timings.append(render_views_animation(stem, run))
+            for start in range(0, len(run), KEYPOINT_BATCH_VIEWS):
+                batch = run[start:start + KEYPOINT_BATCH_VIEWS]
+                with stage_timer.stage('keypoint_export', stem):
+                    projections = project_view_batch(batch, pending_views, verts_world)
+                for i in batch:
+                    view_start_perf = time.perf_counter()
+                    view_done = pending_views[i]
+                    # 切换到该帧，相机和灯光回到该视角的关键帧位置
+                    scene.frame_set(i)
+                    paths = view_output_paths(stem, i)
+                    view_hdri = hdri_frames[i].name if i in hdri_frames else None
+                    journal_record(stem, i, 'rgb', [paths['rgb']], camera=get_camera_params(cam_obj), hdri=view_hdri)
+                    if SILHOUETTE_MODE != 'RENDER':
+                        journal_record(stem, i, 'silhouette', [paths['silhouette']])
+                    camera_params[i] = finish_view_outputs(stem, i, obj, view_done, model_keypoints, model_cameras,
+                                                           verts_world, projections.get(i))
+                    report_progress('view', model=stem, view=i, frame=i,
+                                    seconds=(time.time() - run_start_time) / len(run))
+                    tracer.record('view_outputs', view_start_perf, model=stem, view=i, frame=i)
+        if pending_views:
+            clear_view_keyframes()
+        hdri_frames.clear()
+        save_model_keypoints(stem, model_keypoints)
+        if model_cameras:
+            write_model_cameras(os.path.join(OUTPUT_DIR, 'camera_manifest'), stem, model_cameras)
+        write_frame_manifest(stem, manifest_views)
+        if EDGE_MAPS:
+            export_edge_maps(stem, manifest_views)
+        flush_writer(stem)
 
         # 保存最终的相机参数
         if SAVE_CAMERA_PARAMS and camera_params:
             save_camera_params(CAMERA_PARAMS_FILE, obj.name, camera_params)
 
+        report_progress('model', model=stem, views=NUM_VIEWS_PER_MODEL,
+                        timing=report_batch_timing(stem, view_timings))
+        tracer.record('model', model_start_perf, model=stem)
+
         # 删除模型，准备下一个
+        release_occlusion_engine(obj)
         bpy.data.objects.remove(obj, do_unlink=True)
+        collect_garbage(stem)
 
+if writer is not None:
+    writer.close()
 print('渲染完成！')
 # 显示总渲染时间
 total_time = time.time() - start_time
 print(f"总渲染时间: {total_time:.2f}秒，平均每个视角: {total_time/current_render:.2f}秒")
+
+if CAMERA_MANIFEST and BUILD_CAMERA_MANIFEST:
+    build_camera_manifest(os.path.join(OUTPUT_DIR, 'camera_manifest'))
+
+if STAGE_TIMINGS_FILE:
+    stage_timer.save(STAGE_TIMINGS_FILE, image_size=IMAGE_SIZE, samples=RENDER_SAMPLES, views=NUM_VIEWS_PER_MODEL,
+                     seed=RANDOM_SEED, model_files=ply_files, device=scene.cycles.device)
+    print(f"分阶段计时已保存: {STAGE_TIMINGS_FILE}")
+
+if TRACE_FILE:
+    tracer.export_chrome_trace(TRACE_FILE)
+    print(f"trace 已保存: {TRACE_FILE}，可在 chrome://tracing 或 ui.perfetto.dev 中打开")
@@ -0,0 +1,57 @@
+# 流水线分阶段计时：按 (模型, 阶段) 累计耗时，结果写成 JSON 供 bench_pipeline.py 对比；
+# 传入启用的 Tracer 时每个阶段同时记录为 trace 区间
+import json
+import time
+from contextlib import contextmanager
+
+# render_v3.py 中计时的阶段
+PIPELINE_STAGES = ('import', 'camera_search', 'rgb_render', 'silhouette_render', 'caminfo_export', 'keypoint_export',
+                   'edge_export')
+
+
+class StageTimer:
+    """
+    分阶段计时器
+
+    用法:
+        with stage_timer.stage('rgb_render', model='a_11', view=0):
+            bpy.ops.render.render(write_still=True)
+    """
+
+    def __init__(self, tracer=None):
+        self.records = []
+        self.tracer = tracer
+        self.start_time = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, model=None, view=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.records.append({'stage': name, 'model': model, 'view': view, 'seconds': seconds})
+            if self.tracer is not None:
+                self.tracer.add(name, start, seconds, cat='stage', model=model, view=view)
+
+    def summary(self):
+        """
+        汇总计时记录
+
+        返回:
+            {'total_seconds', 'stages': {阶段: 秒}, 'models': {模型: {阶段: 秒}}}；
+            没有执行过的阶段（当前配置下未启用，例如 INDEX 遮罩模式下的 silhouette_render）不出现在 stages 中
+        """
+        recorded = {r['stage'] for r in self.records}
+        stages = {name: 0.0 for name in PIPELINE_STAGES if name in recorded}
+        models = {}
+        for r in self.records:
+            stages[r['stage']] = stages.get(r['stage'], 0.0) + r['seconds']
+            per_model = models.setdefault(r['model'], {})
+            per_model[r['stage']] = per_model.get(r['stage'], 0.0) + r['seconds']
+        return {'total_seconds': time.perf_counter() - self.start_time, 'stages': stages, 'models': models}
+
+    def save(self, path, **extra):
+        """把汇总和逐条记录写入 JSON 文件，extra 为附加信息（例如运行配置）"""
+        with open(path, 'w') as f:
+            json.dump({**extra, **self.summary(), 'records': self.records}, f, indent=2)
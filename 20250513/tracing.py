@@ -0,0 +1,124 @@
+# 轻量的区间追踪：记录流水线各阶段的起止时间，导出为 Chrome / Perfetto 可读的 trace-event JSON
+#
+# 未启用时 span() 返回共享的空上下文、traced() 直接返回原函数，几乎没有额外开销。
+# 导出的文件可在 chrome://tracing 或 https://ui.perfetto.dev 中打开。
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+_NULL_SPAN = nullcontext()
+
+
+class Tracer:
+    """
+    区间追踪器
+
+    用法:
+        tracer = Tracer(enabled=True)
+        with tracer.span('render', model='a_11', view=0):
+            ...
+
+        @tracer.traced('keypoints')
+        def export_keypoints(...):
+            ...
+
+        tracer.export_chrome_trace('trace.json')
+    """
+
+    def __init__(self, enabled=False, process_name=None):
+        self.enabled = enabled
+        self.events = []
+        self.pid = os.getpid()
+        self.process_name = process_name
+        # 以墙上时间为基准，多个进程的 trace 合并后时间轴对齐
+        self._epoch = time.time()
+        self._origin = time.perf_counter()
+
+    def _ts(self, perf):
+        """perf_counter 时间 -> trace-event 的微秒时间戳"""
+        return (self._epoch + (perf - self._origin)) * 1e6
+
+    def add(self, name, start, duration, cat='pipeline', **args):
+        """
+        记录一个已结束的区间
+
+        参数:
+            name: 区间名称
+            start: 开始时间(time.perf_counter())
+            duration: 持续秒数
+            cat: 分类，Perfetto 中可按分类筛选
+            args: 附加信息（模型名、视角序号等）
+        """
+        if not self.enabled:
+            return
+        self.events.append({
+            'name': name, 'cat': cat, 'ph': 'X',
+            'ts': self._ts(start), 'dur': duration * 1e6,
+            'pid': self.pid, 'tid': threading.get_ident(),
+            'args': {k: v for k, v in args.items() if v is not None},
+        })
+
+    def record(self, name, start, cat='pipeline', **args):
+        """记录从 start(time.perf_counter()) 到现在的区间，用于不便改写成 with 语句的循环体"""
+        if self.enabled:
+            self.add(name, start, time.perf_counter() - start, cat, **args)
+
+    def span(self, name, cat='pipeline', **args):
+        """返回记录一个区间的上下文管理器；未启用时返回空上下文"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, cat, args)
+
+    @contextmanager
+    def _span(self, name, cat, args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter() - start, cat, **args)
+
+    def traced(self, name=None, cat='pipeline'):
+        """函数装饰器：每次调用记录一个区间；装饰时未启用则直接返回原函数"""
+        def decorator(func):
+            if not self.enabled:
+                return func
+            span_name = name or func.__name__
+
+            def wrapper(*args, **kwargs):
+                with self._span(span_name, cat, {}):
+                    return func(*args, **kwargs)
+            wrapper.__name__ = func.__name__
+            wrapper.__doc__ = func.__doc__
+            return wrapper
+        return decorator
+
+    def export_chrome_trace(self, path):
+        """写出 trace-event JSON；未启用时不写文件"""
+        if not self.enabled:
+            return None
+        events = list(self.events)
+        if self.process_name:
+            events.insert(0, {'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'tid': 0,
+                              'args': {'name': self.process_name}})
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return path
+
+
+def merge_chrome_traces(paths, target):
+    """把多个进程的 trace 文件合并为一个（时间戳已按墙上时间对齐）"""
+    events = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, 'r') as f:
+                events.extend(json.load(f)['traceEvents'])
+        except (OSError, json.JSONDecodeError, KeyError):
+            print(f"跳过无法读取的 trace 文件: {path}")
+    with open(target, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    return len(events)